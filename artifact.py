@@ -0,0 +1,160 @@
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+from features import FEATURE_COLUMNS, FIELDS
+from model_registry import _file_sha256
+from tree_engine import TreeEnsemble
+
+
+FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+BOOSTER_NAME = "booster.ubj"
+
+# TreeEnsemble arrays, each stored as its own .npy so it can be memory-mapped
+ARRAY_NAMES = ("feature", "threshold", "left", "right", "default_left", "value", "roots")
+
+
+def _encodings():
+    # The one-hot layout the app's feature encoder produces, so a reader can check it matches
+    encodings = []
+    for field in FIELDS:
+        if field.kind == "numeric":
+            encodings.append({"name": field.name, "kind": field.kind, "columns": list(field.columns),
+                              "min": field.min_value, "max": field.max_value})
+        else:
+            encodings.append({"name": field.name, "kind": field.kind, "columns": list(field.columns),
+                              "options": {option: [int(v) for v in row]
+                                          for option, row in zip(field.options, field.table)}})
+    return encodings
+
+
+def export_artifact(model, out_dir, version=None):
+    """Write ``model`` as a versioned artifact directory and return its manifest path.
+
+    The directory holds the booster in XGBoost's native UBJSON format (portable
+    across library versions), the compiled tree arrays as .npy files, and a
+    manifest with the feature order, encodings, version and SHA-256 checksums.
+    """
+    booster = model.get_booster()
+    if list(booster.feature_names) != list(FEATURE_COLUMNS):
+        raise ValueError("booster features do not match the app's feature encoder: "
+                         f"{booster.feature_names} != {list(FEATURE_COLUMNS)}")
+
+    os.makedirs(out_dir, exist_ok=True)
+    booster.save_model(os.path.join(out_dir, BOOSTER_NAME))
+    ensemble = TreeEnsemble.from_booster(booster)
+    for name in ARRAY_NAMES:
+        np.save(os.path.join(out_dir, f"{name}.npy"), getattr(ensemble, name))
+
+    files = [BOOSTER_NAME] + [f"{name}.npy" for name in ARRAY_NAMES]
+    checksums = {name: _file_sha256(os.path.join(out_dir, name)) for name in files}
+    if version is None:
+        version = checksums[BOOSTER_NAME][:12]
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "version": version,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "objective": "binary:logistic",
+        "feature_columns": list(FEATURE_COLUMNS),
+        "encodings": _encodings(),
+        "base_margin": ensemble.base_margin,
+        "depth": ensemble.depth,
+        "n_trees": ensemble.n_trees,
+        "files": checksums,
+    }
+    try:
+        import xgboost
+        manifest["xgboost_version"] = xgboost.__version__
+    except ImportError:
+        pass
+
+    # Written last, and atomically, so a half-exported directory never looks valid
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    with open(manifest_path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path + ".tmp", manifest_path)
+    return manifest_path
+
+
+def _manifest_path(path):
+    return path if os.path.basename(path) == MANIFEST_NAME else os.path.join(path, MANIFEST_NAME)
+
+
+def read_manifest(path, verify=True):
+    manifest_path = _manifest_path(path)
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"unsupported artifact format {manifest.get('format_version')!r}")
+    if manifest["feature_columns"] != list(FEATURE_COLUMNS):
+        raise ValueError("artifact feature order does not match the app's feature encoder")
+    if manifest["encodings"] != _encodings():
+        raise ValueError("artifact one-hot encodings do not match the app's feature encoder")
+
+    if verify:
+        root = os.path.dirname(manifest_path)
+        for name, expected in manifest["files"].items():
+            if _file_sha256(os.path.join(root, name)) != expected:
+                raise ValueError(f"checksum mismatch for {name} in {root}")
+    return manifest
+
+
+def load_artifact(path, verify=True):
+    """Load an exported artifact as a TreeEnsemble without importing xgboost.
+
+    The node arrays are memory-mapped read-only, so every worker process on a
+    host shares the same physical pages instead of holding its own copy.
+    """
+    manifest = read_manifest(path, verify)
+    root = os.path.dirname(_manifest_path(path))
+    arrays = {name: np.load(os.path.join(root, f"{name}.npy"), mmap_mode="r") for name in ARRAY_NAMES}
+    ensemble = TreeEnsemble(arrays["feature"], arrays["threshold"], arrays["left"], arrays["right"],
+                            arrays["default_left"], arrays["value"], arrays["roots"],
+                            manifest["base_margin"], manifest["depth"], manifest["feature_columns"])
+    ensemble.version = manifest["version"]
+    return ensemble
+
+
+def load_booster(path, verify=True):
+    # The full XGBClassifier, for callers that need XGBoost itself (e.g. SHAP contributions)
+    import xgboost
+
+    read_manifest(path, verify)
+    model = xgboost.XGBClassifier()
+    model.load_model(os.path.join(os.path.dirname(_manifest_path(path)), BOOSTER_NAME))
+    return model
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export or verify a versioned model artifact.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="convert a pickled model into an artifact directory")
+    export.add_argument("model", help="pickled XGBClassifier, e.g. xgboost_heart_disease_detection_v1.pkl")
+    export.add_argument("out_dir", help="directory to write the artifact to")
+    export.add_argument("--version", help="version label for the manifest (default: booster checksum)")
+
+    verify = commands.add_parser("verify", help="check an artifact's manifest and checksums")
+    verify.add_argument("path", help="artifact directory or its manifest.json")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        from model_registry import load_pickle
+
+        manifest_path = export_artifact(load_pickle(args.model), args.out_dir, args.version)
+        print(f"Wrote {manifest_path}")
+    else:
+        manifest = read_manifest(args.path, verify=True)
+        print(f"OK: version {manifest['version']}, {manifest['n_trees']} trees")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
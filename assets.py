@@ -0,0 +1,57 @@
+import os
+import base64
+from io import BytesIO
+from functools import lru_cache
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+IMAGE_DIR = os.path.join(BASE_DIR, "imgs")
+STYLESHEET_PATH = os.path.join(BASE_DIR, "style.css")
+
+# Heart outline shared by both placeholder icons
+_HEART = [(32, 15), (20, 10), (10, 20), (10, 35), (32, 55), (54, 35), (54, 20), (44, 10), (32, 15)]
+
+
+def _placeholder_image(image_name):
+    from PIL import Image, ImageDraw
+
+    image = Image.new('RGBA', (65, 65), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    if image_name == "hearted.png":
+        # Red heart with a crack
+        draw.polygon(_HEART, fill=(255, 53, 71, 255))
+        draw.line([(32, 15), (32, 55)], fill=(255, 255, 255, 200), width=3)
+    else:
+        # Green heart for a healthy heart
+        draw.polygon(_HEART, fill=(76, 175, 80, 255))
+
+    img = BytesIO()
+    image.save(img, format='PNG')
+    return img.getvalue()
+
+
+@lru_cache(maxsize=None)
+def get_base64_image(image_name):
+    """Return an image from imgs/ as a data URI, computed once per process.
+
+    A placeholder icon is drawn and saved if the file is missing.
+    """
+    image_path = os.path.join(IMAGE_DIR, image_name)
+    if os.path.exists(image_path):
+        with open(image_path, "rb") as f:
+            img_bytes = f.read()
+    else:
+        img_bytes = _placeholder_image(image_name)
+        os.makedirs(IMAGE_DIR, exist_ok=True)
+        with open(image_path, 'wb') as f:
+            f.write(img_bytes)
+
+    encoded = base64.b64encode(img_bytes).decode()
+    return f"data:image/png;base64,{encoded}"
+
+
+@lru_cache(maxsize=None)
+def get_stylesheet():
+    # The page's custom CSS (animations, cards, form styling) as a <style> block
+    with open(STYLESHEET_PATH, encoding="utf-8") as f:
+        return f"<style>\n{f.read()}</style>"
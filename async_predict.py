@@ -0,0 +1,101 @@
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from coalescer import get_batcher
+from model_registry import DEFAULT_MODEL_PATH
+from prediction_cache import cache
+from scoring import DEFAULT_THRESHOLD
+from tree_engine import scoring_version
+
+
+# Seconds a session waits for its prediction before giving up on it
+DEFAULT_TIMEOUT = float(os.environ.get("HEART_PREDICTION_TIMEOUT", "10"))
+
+# Side work that shouldn't hold the scoring path, e.g. explanations
+_side_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="prediction-side")
+
+
+def _done(result):
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+def predict_async(features, model_path=DEFAULT_MODEL_PATH, threshold=DEFAULT_THRESHOLD):
+    """Return a Future of the ScoreResult for ``features`` without blocking on the model.
+
+    Cached inputs resolve immediately; the rest are queued on the process's
+    micro-batcher. Cancelling the future before its batch is scored drops
+    the rows from that batch.
+    """
+    version = scoring_version(model_path)
+    cached = cache.lookup(features, version, threshold)
+    if cached is not None:
+        return _done(cached)
+
+    batcher = get_batcher()
+    if batcher.model_path != model_path or batcher.threshold != threshold:
+        return _side_pool.submit(cache.predict, features, _scorer(model_path, threshold), version, threshold)
+
+    def store(future):
+        if not future.cancelled() and future.exception() is None:
+            cache.store(features, future.result(), version, threshold)
+
+    future = batcher.submit(features)
+    future.add_done_callback(store)
+    return future
+
+
+def _scorer(model_path, threshold):
+    from scoring import score
+    from tree_engine import get_scoring_model
+
+    return lambda features: score(get_scoring_model(model_path), features, threshold)
+
+
+def submit(func, *args):
+    # Run ``func`` off the caller's thread; returns its Future
+    return _side_pool.submit(func, *args)
+
+
+class LatestOnly:
+    """Tracks the in-flight future per key (e.g. per session and task).
+
+    Registering a new future cancels the one it supersedes, so repeated
+    clicks never leave stale predictions queued behind the current one.
+    A future that has already started running finishes, but its result is
+    simply never read.
+    """
+
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.cancelled = 0
+
+    def track(self, key, future):
+        with self._lock:
+            previous = self._pending.get(key)
+            self._pending[key] = future
+        if previous is not None and previous is not future and previous.cancel():
+            self.cancelled += 1
+        future.add_done_callback(lambda f: self._forget(key, f))
+        return future
+
+    def cancel(self, key):
+        with self._lock:
+            future = self._pending.pop(key, None)
+        if future is not None and future.cancel():
+            self.cancelled += 1
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+
+    def __len__(self):
+        return len(self._pending)
+
+
+# Shared by every session in this process
+pending = LatestOnly()
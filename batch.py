@@ -0,0 +1,184 @@
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from features import FIELD_NAMES, encoder
+from metrics import BATCH_ROWS, REQUESTS, STAGE_SECONDS, record_predictions
+from model_registry import DEFAULT_MODEL_PATH, get_model
+from scoring import DEFAULT_THRESHOLD, score
+from validation import validate
+
+
+DEFAULT_CHUNK_SIZE = 65536
+
+RESULT_COLUMNS = ("prob_no_heart_disease", "prob_heart_disease", "prediction", "validation_errors")
+
+# What to do with rows that fail validation: keep them with their reasons, drop them, or stop
+INVALID_ROW_ACTIONS = ("flag", "reject", "error")
+
+
+class BatchReport:
+    def __init__(self, rows, seconds, invalid=0):
+        self.rows = rows
+        self.seconds = seconds
+        self.invalid = invalid
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds > 0 else float("inf")
+
+    def __str__(self):
+        report = f"Scored {self.rows} rows in {self.seconds:.3f}s ({self.rows_per_second:,.0f} rows/s)"
+        if self.invalid:
+            report += f"; {self.invalid} failed validation and were not scored"
+        return report
+
+
+def read_table(path_or_buffer, name=None):
+    # Pick the reader from the file extension; uploads pass their original file name
+    name = name or str(path_or_buffer)
+    if name.lower().endswith((".parquet", ".pq")):
+        return pd.read_parquet(path_or_buffer)
+    return pd.read_csv(path_or_buffer)
+
+
+def write_table(frame, path):
+    if str(path).lower().endswith((".parquet", ".pq")):
+        frame.to_parquet(path, index=False)
+    else:
+        frame.to_csv(path, index=False)
+
+
+def score_frame(model, frame, chunk_size=DEFAULT_CHUNK_SIZE, threshold=DEFAULT_THRESHOLD, invalid="flag"):
+    """Score every row of ``frame`` and return the probabilities and labels.
+
+    Rows are encoded into one reused float32 buffer ``chunk_size`` rows at a
+    time, so the booster always sees a full matrix rather than single rows.
+    Each chunk is validated first and rows that fail are never encoded or
+    scored: they get NaN probabilities, prediction -1 and their reasons in
+    ``validation_errors`` (or, with ``invalid="error"``, a ValueError naming
+    the row by its label in ``frame.index``, so a shard or a streamed chunk
+    reports its row's position in the whole input).
+    """
+    missing = [name for name in FIELD_NAMES if name not in frame.columns]
+    if missing:
+        raise ValueError(f"input is missing required columns: {', '.join(missing)}")
+
+    n_rows = len(frame)
+    probabilities = np.full((n_rows, 2), np.nan, dtype=np.float32)
+    labels = np.full(n_rows, -1, dtype=np.int8)
+    errors = np.full(n_rows, "", dtype=object)
+    buffer = encoder.allocate(min(chunk_size, n_rows))
+
+    for start in range(0, n_rows, chunk_size):
+        chunk = frame.iloc[start:start + chunk_size]
+        rows = slice(start, start + len(chunk))
+        check = validate(chunk)
+        if not check.all_valid:
+            if invalid == "error":
+                row = int(np.argmin(check.valid))
+                raise ValueError(f"row {chunk.index[row]}: {'; '.join(check.reasons(row))}")
+            errors[rows] = check.reasons()
+            rows = start + np.flatnonzero(check.valid)
+            chunk = chunk[check.valid]
+            if not len(chunk):
+                continue
+
+        features = encoder.encode(chunk, out=buffer)
+        result = score(model, features, threshold)
+        BATCH_ROWS.observe(len(chunk), "batch")
+        probabilities[rows] = result.probabilities
+        labels[rows] = result.labels
+    record_predictions("batch", labels[labels >= 0])
+
+    return pd.DataFrame({
+        RESULT_COLUMNS[0]: probabilities[:, 0],
+        RESULT_COLUMNS[1]: probabilities[:, 1],
+        RESULT_COLUMNS[2]: labels,
+        RESULT_COLUMNS[3]: errors,
+    }, index=frame.index)
+
+
+def finish_results(frame, results, invalid="flag"):
+    # The input with the result columns appended; "reject" leaves out rows that weren't scored
+    frame = frame.drop(columns=[name for name in RESULT_COLUMNS if name in frame.columns])
+    scored = pd.concat([frame, results], axis=1)
+    if invalid == "reject":
+        scored = scored[scored[RESULT_COLUMNS[2]] >= 0]
+    return scored
+
+
+def score_table(model, frame, chunk_size=DEFAULT_CHUNK_SIZE, threshold=DEFAULT_THRESHOLD, invalid="flag"):
+    # Returns the input with the result columns appended, plus a throughput report
+    start = time.perf_counter()
+    results = score_frame(model, frame, chunk_size, threshold, invalid)
+    report = BatchReport(len(frame), time.perf_counter() - start,
+                         int((results[RESULT_COLUMNS[2]] < 0).sum()))
+    REQUESTS.inc("batch")
+    STAGE_SECONDS.observe(report.seconds, "batch", "score")
+    # Rescoring a previous output replaces its result columns rather than duplicating them
+    return finish_results(frame, results, invalid), report
+
+
+def score_file(input_path, output_path, model_path=DEFAULT_MODEL_PATH,
+               chunk_size=DEFAULT_CHUNK_SIZE, threshold=DEFAULT_THRESHOLD, invalid="flag"):
+    model = get_model(model_path)
+    frame = read_table(input_path)
+    scored, report = score_table(model, frame, chunk_size, threshold, invalid)
+    write_table(scored, output_path)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Score a CSV or Parquet file of patients with the heart failure model.")
+    parser.add_argument("input", help="CSV or Parquet file with the 11 clinical fields")
+    parser.add_argument("output", help="where to write the scored rows (.csv or .parquet)")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH, help="model artifact to score with")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="rows encoded and scored per booster call")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="P(heart disease) above which a row is labelled a heart patient")
+    parser.add_argument("--invalid", choices=INVALID_ROW_ACTIONS, default="flag",
+                        help="rows failing validation: keep them unscored with their reasons (flag), "
+                             "leave them out of the output (reject), or stop with an error (error)")
+    parser.add_argument("--stream", action="store_true",
+                        help="read and write chunk by chunk so memory stays flat for any input size")
+    parser.add_argument("--start-row", type=int, default=0,
+                        help="with --stream, skip this many input rows")
+    parser.add_argument("--resume", action="store_true",
+                        help="with --stream, continue from the checkpoint left by an interrupted run")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="score across this many worker processes (see parallel.py)")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.input):
+        parser.error(f"input file not found: {args.input}")
+    if (args.start_row or args.resume) and not args.stream:
+        parser.error("--start-row and --resume require --stream")
+    if args.workers > 1 and args.stream:
+        parser.error("--workers cannot be combined with --stream")
+
+    if args.stream:
+        from streaming import stream_score
+
+        report = stream_score(args.input, args.output, args.model, args.chunk_size,
+                              args.threshold, args.start_row, args.resume, args.invalid)
+    elif args.workers > 1:
+        from parallel import score_file_parallel
+
+        report = score_file_parallel(args.input, args.output, args.model, args.workers,
+                                     args.chunk_size, args.threshold, args.invalid)
+    else:
+        report = score_file(args.input, args.output, args.model, args.chunk_size,
+                            args.threshold, args.invalid)
+    print(report, file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+
+import numpy as np
+
+from features import FIELDS, encode, encode_record, encode_records
+
+
+DEFAULT_SIZES = (1, 10, 100, 1000, 10000, 100000, 1000000)
+# The per-row ladder is pure Python; past this it only measures the same loop for longer
+LADDER_MAX_ROWS = 100000
+# The NumPy engine targets small batches; XGBoost's own predictor handles the big ones
+NUMPY_ENGINE_MAX_ROWS = 100000
+DEFAULT_TOLERANCE = 0.10
+# Calls shorter than SMALL_CASE_SECONDS (single rows, small batches) swing far more between
+# runs with CPU frequency and scheduling than within one run, so they get a looser gate
+SMALL_CASE_SECONDS = 0.01
+DEFAULT_SMALL_TOLERANCE = 0.50
+# Fast cases are timed in batches of calls lasting at least this long, so one sample isn't timer noise
+SAMPLE_SECONDS = 0.01
+MIN_SAMPLES = 5
+
+
+def synthetic_patients(n_rows, seed=0):
+    """Random patients drawn uniformly from the validated ranges and the form's options.
+
+    Every row passes validation, so the validate and score cases time realistic input.
+    """
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for field in FIELDS:
+        if field.kind == "categorical":
+            columns[field.name] = rng.choice(np.array(field.options, dtype=object), n_rows)
+        elif isinstance(field.min_value, float):
+            columns[field.name] = np.round(rng.uniform(field.valid_min, field.valid_max, n_rows), 1)
+        else:
+            columns[field.name] = rng.integers(field.valid_min, field.valid_max + 1, n_rows)
+    return columns
+
+
+def legacy_encode(patient):
+    # The if/elif ladder run() used to build its feature list, kept as the baseline
+    patient_fasting_blood_sugar = 1
+    if patient["FastingBS"] == "Less Than 120 mg/dl":
+        patient_fasting_blood_sugar = 0
+    new_data = [patient["Age"], patient["RestingBP"], patient["Cholesterol"],
+                patient_fasting_blood_sugar, patient["MaxHR"], patient["Oldpeak"]]
+
+    patient_gender = [1]
+    if patient["Sex"] == "Female":
+        patient_gender = [0]
+
+    patient_chest_pain_type = [0, 0, 0]
+    if patient["ChestPainType"] == "Typical Angina":
+        patient_chest_pain_type = [0, 0, 1]
+    elif patient["ChestPainType"] == "Atypical Angina":
+        patient_chest_pain_type = [1, 0, 0]
+    elif patient["ChestPainType"] == "Non-anginal Pain":
+        patient_chest_pain_type = [0, 1, 0]
+
+    patinet_ecg = [0, 0]
+    if patient["RestingECG"] == "Normal":
+        patinet_ecg = [1, 0]
+    elif patient["RestingECG"] == "ST":
+        patinet_ecg = [0, 1]
+
+    patient_exercise_angina = [1]
+    if patient["ExerciseAngina"] == "No":
+        patient_exercise_angina = [0]
+
+    patient_slope = [0, 0]
+    if patient["ST_Slope"] == "Flat":
+        patient_slope = [1, 0]
+    elif patient["ST_Slope"] == "Up":
+        patient_slope = [0, 1]
+
+    new_data.extend(patient_gender)
+    new_data.extend(patient_chest_pain_type)
+    new_data.extend(patinet_ecg)
+    new_data.extend(patient_exercise_angina)
+    new_data.extend(patient_slope)
+    return new_data
+
+
+def measure(func, rows, min_seconds=0.2, max_repeats=1000):
+    """Median per-call time over repeated samples, running for at least ``min_seconds``.
+
+    Each sample times enough back-to-back calls to last ``SAMPLE_SECONDS``, and
+    at least ``MIN_SAMPLES`` samples are taken (up to ``max_repeats``).
+    ``spread`` is the interquartile range relative to the median, which the
+    regression gate uses as this case's noise level.
+    """
+    start = time.perf_counter()
+    func()  # warm-up, and a first estimate of the per-call time
+    number = max(1, int(SAMPLE_SECONDS / max(time.perf_counter() - start, 1e-9)))
+    samples = []
+    total = 0.0
+    while len(samples) < max_repeats and (total < min_seconds or len(samples) < MIN_SAMPLES):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        samples.append(elapsed / number)
+        total += elapsed
+    low, median, high = np.percentile(samples, [25, 50, 75])
+    return {"rows": rows, "seconds": float(median), "best_seconds": min(samples),
+            "rows_per_second": rows / median if median > 0 else float("inf"),
+            "spread": float((high - low) / median) if median > 0 else 0.0,
+            "repeats": len(samples) * number}
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, model_path=None, artifact_path=None, min_seconds=0.2, log=None):
+    from model_registry import DEFAULT_MODEL_PATH, load_model_file
+    from scoring import score
+    from tree_engine import TreeEnsemble
+    from validation import validate
+
+    model_path = model_path or DEFAULT_MODEL_PATH
+    results = {}
+
+    def record(name, result):
+        results[name] = result
+        if log:
+            log(f"{name:<40} {result['seconds'] * 1000:>12.3f} ms {result['rows_per_second']:>16,.0f} rows/s")
+
+    # Model load, from a cold file read each time
+    record("load/pickle", measure(lambda: load_model_file(model_path), 1, min_seconds, max_repeats=5))
+    if artifact_path:
+        record("load/artifact", measure(lambda: load_model_file(artifact_path), 1, min_seconds, max_repeats=20))
+
+    # Page assets: the data URIs and stylesheet the app renders on every rerun
+    from assets import get_base64_image, get_stylesheet
+
+    def load_assets(cached):
+        if not cached:
+            get_base64_image.cache_clear()
+            get_stylesheet.cache_clear()
+        return get_base64_image("heart.png"), get_base64_image("hearted.png"), get_stylesheet()
+
+    record("render/assets-uncached", measure(lambda: load_assets(False), 1, min_seconds))
+    record("render/assets-cached", measure(lambda: load_assets(True), 1, min_seconds))
+
+    model = load_model_file(model_path)
+    ensemble = model if isinstance(model, TreeEnsemble) else TreeEnsemble.from_model(model)
+
+    for n_rows in sizes:
+        columns = synthetic_patients(n_rows)
+        records = [dict(zip(columns, values)) for values in zip(*columns.values())] \
+            if n_rows <= LADDER_MAX_ROWS else None
+
+        if records is not None:
+            record(f"encode/ladder/n={n_rows}",
+                   measure(lambda: np.array([legacy_encode(r) for r in records], dtype=np.float32),
+                           n_rows, min_seconds))
+            # One encode_record call per patient: the path a form submission or /predict takes
+            record(f"encode/record/n={n_rows}", measure(lambda: [encode_record(r) for r in records], n_rows, min_seconds))
+            record(f"encode/records/n={n_rows}", measure(lambda: encode_records(records), n_rows, min_seconds))
+        record(f"encode/columns/n={n_rows}", measure(lambda: encode(columns), n_rows, min_seconds))
+        record(f"validate/columns/n={n_rows}", measure(lambda: validate(columns), n_rows, min_seconds))
+
+        features = encode(columns)
+        if not isinstance(model, TreeEnsemble):
+            record(f"score/predict+proba/n={n_rows}",
+                   measure(lambda: (model.predict(features), model.predict_proba(features)),
+                           n_rows, min_seconds))
+            record(f"score/single-pass/n={n_rows}", measure(lambda: score(model, features), n_rows, min_seconds))
+        if n_rows <= NUMPY_ENGINE_MAX_ROWS:
+            record(f"score/numpy-engine/n={n_rows}",
+                   measure(lambda: score(ensemble, features), n_rows, min_seconds))
+
+    return results
+
+
+def environment():
+    info = {"python": platform.python_version(), "platform": platform.platform(),
+            "cpu_count": os.cpu_count(), "numpy": np.__version__,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
+    try:
+        import xgboost
+        info["xgboost"] = xgboost.__version__
+    except ImportError:
+        pass
+    return info
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE, small_tolerance=DEFAULT_SMALL_TOLERANCE):
+    """Return (name, baseline rows/s, current rows/s) for every median throughput drop beyond the allowance.
+
+    The allowance is ``tolerance``, or ``small_tolerance`` for cases whose
+    baseline call took under ``SMALL_CASE_SECONDS``. It is widened for noisy
+    cases to twice the larger of the two runs' spreads, so a case that varies
+    by 15% between samples isn't failed for a 20% swing, but never past 75%:
+    a case more than four times slower always fails.
+    """
+    regressions = []
+    for name, old in baseline.items():
+        new = results.get(name)
+        if new is None:
+            continue
+        allowed = small_tolerance if old["seconds"] < SMALL_CASE_SECONDS else tolerance
+        allowed = min(max(allowed, 2 * max(old.get("spread", 0.0), new.get("spread", 0.0))), 0.75)
+        if new["rows_per_second"] < old["rows_per_second"] * (1.0 - allowed):
+            regressions.append((name, old["rows_per_second"], new["rows_per_second"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark feature encoding, inference, page assets and model loading.")
+    parser.add_argument("--sizes", type=lambda s: [int(x) for x in s.split(",")], default=list(DEFAULT_SIZES),
+                        help="comma-separated batch sizes (default: 1 to 1,000,000)")
+    parser.add_argument("--model", default=None, help="pickled model or artifact manifest to benchmark")
+    parser.add_argument("--artifact", default=None, help="also time loading this artifact manifest")
+    parser.add_argument("--min-seconds", type=float, default=0.2, help="minimum time spent per case")
+    parser.add_argument("--output", "-o", default=None, help="write results as JSON to this file")
+    parser.add_argument("--baseline", default=None, help="JSON from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed fractional drop in median throughput before the gate fails, "
+                             "widened for noisy cases (default 0.10)")
+    parser.add_argument("--small-tolerance", type=float, default=DEFAULT_SMALL_TOLERANCE,
+                        help=f"the same for cases faster than {SMALL_CASE_SECONDS * 1000:g} ms a call (default 0.50)")
+    args = parser.parse_args(argv)
+
+    def log(line):
+        print(line, file=sys.stderr)
+
+    results = run_benchmarks(args.sizes, args.model, args.artifact, args.min_seconds, log)
+    report = {"environment": environment(), "results": results}
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance, args.small_tolerance)
+        for name, old, new in regressions:
+            log(f"REGRESSION {name}: {old:,.0f} -> {new:,.0f} rows/s ({new / old - 1:+.1%})")
+        if regressions:
+            return 1
+        log(f"No throughput regressions beyond {args.tolerance:.0%} "
+            f"({args.small_tolerance:.0%} for fast cases) against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+import time
+import queue
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+
+from metrics import BATCH_ROWS, SIZE_BUCKETS, metrics, stats_collector
+from model_registry import DEFAULT_MODEL_PATH
+from scoring import DEFAULT_THRESHOLD, ScoreResult, score
+from tree_engine import get_scoring_model
+
+
+DEFAULT_MAX_BATCH_SIZE = 256
+DEFAULT_MAX_WAIT_MS = 2.0
+
+QUEUE_DEPTH = metrics.histogram("heart_coalescer_queued_requests", "Requests queued when a micro-batch starts",
+                                buckets=SIZE_BUCKETS)
+
+
+class MicroBatcher:
+    """Coalesces concurrent scoring requests into one booster call.
+
+    A background thread takes the first waiting request, then keeps collecting
+    for up to ``max_wait_ms`` or until ``max_batch_size`` rows are queued, and
+    scores them as one matrix. Each caller gets back only its own rows. With
+    ``max_wait_ms=0`` it scores whatever is already queued without waiting.
+
+    A lone request while traffic is idle is scored straight away, so the wait
+    is only paid when there are concurrent requests to batch with.
+    """
+
+    def __init__(self, model_path=DEFAULT_MODEL_PATH, threshold=DEFAULT_THRESHOLD,
+                 max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        self.model_path = model_path
+        self.threshold = threshold
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._closed = False
+        self._last_batch_requests = 0
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, features):
+        """Queue a (n, 15) feature matrix; returns a Future of its ScoreResult."""
+        if self._closed:
+            raise RuntimeError("MicroBatcher is closed")
+        features = np.asarray(features, dtype=np.float32)
+        if features.ndim == 1:
+            features = features.reshape(1, -1)
+        future = Future()
+        self._queue.put((features, future))
+        return future
+
+    def predict(self, features, timeout=None):
+        return self.submit(features).result(timeout)
+
+    def stats(self):
+        # The histograms are process-wide; there is one batcher per process
+        return {
+            "queue_depth": self._queue.qsize(),
+            "batch_sizes": BATCH_ROWS.snapshot("coalescer"),
+            "queue_depths": QUEUE_DEPTH.snapshot(),
+        }
+
+    def close(self):
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self, first):
+        batch = [first]
+        rows = len(first[0])
+        wait = self.max_wait
+        if self._last_batch_requests <= 1 and self._queue.empty():
+            wait = 0.0
+        deadline = time.monotonic() + wait
+        while rows < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    item = self._queue.get(timeout=remaining)
+                else:
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Close requested; finish this batch and let _run see the sentinel
+                self._queue.put(None)
+                break
+            batch.append(item)
+            rows += len(item[0])
+        return batch, rows
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                break
+            QUEUE_DEPTH.observe(self._queue.qsize() + 1)
+            batch, rows = self._collect(first)
+            self._last_batch_requests = len(batch)
+            BATCH_ROWS.observe(rows, "coalescer")
+
+            # Callers that gave up (e.g. cancelled) are dropped before scoring
+            batch = [(features, future) for features, future in batch
+                     if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                features = np.concatenate([features for features, _ in batch])
+                result = score(get_scoring_model(self.model_path), features, self.threshold)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            start = 0
+            for item_features, future in batch:
+                end = start + len(item_features)
+                future.set_result(ScoreResult(result.probabilities[start:end],
+                                              result.labels[start:end],
+                                              result.percentages[start:end]))
+                start = end
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher():
+    # One batcher per process, so concurrent Streamlit sessions share batches
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = MicroBatcher()
+                metrics.add_collector(stats_collector("heart_coalescer", _batcher.stats, "Micro-batcher"))
+    return _batcher
@@ -0,0 +1,329 @@
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+
+import numpy as np
+
+from features import FEATURE_COLUMNS, FIELDS
+from metrics import metrics
+
+
+# Histogram of the training (or any trusted) population; see ``python drift.py reference``
+DEFAULT_REFERENCE_PATH = os.environ.get("HEART_DRIFT_REFERENCE", "drift_reference.npz")
+# Statistics cover the last window, kept as ``DEFAULT_SLOTS`` rotating slices
+DEFAULT_WINDOW_SECONDS = float(os.environ.get("HEART_DRIFT_WINDOW", 3600))
+DEFAULT_SLOTS = 12
+# PSI under 0.1 is usually read as stable and over 0.25 as a major shift
+PSI_ALERT = float(os.environ.get("HEART_DRIFT_PSI_ALERT", 0.25))
+KS_ALERT = float(os.environ.get("HEART_DRIFT_KS_ALERT", 0.1))
+# Fewer rows than this in the window never raise an alert
+MIN_ROWS = 200
+NUMERIC_BINS = 20
+
+_EPSILON = 1e-4
+# Columns are laid out this far apart on one number line, so one searchsorted bins all 15
+_COLUMN_SPAN = 1e9
+
+
+class Binning:
+    """Fixed bins for the 15 encoded columns, so a batch's histogram is one ``bincount``.
+
+    A numeric column gets ``numeric_bins`` equal-width bins over its field's
+    valid range; a one-hot column gets one bin for 0 and one for 1. Every
+    column also has an underflow and an overflow bin, so each histogram has
+    ``n_bins + 2`` counts, laid end to end in one flat array.
+
+    Column ``j`` is shifted by ``j * _COLUMN_SPAN`` and every column's edges
+    are merged into one sorted array, so a single ``searchsorted`` over the
+    whole matrix yields flat bin indices directly.
+    """
+
+    def __init__(self, fields=FIELDS, numeric_bins=NUMERIC_BINS):
+        low, high, n_bins = [], [], []
+        for field in fields:
+            if field.kind == "numeric":
+                low.append(field.valid_min)
+                high.append(field.valid_max)
+                n_bins.append(numeric_bins)
+            else:
+                low.extend([-0.5] * len(field.columns))
+                high.extend([1.5] * len(field.columns))
+                n_bins.extend([2] * len(field.columns))
+        self.fields = tuple(fields)
+        self.low = np.array(low, dtype=np.float64)
+        self.high = np.array(high, dtype=np.float64)
+        self.n_bins = np.array(n_bins, dtype=np.intp)
+        sizes = self.n_bins + 2
+        self.offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        self.size = int(sizes.sum())
+
+        self._shift = np.arange(len(low)) * _COLUMN_SPAN
+        edges = []
+        for j in range(len(low)):
+            column = np.linspace(self.low[j], self.high[j], self.n_bins[j] + 1)
+            # The top of the range belongs to the last bin, not the overflow
+            column[-1] = np.nextafter(column[-1], np.inf)
+            # A leading edge halfway from the previous column starts this column's underflow bin
+            edges.append(np.concatenate([[-_COLUMN_SPAN / 2], column]) + self._shift[j])
+        self._edges = np.concatenate(edges)
+
+    def histogram(self, features):
+        """Counts of an (n, 15) matrix, as one flat array of ``size`` bins."""
+        features = np.asarray(features, dtype=np.float64)
+        if features.ndim == 1:
+            features = features.reshape(1, -1)
+        bins = np.searchsorted(self._edges, (features + self._shift).ravel(), side="right") - 1
+        return np.bincount(bins, minlength=self.size)
+
+    def columns(self, counts):
+        # Flat counts -> one array of n_bins + 2 counts per encoded column
+        return np.split(counts, self.offsets[1:])
+
+    def rows(self, counts):
+        # Every row lands in exactly one bin of the first column
+        return int(counts[:self.n_bins[0] + 2].sum())
+
+
+def _shares(counts):
+    total = counts.sum()
+    shares = counts / total if total else np.zeros(len(counts))
+    return np.clip(shares, _EPSILON, None)
+
+
+def psi(expected, actual):
+    """Population stability index between two histograms over the same bins."""
+    e, a = _shares(np.asarray(expected, dtype=np.float64)), _shares(np.asarray(actual, dtype=np.float64))
+    return float(np.sum((a - e) * np.log(a / e)))
+
+
+def ks(expected, actual):
+    """Kolmogorov-Smirnov distance, at bin resolution, between two histograms over the same bins."""
+    expected, actual = np.asarray(expected, dtype=np.float64), np.asarray(actual, dtype=np.float64)
+    if not expected.sum() or not actual.sum():
+        return 0.0
+    return float(np.abs(np.cumsum(expected) / expected.sum() - np.cumsum(actual) / actual.sum()).max())
+
+
+def field_histograms(binning, counts):
+    """Per-field histograms from the flat column counts.
+
+    Numeric fields keep their column's bins. A categorical field's one-hot
+    columns give its option counts: each option's hot column counts its
+    ones, and the all-zero option gets the remaining rows.
+    """
+    columns = dict(zip(FEATURE_COLUMNS, binning.columns(counts)))
+    histograms = {}
+    for field in binning.fields:
+        if field.kind == "numeric":
+            histograms[field.name] = columns[field.name]
+            continue
+        ones = {column: columns[column][2] for column in field.columns}
+        rows = columns[field.columns[0]].sum()
+        options = []
+        for row in field.table:
+            hot = np.flatnonzero(row)
+            options.append(ones[field.columns[hot[0]]] if len(hot) else rows - sum(ones.values()))
+        histograms[field.name] = np.array(options)
+    return histograms
+
+
+def compare(binning, reference, counts, psi_alert=PSI_ALERT, ks_alert=KS_ALERT, min_rows=MIN_ROWS):
+    """PSI, KS and alert flag per clinical field, for window ``counts`` against ``reference``.
+
+    For categorical fields KS is taken over the options in form order, i.e.
+    the largest shift in cumulative share.
+    """
+    expected = field_histograms(binning, reference)
+    actual = field_histograms(binning, counts)
+    rows = binning.rows(counts)
+    report = {}
+    for name in expected:
+        stats = {"psi": psi(expected[name], actual[name]), "ks": ks(expected[name], actual[name])}
+        stats["alert"] = rows >= min_rows and (stats["psi"] > psi_alert or stats["ks"] > ks_alert)
+        report[name] = stats
+    return report
+
+
+class DriftReference:
+    """The trusted population's histogram, and the bins it was counted in."""
+
+    def __init__(self, counts, binning=None, source=""):
+        self.binning = binning or Binning()
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self.source = source
+
+    @property
+    def rows(self):
+        return self.binning.rows(self.counts)
+
+    @classmethod
+    def from_features(cls, features, source=""):
+        binning = Binning()
+        return cls(binning.histogram(features), binning, source)
+
+    def save(self, path):
+        np.savez(path, counts=self.counts, low=self.binning.low, high=self.binning.high,
+                 n_bins=self.binning.n_bins, source=np.array(self.source))
+
+    @classmethod
+    def load(cls, path):
+        binning = Binning()
+        with np.load(path) as data:
+            if not (np.array_equal(data["n_bins"], binning.n_bins) and np.allclose(data["low"], binning.low)
+                    and np.allclose(data["high"], binning.high)):
+                raise ValueError(f"{path} was built with different bins; rebuild it with drift.py reference")
+            return cls(data["counts"], binning, str(data["source"]))
+
+
+class DriftMonitor:
+    """Feature drift of live traffic against a reference population.
+
+    ``observe`` adds a scored batch's encoded features to the current slot
+    of a ring of ``slots`` histograms covering the last ``window_seconds``:
+    one ``bincount`` and one vector add under a lock, so it can run inline
+    on every request. Memory is fixed at ``slots`` histograms of 150 counts
+    however much traffic arrives. Statistics are computed only when read.
+
+    Without a reference, the first full window of traffic becomes the
+    reference, so later windows are compared against how the app started.
+    """
+
+    def __init__(self, reference=None, window_seconds=DEFAULT_WINDOW_SECONDS, slots=DEFAULT_SLOTS,
+                 psi_alert=PSI_ALERT, ks_alert=KS_ALERT, min_rows=MIN_ROWS, clock=time.time):
+        self.binning = reference.binning if reference is not None else Binning()
+        self.reference = reference
+        self.window_seconds = window_seconds
+        self.slots = slots
+        self.psi_alert = psi_alert
+        self.ks_alert = ks_alert
+        self.min_rows = min_rows
+        self.clock = clock
+        self._counts = np.zeros((slots, self.binning.size), dtype=np.int64)
+        self._slot_seconds = window_seconds / slots
+        self._started = clock()
+        self._slot = int(self._started // self._slot_seconds)
+        self._lock = threading.Lock()
+        self.observed = 0
+
+    def observe(self, features):
+        histogram = self.binning.histogram(features)
+        with self._lock:
+            self._advance(self.clock())
+            self._counts[self._slot % self.slots] += histogram
+            self.observed += self.binning.rows(histogram)
+
+    def _advance(self, now):
+        slot = int(now // self._slot_seconds)
+        if slot <= self._slot:
+            return
+        if self.reference is None and now - self._started >= self.window_seconds:
+            window = self._counts.sum(axis=0)
+            if self.binning.rows(window) >= self.min_rows:
+                self.reference = DriftReference(window, self.binning, "first window of traffic")
+        # Clear the slots that have rotated out since the last observation
+        for expired in range(self._slot + 1, min(slot, self._slot + self.slots) + 1):
+            self._counts[expired % self.slots] = 0
+        self._slot = slot
+
+    def window(self):
+        """Counts for the last ``window_seconds``, as one flat histogram."""
+        with self._lock:
+            self._advance(self.clock())
+            return self._counts.sum(axis=0)
+
+    def report(self):
+        counts = self.window()
+        rows = self.binning.rows(counts)
+        summary = {"window_seconds": self.window_seconds, "window_rows": rows,
+                   "reference": self.reference.source if self.reference is not None else None,
+                   "fields": {}}
+        if self.reference is not None:
+            summary["fields"] = compare(self.binning, self.reference.counts, counts,
+                                        self.psi_alert, self.ks_alert, self.min_rows)
+        return summary
+
+    def alerts(self):
+        return [name for name, stats in self.report()["fields"].items() if stats["alert"]]
+
+    def collect(self):
+        # Scrape-time gauges, for metrics.add_collector
+        report = self.report()
+        fields = report["fields"].items()
+        return [
+            ("heart_drift_window_rows", "gauge", "Scored rows in the drift window", [({}, report["window_rows"])]),
+            ("heart_drift_psi", "gauge", "Population stability index of the window against the reference",
+             [({"field": name}, stats["psi"]) for name, stats in fields]),
+            ("heart_drift_ks", "gauge", "Kolmogorov-Smirnov distance of the window from the reference",
+             [({"field": name}, stats["ks"]) for name, stats in fields]),
+            ("heart_drift_alert", "gauge",
+             f"1 when a field's PSI exceeds {self.psi_alert} or KS exceeds {self.ks_alert}",
+             [({"field": name}, int(stats["alert"])) for name, stats in fields]),
+        ]
+
+
+def _load_reference(path=DEFAULT_REFERENCE_PATH):
+    if path and os.path.exists(path):
+        return DriftReference.load(path)
+    return None
+
+
+# Shared by every session in this process
+monitor = DriftMonitor(_load_reference())
+metrics.add_collector(monitor.collect)
+
+
+def _features_from(args):
+    # Encoded features of the valid rows of a file, or of a time range of the prediction log
+    if args.log:
+        from prediction_log import PredictionQueries, _parse_time
+
+        rows = PredictionQueries(args.log).query(_parse_time(args.since), _parse_time(args.until),
+                                                 columns=FEATURE_COLUMNS)
+        return rows.to_numpy(dtype=np.float32), f"{args.log} {args.since or ''}..{args.until or ''}"
+    from batch import read_table
+    from features import encode
+    from validation import validate
+
+    frame = read_table(args.input)
+    return encode(frame[validate(frame).valid]), args.input
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a drift reference, or compare data against one.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, help in (("reference", "histogram a trusted population (e.g. the training data)"),
+                       ("report", "PSI/KS per field against the reference; exits 1 on any alert")):
+        command = commands.add_parser(name, help=help)
+        command.add_argument("input", nargs="?", help="CSV or Parquet file with the 11 clinical fields")
+        command.add_argument("--log", help="use rows of this prediction log instead of a file")
+        command.add_argument("--since", help="with --log: start (unix seconds, ISO date, or 24h/7d ago)")
+        command.add_argument("--until", help="with --log: end, in the same forms")
+    commands.choices["reference"].add_argument("--output", "-o", default=DEFAULT_REFERENCE_PATH)
+    commands.choices["report"].add_argument("--reference", default=DEFAULT_REFERENCE_PATH)
+    args = parser.parse_args(argv)
+
+    if bool(args.input) == bool(args.log):
+        parser.error("give either an input file or --log")
+    features, source = _features_from(args)
+    if args.command == "reference":
+        reference = DriftReference.from_features(features, source)
+        reference.save(args.output)
+        print(f"Wrote {args.output} from {reference.rows} rows of {source}", file=sys.stderr)
+        return 0
+
+    reference = _load_reference(args.reference)
+    if reference is None:
+        parser.error(f"reference not found: {args.reference}")
+    report = compare(reference.binning, reference.counts, reference.binning.histogram(features))
+    print(json.dumps({"reference": reference.source, "rows": len(features), "fields": report}, indent=2))
+    for name, stats in report.items():
+        flag = "  ALERT" if stats["alert"] else ""
+        print(f"{name:>15}: psi {stats['psi']:.3f}  ks {stats['ks']:.3f}{flag}", file=sys.stderr)
+    return 1 if any(stats["alert"] for stats in report.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
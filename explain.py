@@ -0,0 +1,152 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+import numpy as np
+
+from features import FEATURE_COLUMNS, FIELDS
+from model_registry import DEFAULT_MODEL_PATH, registry
+
+
+DEFAULT_MAXSIZE = 4096
+
+# Column j of the booster's contributions belongs to field GROUPS[j]; the last column is the bias
+GROUP_NAMES = tuple(field.name for field in FIELDS)
+GROUPS = np.zeros((len(FEATURE_COLUMNS) + 1, len(FIELDS)), dtype=np.float32)
+for _i, _field in enumerate(FIELDS):
+    for _column in _field.columns:
+        GROUPS[FEATURE_COLUMNS.index(_column), _i] = 1.0
+
+
+class Explanation(NamedTuple):
+    """Per-field contributions to each row's log-odds of heart disease.
+
+    ``contributions[i, j]`` is how much field ``names[j]`` moved row ``i``
+    away from ``base_value``; ``base_value + contributions.sum(axis=1)`` is
+    the model's margin, so ``1 / (1 + exp(-margin))`` is P(heart disease).
+    """
+
+    names: tuple
+    base_value: np.ndarray
+    contributions: np.ndarray
+
+    def top(self, row=0, k=None):
+        # [(field name, contribution)] for one row, largest effect first
+        order = np.argsort(-np.abs(self.contributions[row]), kind="stable")[:k]
+        return [(self.names[j], float(self.contributions[row, j])) for j in order]
+
+
+def _booster(model, path):
+    if hasattr(model, "get_booster"):
+        return model.get_booster()
+    # A memory-mapped artifact has no booster of its own; read the native one alongside it
+    from artifact import load_booster
+
+    return load_booster(path).get_booster()
+
+
+class Explainer:
+    """Explains predictions with XGBoost's tree-path (TreeSHAP) contributions.
+
+    The booster scores the 15 encoded columns in one vectorized call; a
+    single matrix product then sums each field's one-hot columns back into
+    that field. Explained rows are cached per (model version, encoded row)
+    and the cache is cleared whenever the registry reloads the model.
+
+    ``approximate=True`` uses the cheaper per-path (Saabas) attribution,
+    about 25x faster for large batches.
+    """
+
+    def __init__(self, model_path=DEFAULT_MODEL_PATH, approximate=False, maxsize=DEFAULT_MAXSIZE):
+        self.model_path = model_path
+        self.approximate = approximate
+        self.maxsize = maxsize
+        self._boosters = {}
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def booster(self):
+        entry = registry.entry(self.model_path)
+        booster = self._boosters.get(entry.version)
+        if booster is None:
+            booster = _booster(entry.model, entry.path)
+            self._boosters = {entry.version: booster}
+        return entry.version, booster
+
+    def contributions(self, features):
+        """Raw (n, 16) per-column contributions; the last column is the bias."""
+        import xgboost
+
+        _, booster = self.booster()
+        matrix = xgboost.DMatrix(features, feature_names=list(FEATURE_COLUMNS))
+        return booster.predict(matrix, pred_contribs=True, approx_contribs=self.approximate)
+
+    def explain(self, features):
+        """Explain a (15,) or (n, 15) encoded feature matrix."""
+        features = np.ascontiguousarray(features, dtype=np.float32)
+        if features.ndim == 1:
+            features = features.reshape(1, -1)
+
+        version, _ = self.booster()
+        keys = [(version, self.approximate, row.tobytes()) for row in features]
+        rows = [None] * len(keys)
+        with self._lock:
+            for i, key in enumerate(keys):
+                row = self._cache.get(key)
+                if row is not None:
+                    self._cache.move_to_end(key)
+                    rows[i] = row
+        missing = [i for i, row in enumerate(rows) if row is None]
+        self.hits += len(rows) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            raw = self.contributions(features[missing])
+            # One product groups every row: one-hot columns sum into their field
+            grouped = np.empty((len(missing), len(GROUP_NAMES) + 1), dtype=np.float32)
+            grouped[:, :-1] = raw @ GROUPS
+            grouped[:, -1] = raw[:, -1]
+            with self._lock:
+                for j, i in enumerate(missing):
+                    rows[i] = grouped[j]
+                    self._cache[keys[i]] = grouped[j]
+                while len(self._cache) > self.maxsize:
+                    self._cache.popitem(last=False)
+
+        table = np.stack(rows)
+        return Explanation(GROUP_NAMES, table[:, -1], table[:, :-1])
+
+    def clear(self, *args):
+        # Also used as a registry listener
+        with self._lock:
+            self._cache.clear()
+            self._boosters = {}
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"size": len(self._cache), "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+_explainers = {}
+_explainers_lock = threading.Lock()
+
+
+def get_explainer(model_path=DEFAULT_MODEL_PATH, approximate=False):
+    # One explainer (and cache) per model and method, shared by every session in this process
+    key = (os.path.abspath(model_path), approximate)
+    explainer = _explainers.get(key)
+    if explainer is None:
+        with _explainers_lock:
+            explainer = _explainers.get(key)
+            if explainer is None:
+                explainer = _explainers[key] = Explainer(model_path, approximate)
+                registry.add_listener(explainer.clear)
+    return explainer
+
+
+def explain(features, model_path=DEFAULT_MODEL_PATH, approximate=False):
+    return get_explainer(model_path, approximate).explain(features)
@@ -0,0 +1,238 @@
+import numbers
+
+import numpy as np
+
+
+class NumericField:
+    """A numeric clinical input that is passed to the model as a single column.
+
+    ``min_value``/``max_value`` bound the form widget; ``valid_range`` is the
+    physiologically plausible range that validation accepts (defaults to the
+    widget bounds).
+    """
+
+    kind = "numeric"
+
+    def __init__(self, name, label, min_value, max_value, default, help=None, valid_range=None):
+        self.name = name
+        self.label = label
+        self.min_value = min_value
+        self.max_value = max_value
+        self.default = default
+        self.help = help
+        self.valid_min, self.valid_max = valid_range or (min_value, max_value)
+        self.columns = (name,)
+
+
+class CategoricalField:
+    """A categorical clinical input and the one-hot columns it expands into.
+
+    ``options`` are the labels shown in the form, in widget order, and
+    ``encoding`` maps each option to its values for ``columns``. ``aliases``
+    maps other spellings (e.g. the dataset codes "M"/"F") onto an option.
+    """
+
+    kind = "categorical"
+
+    def __init__(self, name, label, options, columns, encoding, aliases=None, help=None):
+        self.name = name
+        self.label = label
+        self.options = tuple(options)
+        self.columns = tuple(columns)
+        self.default = self.options[0]
+        self.help = help
+
+        # Lookup table: row i holds the encoded columns for options[i]
+        self.table = np.array([encoding[option] for option in self.options], dtype=np.float32)
+        self.rows = self.table.tolist()
+
+        # Exact spellings (form labels, aliases) skip normalization
+        self.exact = {option: i for i, option in enumerate(self.options)}
+        self.exact.update({alias: self.options.index(option) for alias, option in (aliases or {}).items()})
+
+        self._index = {}
+        for i, option in enumerate(self.options):
+            self._index[_normalize(option)] = i
+        for alias, option in (aliases or {}).items():
+            self._index[_normalize(alias)] = self.options.index(option)
+
+    def is_known(self, value):
+        try:
+            return _normalize(value) in self._index
+        except TypeError:
+            return False
+
+    def index_of(self, value):
+        try:
+            return self._index[_normalize(value)]
+        except (KeyError, TypeError):
+            raise ValueError(f"{self.name}: unknown category {value!r}; "
+                             f"expected one of {list(self.options)}") from None
+
+    def indices(self, values):
+        # Map a column of raw values to option indices, looking up each distinct value once
+        import pandas as pd
+
+        if not hasattr(values, "dtype"):
+            values = np.asarray(values, dtype=object)
+        codes, uniques = pd.factorize(values, use_na_sentinel=True)
+        if len(codes) and codes.min() < 0:
+            raise ValueError(f"{self.name}: missing value")
+        lookup = np.fromiter((self.index_of(u) for u in uniques), dtype=np.intp, count=len(uniques))
+        return lookup[codes]
+
+
+def _normalize(value):
+    # "Male", " male", "M", 1, 1.0 and "1" should all find the same option
+    if isinstance(value, numbers.Number) and not isinstance(value, bool):
+        if float(value).is_integer():
+            value = int(value)
+    return str(value).strip().lower()
+
+
+# Clinical inputs in the column order the pickled model was trained on
+FIELDS = (
+    NumericField("Age", "Age", 1, 90, 48,
+                 help="Enter patient's age (1-90)", valid_range=(1, 120)),
+    NumericField("RestingBP", "Resting Blood Pressure", 0, 200, 140,
+                 help="Resting blood pressure in mm Hg", valid_range=(50, 250)),
+    NumericField("Cholesterol", "Cholesterol Level", 0, 510, 228,
+                 help="Serum cholesterol in mg/dl", valid_range=(50, 700)),
+    CategoricalField("FastingBS", "Fasting Blood Sugar",
+                     options=["Greater Than 120 mg/dl", "Less Than 120 mg/dl"],
+                     columns=["FastingBS"],
+                     encoding={"Greater Than 120 mg/dl": (1,), "Less Than 120 mg/dl": (0,)},
+                     aliases={1: "Greater Than 120 mg/dl", 0: "Less Than 120 mg/dl"},
+                     help="Fasting blood sugar level"),
+    NumericField("MaxHR", "Max Heart Rate", 0, 200, 100,
+                 help="Maximum heart rate achieved during exercise", valid_range=(40, 220)),
+    NumericField("Oldpeak", "ST Depression (Old Peak)", -3.0, 4.5, 2.5,
+                 help="ST depression induced by exercise relative to rest", valid_range=(-5.0, 10.0)),
+    CategoricalField("Sex", "Gender",
+                     options=["Male", "Female"],
+                     columns=["Sex_M"],
+                     encoding={"Male": (1,), "Female": (0,)},
+                     aliases={"M": "Male", "F": "Female"}),
+    CategoricalField("ChestPainType", "Chest Pain Type",
+                     options=["Typical Angina", "Atypical Angina", "Non-anginal Pain", "Asymptomatic"],
+                     columns=["ChestPainType_ATA", "ChestPainType_NAP", "ChestPainType_TA"],
+                     encoding={"Typical Angina": (0, 0, 1),
+                               "Atypical Angina": (1, 0, 0),
+                               "Non-anginal Pain": (0, 1, 0),
+                               "Asymptomatic": (0, 0, 0)},
+                     aliases={"TA": "Typical Angina", "ATA": "Atypical Angina",
+                              "NAP": "Non-anginal Pain", "ASY": "Asymptomatic"},
+                     help="Type of chest pain experienced"),
+    CategoricalField("RestingECG", "ECG Results",
+                     options=["Normal", "ST", "LVH"],
+                     columns=["RestingECG_Normal", "RestingECG_ST"],
+                     encoding={"Normal": (1, 0), "ST": (0, 1), "LVH": (0, 0)},
+                     help="Electrocardiogram results"),
+    CategoricalField("ExerciseAngina", "Exercise-Induced Angina",
+                     options=["No", "Yes"],
+                     columns=["ExerciseAngina_Y"],
+                     encoding={"No": (0,), "Yes": (1,)},
+                     aliases={"N": "No", "Y": "Yes"},
+                     help="Angina induced by exercise"),
+    CategoricalField("ST_Slope", "ST Slope",
+                     options=["Up", "Flat", "Down"],
+                     columns=["ST_Slope_Flat", "ST_Slope_Up"],
+                     encoding={"Up": (0, 1), "Flat": (1, 0), "Down": (0, 0)},
+                     help="Slope of the peak exercise ST segment"),
+)
+
+FIELD_NAMES = tuple(field.name for field in FIELDS)
+FIELDS_BY_NAME = {field.name: field for field in FIELDS}
+
+# Must match the pickled booster's feature_names
+FEATURE_COLUMNS = tuple(column for field in FIELDS for column in field.columns)
+
+
+class FeatureEncoder:
+    """Encodes clinical inputs into the float32 matrix the model expects.
+
+    Input is a mapping (dict or DataFrame) from field name to either a scalar
+    or a 1-D column of values. Categorical columns are mapped through
+    precomputed lookup tables, so there is no Python loop per row.
+    """
+
+    def __init__(self, fields=FIELDS):
+        self.fields = tuple(fields)
+        self.columns = tuple(column for field in self.fields for column in field.columns)
+        self._slices = []
+        start = 0
+        for field in self.fields:
+            self._slices.append(slice(start, start + len(field.columns)))
+            start += len(field.columns)
+
+    def allocate(self, n_rows):
+        return np.empty((n_rows, len(self.columns)), dtype=np.float32)
+
+    def encode(self, data, out=None):
+        n_rows = _n_rows(data)
+        if out is None:
+            out = self.allocate(n_rows)
+        else:
+            out = out[:n_rows]
+
+        for field, columns in zip(self.fields, self._slices):
+            try:
+                values = data[field.name]
+            except KeyError:
+                raise ValueError(f"missing input field {field.name!r}") from None
+
+            if field.kind == "numeric":
+                out[:, columns.start] = np.asarray(values, dtype=np.float32)
+            elif np.ndim(values) == 0:
+                out[:, columns] = field.table[field.index_of(values)]
+            else:
+                out[:, columns] = field.table[field.indices(values)]
+        return out
+
+
+def _n_rows(data):
+    if hasattr(data, "shape") and hasattr(data, "columns"):
+        return len(data)  # DataFrame
+    for value in data.values():
+        if np.ndim(value) > 0:
+            return len(value)
+    return 1
+
+
+encoder = FeatureEncoder()
+
+_SCALARS = (int, float, str, np.number)
+
+
+def encode(data, out=None):
+    return encoder.encode(data, out)
+
+
+def encode_record(record):
+    """Encode one patient (e.g. a form submission) into a (1, 15) matrix.
+
+    A dict of scalars is built as one list and converted once, which is much
+    cheaper than the column encoder for a single row; anything else (columns,
+    a DataFrame) goes through the encoder.
+    """
+    row = []
+    for field in FIELDS:
+        try:
+            value = record[field.name]
+        except KeyError:
+            raise ValueError(f"missing input field {field.name!r}") from None
+        if not isinstance(value, _SCALARS):
+            return encoder.encode(record)
+        if field.kind == "numeric":
+            row.append(float(value))
+        else:
+            # True == 1, so a bool would find the alias 1; leave it to index_of, which rejects it
+            index = None if isinstance(value, bool) else field.exact.get(value)
+            row.extend(field.rows[field.index_of(value) if index is None else index])
+    return np.array([row], dtype=np.float32)
+
+
+def encode_records(records):
+    records = list(records)
+    columns = {name: [record[name] for record in records] for name in FIELD_NAMES}
+    return encoder.encode(columns)
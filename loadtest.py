@@ -0,0 +1,394 @@
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import threading
+import subprocess
+from urllib.request import urlopen
+
+import numpy as np
+
+from features import FIELDS
+
+
+DEFAULT_URL = "http://127.0.0.1:8501"
+PERCENTILES = (50, 90, 95, 99)
+# Client-side limit on one Predict round trip; the app's own limit is HEART_PREDICTION_TIMEOUT
+DEFAULT_REQUEST_TIMEOUT = 60.0
+DISTRIBUTIONS = ("uniform", "clinical", "pool")
+
+
+def patient_sampler(distribution="uniform", seed=0, invalid_rate=0.0, pool_size=50):
+    """A function returning random form inputs, one patient per call.
+
+    ``uniform`` draws every input evenly over what the form accepts;
+    ``clinical`` centres numeric inputs on the form defaults (sd = a sixth
+    of the range); ``pool`` repeats a fixed set of ``pool_size`` uniform
+    patients, like clinicians re-checking the same cases (cache hits). A
+    share ``invalid_rate`` get Cholesterol 0, which the form rejects.
+    """
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f"unknown distribution {distribution!r}; expected one of {DISTRIBUTIONS}")
+    rng = np.random.default_rng(seed)
+
+    def draw(centred):
+        patient = {}
+        for field in FIELDS:
+            if field.kind == "categorical":
+                patient[field.name] = field.options[rng.integers(len(field.options))]
+                continue
+            low, high = max(field.min_value, field.valid_min), min(field.max_value, field.valid_max)
+            value = rng.normal(field.default, (high - low) / 6) if centred else rng.uniform(low, high)
+            value = float(np.clip(value, low, high))
+            patient[field.name] = round(value, 1) if isinstance(field.min_value, float) else int(round(value))
+        return patient
+
+    pool = [draw(False) for _ in range(pool_size)] if distribution == "pool" else None
+
+    def sample():
+        if pool is not None:
+            patient = dict(pool[rng.integers(len(pool))])
+        else:
+            patient = draw(distribution == "clinical")
+        if invalid_rate and rng.random() < invalid_rate:
+            patient["Cholesterol"] = 0
+        return patient
+
+    return sample
+
+
+def _proc_sample(pid):
+    # (cpu seconds, rss bytes) of one process, read from /proc
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    with open(f"/proc/{pid}/statm") as f:
+        rss_pages = int(f.read().split()[1])
+    ticks = os.sysconf("SC_CLK_TCK")
+    return (int(fields[11]) + int(fields[12])) / ticks, rss_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+class ProcessSampler:
+    """Samples CPU and RSS of the named processes every ``interval`` seconds from /proc.
+
+    ``cpu_percent`` is CPU time over wall time since the previous sample, so
+    a process busy on two cores reads 200%.
+    """
+
+    def __init__(self, pids, interval=1.0):
+        self.pids = dict(pids)
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="process-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        previous = {}
+        start = time.monotonic()
+        while True:
+            now = time.monotonic()
+            for name, pid in self.pids.items():
+                try:
+                    cpu, rss = _proc_sample(pid)
+                except (OSError, ValueError, IndexError):
+                    continue
+                if name in previous:
+                    last_time, last_cpu = previous[name]
+                    self.samples.append({"t": now - start, "process": name,
+                                         "cpu_percent": 100 * (cpu - last_cpu) / max(now - last_time, 1e-9),
+                                         "rss_bytes": rss})
+                previous[name] = (now, cpu)
+            if self._stop.wait(self.interval):
+                break
+
+    def summary(self):
+        summary = {}
+        for name in self.pids:
+            samples = [s for s in self.samples if s["process"] == name]
+            if samples:
+                cpu = [s["cpu_percent"] for s in samples]
+                summary[name] = {"cpu_percent_mean": float(np.mean(cpu)), "cpu_percent_max": float(np.max(cpu)),
+                                 "rss_bytes_max": max(s["rss_bytes"] for s in samples)}
+        return summary
+
+
+class AppSession:
+    """One simulated clinician: a websocket session with the Streamlit app.
+
+    Speaks the same protocol as the browser: each interaction is a rerun
+    request carrying every widget's value, answered by the elements the
+    script draws and a final "script finished" message. Widget ids are
+    learnt from the first page load, so nothing about them is hard-coded.
+    """
+
+    def __init__(self, url=DEFAULT_URL):
+        self.url = url.rstrip("/").replace("http", "ws", 1) + "/_stcore/stream"
+        self.widgets = {}
+        self._ws = None
+
+    async def open(self):
+        """Connect and load the page; returns the page load time in seconds."""
+        from websockets.asyncio.client import connect
+
+        self._ws = await connect(self.url, subprotocols=["streamlit"], max_size=None)
+        start = time.perf_counter()
+        await self._rerun([])
+        return time.perf_counter() - start
+
+    async def predict(self, patient):
+        """Fill in the form with ``patient`` and press Predict; returns (seconds, outcome).
+
+        The outcome is "ok" when the prediction is shown, "rejected" when
+        validation refused the inputs, "timeout" when the app gave up
+        waiting for the model, and "error" when the script raised.
+        """
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        by_label = {field.label: field.name for field in FIELDS}
+        states = []
+        for label, (kind, widget_id) in self.widgets.items():
+            if label in by_label:
+                value = patient[by_label[label]]
+                if kind == "number_input":
+                    states.append(WidgetState(id=widget_id, double_value=float(value)))
+                else:
+                    states.append(WidgetState(id=widget_id, string_value=str(value)))
+            elif kind == "button" and label.startswith("Predict"):
+                states.append(WidgetState(id=widget_id, trigger_value=True))
+        start = time.perf_counter()
+        outcome = await self._rerun(states)
+        return time.perf_counter() - start, outcome
+
+    async def _rerun(self, states):
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        message = BackMsg()
+        message.rerun_script.query_string = ""
+        message.rerun_script.widget_states.widgets.extend(states)
+        await self._ws.send(message.SerializeToString())
+
+        outcome = None
+        while True:
+            reply = ForwardMsg()
+            reply.ParseFromString(await self._ws.recv())
+            kind = reply.WhichOneof("type")
+            if kind == "script_finished":
+                return outcome or "finished"
+            if kind != "delta" or reply.delta.WhichOneof("type") != "new_element":
+                continue
+            element = reply.delta.new_element
+            element_kind = element.WhichOneof("type")
+            body = getattr(element, element_kind)
+            if getattr(body, "id", ""):
+                self.widgets[body.label] = (element_kind, body.id)
+            if element_kind == "markdown" and 'class="prediction-display"' in body.body:
+                outcome = "ok"
+            elif element_kind == "alert" and "Please check these inputs" in body.body:
+                outcome = outcome or "rejected"
+            elif element_kind == "alert" and "longer than expected" in body.body:
+                outcome = "timeout"
+            elif element_kind == "exception":
+                outcome = "error"
+
+    async def close(self):
+        if self._ws is not None:
+            await self._ws.close()
+
+
+def _latency_summary(seconds):
+    if not seconds:
+        return {"count": 0}
+    ms = np.array(seconds) * 1000
+    summary = {"count": len(ms), "mean": float(ms.mean()), "max": float(ms.max())}
+    summary.update({f"p{p}": float(np.percentile(ms, p)) for p in PERCENTILES})
+    return summary
+
+
+async def _clinician(url, sample, think_time, ramp_delay, deadline, results, rng, timeout):
+    await asyncio.sleep(ramp_delay)
+    session = AppSession(url)
+    try:
+        results.append((time.monotonic(), "page_load", await asyncio.wait_for(session.open(), timeout), "ok"))
+        while True:
+            if think_time:
+                await asyncio.sleep(rng.exponential(think_time))
+            if time.monotonic() >= deadline:
+                break
+            try:
+                seconds, outcome = await asyncio.wait_for(session.predict(sample()), timeout)
+            except asyncio.TimeoutError:
+                # The session's stream is now out of step; start a fresh one
+                results.append((time.monotonic(), "predict", timeout, "timeout"))
+                await session.close()
+                session = AppSession(url)
+                await session.open()
+                continue
+            results.append((time.monotonic(), "predict", seconds, outcome))
+    except Exception as e:
+        results.append((time.monotonic(), "predict", 0.0, f"error: {type(e).__name__}: {e}"))
+    finally:
+        await session.close()
+
+
+def run_load(url=DEFAULT_URL, concurrency=4, duration=30.0, think_time=2.0, distribution="uniform",
+             ramp=None, seed=0, pids=None, sample_interval=1.0, invalid_rate=0.0,
+             timeout=DEFAULT_REQUEST_TIMEOUT):
+    """Drive ``concurrency`` simultaneous sessions against the app for ``duration`` seconds.
+
+    Sessions start spread over ``ramp`` seconds (default: a tenth of the
+    duration) and each waits an exponentially distributed think time (mean
+    ``think_time``) before every Predict. Throughput counts Predict round
+    trips that finished after the ramp. ``pids`` maps names to processes
+    whose CPU and RSS are sampled throughout; this process is always
+    included as "loadtest", to show the client was not the bottleneck.
+    """
+    ramp = duration / 10 if ramp is None else ramp
+    sampler = ProcessSampler({"loadtest": os.getpid(), **(pids or {})}, sample_interval).start()
+    results = []
+    start = time.monotonic()
+    deadline = start + duration
+
+    async def main():
+        rng = np.random.default_rng(seed)
+        await asyncio.gather(*[
+            _clinician(url, patient_sampler(distribution, seed + i, invalid_rate), think_time,
+                       ramp * i / max(concurrency, 1), deadline, results,
+                       np.random.default_rng(rng.integers(1 << 31)), timeout)
+            for i in range(concurrency)])
+
+    asyncio.run(main())
+    elapsed = time.monotonic() - start
+    sampler.stop()
+
+    predicts = [r for r in results if r[1] == "predict"]
+    steady = [r for r in predicts if r[0] >= start + ramp]
+    outcomes = {}
+    for _, _, _, outcome in predicts:
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    timeline = []
+    for second in range(int(np.ceil(elapsed))):
+        window = [r for r in predicts if second <= r[0] - start < second + 1]
+        point = {"t": second, "predictions": len(window),
+                 "p95_ms": float(np.percentile([r[2] for r in window], 95) * 1000) if window else None}
+        for sample in sampler.samples:
+            if second <= sample["t"] < second + 1:
+                point[f"{sample['process']}_cpu_percent"] = sample["cpu_percent"]
+                point[f"{sample['process']}_rss_bytes"] = sample["rss_bytes"]
+        timeline.append(point)
+
+    return {
+        "url": url,
+        "concurrency": concurrency,
+        "duration_s": elapsed,
+        "ramp_s": ramp,
+        "think_time_s": think_time,
+        "distribution": distribution,
+        "outcomes": outcomes,
+        "throughput_per_s": len(steady) / max(elapsed - ramp, 1e-9),
+        "predict_latency_ms": _latency_summary([r[2] for r in predicts if r[3] in ("ok", "rejected")]),
+        "page_load_ms": _latency_summary([r[2] for r in results if r[1] == "page_load"]),
+        "processes": sampler.summary(),
+        "timeline": timeline,
+    }
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_app(port=None, env=None, timeout=60.0):
+    """Start ``streamlit run main.py`` headless on a local port; returns (process, url)."""
+    port = port or _free_port()
+    command = [sys.executable, "-m", "streamlit", "run", "main.py", "--server.headless", "true",
+               "--server.port", str(port), "--browser.gatherUsageStats", "false"]
+    process = subprocess.Popen(command, cwd=os.path.dirname(os.path.abspath(__file__)),
+                               env={**os.environ, **(env or {})},
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"streamlit exited with status {process.returncode}")
+        try:
+            with urlopen(f"{url}/_stcore/health", timeout=1) as response:
+                if response.status == 200:
+                    return process, url
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"streamlit did not become healthy within {timeout:.0f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Simulate concurrent clinicians using the Streamlit app and report latency and load.")
+    parser.add_argument("--url", default=None, help=f"running app to test (default {DEFAULT_URL})")
+    parser.add_argument("--start", action="store_true",
+                        help="start `streamlit run main.py` on a free local port for the test, and sample it")
+    parser.add_argument("--pid", type=int, default=None, help="with --url, the app's process id to sample")
+    parser.add_argument("--concurrency", type=lambda s: [int(x) for x in s.split(",")], default=[4],
+                        metavar="N[,N...]", help="simultaneous sessions; a list runs one step per value")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds per step")
+    parser.add_argument("--think-time", type=float, default=2.0,
+                        help="mean seconds a clinician waits between predictions (0 = back to back)")
+    parser.add_argument("--ramp", type=float, default=None, help="seconds over which sessions start")
+    parser.add_argument("--distribution", choices=DISTRIBUTIONS, default="uniform",
+                        help="how form inputs are drawn (see patient_sampler)")
+    parser.add_argument("--invalid-rate", type=float, default=0.0, help="share of submissions the form rejects")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="seconds between CPU/RSS samples")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", "-o", help="write the full report, timelines included, as JSON")
+    args = parser.parse_args(argv)
+
+    if args.start and args.url:
+        parser.error("give either --start or --url")
+    process = None
+    url, pids = args.url or DEFAULT_URL, {}
+    if args.start:
+        process, url = start_app()
+        pids["app"] = process.pid
+    elif args.pid:
+        pids["app"] = args.pid
+
+    reports = []
+    try:
+        for concurrency in args.concurrency:
+            report = run_load(url, concurrency, args.duration, args.think_time, args.distribution, args.ramp,
+                              args.seed, pids, args.sample_interval, args.invalid_rate)
+            reports.append(report)
+            latency, app = report["predict_latency_ms"], report["processes"].get("app", {})
+            print(f"{concurrency:>4} sessions: {report['throughput_per_s']:7.2f} predictions/s  "
+                  + (f"p50 {latency['p50']:7.1f} ms  p95 {latency['p95']:7.1f} ms  p99 {latency['p99']:7.1f} ms"
+                     if latency["count"] else "no completed predictions")
+                  + (f"  app cpu {app['cpu_percent_mean']:5.1f}%  rss {app['rss_bytes_max'] / 2 ** 20:6.0f} MB"
+                     if app else "")
+                  + f"  {report['outcomes']}", file=sys.stderr)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(reports, f, indent=2)
+    else:
+        print(json.dumps([{k: v for k, v in r.items() if k != "timeline"} for r in reports], indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,33 @@
-import re
-from time import sleep
-import pandas as pd
-import numpy as np
+import logging
 import os
-import base64
-from io import BytesIO
+import uuid
+from concurrent.futures import CancelledError, TimeoutError
 
 import streamlit as st
-from streamlit.components.v1 import html
 import warnings
 
+from assets import get_base64_image, get_stylesheet
+from async_predict import DEFAULT_TIMEOUT, pending, predict_async, submit
+from drift import monitor
+from explain import explain
+from features import FIELDS, FIELDS_BY_NAME, encode_record
+from metrics import record_request, span, start_metrics_server
+from model_registry import DEFAULT_MODEL_PATH, get_model
+from prediction_log import log_prediction
+from rollout import get_router
+from timing import StageTimer
+from tree_engine import preload, scoring_version
+from validation import validate
+
+logger = logging.getLogger(__name__)
+
+# Start loading the model (and importing xgboost, or building the risk table) while the first page renders
+preload(DEFAULT_MODEL_PATH)
+
+# Serve Prometheus metrics on this port when set; started once per process
+if os.environ.get("HEART_METRICS_PORT"):
+    start_metrics_server(int(os.environ["HEART_METRICS_PORT"]))
+
 
 def run():
     st.set_page_config(
@@ -21,413 +39,15 @@ def run():
 
     warnings.simplefilter(action='ignore', category=FutureWarning)
 
-    # Function To Load Our Dataset
-    @st.cache_data
-    def load_model(model_path):
-        return pd.read_pickle(model_path)
-    
-    # Function to get base64 encoded images
-    def get_base64_image(image_name):
-        # Create 'imgs' directory if it doesn't exist
-        os.makedirs('imgs', exist_ok=True)
-        
-        # Define paths to image files
-        image_path = f"imgs/{image_name}"
-        
-        # Check if image exists, if not create placeholder images
-        if not os.path.exists(image_path):
-            # Create placeholder images using BytesIO
-            img = BytesIO()
-            
-            if image_name == "heart.png":
-                # Create a simple heart icon (for healthy heart)
-                from PIL import Image, ImageDraw
-                image = Image.new('RGBA', (65, 65), (0, 0, 0, 0))
-                draw = ImageDraw.Draw(image)
-                # Draw a green heart
-                draw.polygon([(32, 15), (20, 10), (10, 20), (10, 35), (32, 55), (54, 35), (54, 20), (44, 10), (32, 15)], 
-                           fill=(76, 175, 80, 255))  # Green color
-                image.save(img, format='PNG')
-                
-            elif image_name == "hearted.png":
-                # Create a simple broken heart icon
-                from PIL import Image, ImageDraw
-                image = Image.new('RGBA', (65, 65), (0, 0, 0, 0))
-                draw = ImageDraw.Draw(image)
-                # Draw a red heart with a crack
-                draw.polygon([(32, 15), (20, 10), (10, 20), (10, 35), (32, 55), (54, 35), (54, 20), (44, 10), (32, 15)], 
-                           fill=(255, 53, 71, 255))  # Red color
-                # Draw a crack in the heart
-                draw.line([(32, 15), (32, 55)], fill=(255, 255, 255, 200), width=3)
-                image.save(img, format='PNG')
-            
-            img.seek(0)
-            img_bytes = img.getvalue()
-            
-            # Save the generated image
-            with open(image_path, 'wb') as f:
-                f.write(img_bytes)
-                
-            encoded = base64.b64encode(img_bytes).decode()
-        else:
-            # Load existing image file
-            with open(image_path, "rb") as f:
-                encoded = base64.b64encode(f.read()).decode()
-                
-        return f"data:image/png;base64,{encoded}"
-    
-    # Get base64 encoded images
+    # Images and stylesheet are built once per process, not on every rerun
     heart_healthy_img = get_base64_image("heart.png")
     heart_disease_img = get_base64_image("hearted.png")
 
-    model = pd.read_pickle("xgboost_heart_disease_detection_v1.pkl")
-
     # Adding custom CSS with animations and improved visuals
-    st.markdown(
-        """
-    <style>
-        /* Base styling */
-        .main {
-            text-align: center;
-            background-color: #0a0a0a;
-            color: #f0f0f0;
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-        }
-        
-        /* Credit styling */
-        .creator-credit {
-            font-size: 1.2rem;
-            text-align: center;
-            margin-top: -10px;
-            margin-bottom: 20px;
-            animation: colorCycle 4s infinite alternate;
-            font-weight: 500;
-            letter-spacing: 1px;
-            text-shadow: 0 0 5px rgba(255, 255, 255, 0.5);
-        }
-        
-        @keyframes colorCycle {
-            0% { color: #ff3547; text-shadow: 0 0 8px rgba(255, 53, 71, 0.7); }
-            33% { color: #4da6ff; text-shadow: 0 0 8px rgba(77, 166, 255, 0.7); }
-            66% { color: #ff9d47; text-shadow: 0 0 8px rgba(255, 157, 71, 0.7); }
-            100% { color: #ff3547; text-shadow: 0 0 8px rgba(255, 53, 71, 0.7); }
-        }
-        
-        /* Header styling with glowing animation */
-        .glowing-title {
-            font-size: 3.2rem;
-            font-weight: bold;
-            text-align: center;
-            color: #ffffff;
-            text-shadow: 0 0 10px #ff3547, 0 0 20px #ff3547, 0 0 30px #ff3547;
-            animation: glow 1.5s ease-in-out infinite alternate;
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            margin-top: 5px;
-        }
-        
-        @keyframes glow {
-            from {
-                text-shadow: 0 0 5px #ff3547, 0 0 10px #ff3547;
-            }
-            to {
-                text-shadow: 0 0 10px #ff3547, 0 0 20px #ff3547, 0 0 30px #ff3547;
-            }
-        }
-        
-        /* Card styling */
-        .card {
-            background: #111111;
-            border-radius: 15px;
-            padding: 20px;
-            box-shadow: 0 4px 15px rgba(0, 0, 0, 0.5);
-            transition: all 0.3s ease;
-            margin-bottom: 20px;
-            border: 1px solid #333;
-        }
-        
-        .card:hover {
-            transform: translateY(-5px);
-            box-shadow: 0 7px 25px rgba(255, 53, 71, 0.15);
-        }
-        
-        /* Form styling */
-        h3 {
-            font-size: 25px;
-            color: #e0e0e0;
-            margin-bottom: 15px;
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-        }   
-        
-        .st-emotion-cache-16txtl3 h1 {
-            font: bold 29px 'Segoe UI', sans-serif;
-            text-align: center;
-            margin-bottom: 15px;
-            color: #ffffff;
-        }
-        
-        /* Sidebar styling */
-        div[data-testid=stSidebarContent] {
-            background-color: #151f30;
-            border-right: 4px solid #1c2840;
-            padding: 8px!important;
-        }
-
-        div.block-containers {
-            padding-top: 0.5rem;
-        }
-
-        .st-emotion-cache-z5fcl4 {
-            padding-top: 0.5rem;
-            padding-bottom: 1rem;
-            padding-left: 1.1rem;
-            padding-right: 2.2rem;
-            overflow-x: hidden;
-        }
-
-        .st-emotion-cache-16txtl3 {
-            padding: 1.5rem 0.6rem;
-        }
-
-        /* Plot container styling */
-        .plot-container.plotly {
-            border: 1px solid #2a3950;
-            border-radius: 12px;
-            transition: all 0.3s ease;
-        }
-        
-        .plot-container.plotly:hover {
-            box-shadow: 0 0 15px rgba(255, 53, 71, 0.3);
-        }
-
-        div.st-emotion-cache-1r6slb0 span.st-emotion-cache-10trblm {
-            font: bold 24px 'Segoe UI', sans-serif;
-        }
-        
-        /* Image styling */
-        div[data-testid=stImage] {
-            text-align: center;
-            display: block;
-            margin-left: auto;
-            margin-right: auto;
-            width: 100%;
-            transition: transform 0.3s ease;
-        }
-        
-        div[data-testid=stImage]:hover {
-            transform: scale(1.05);
-        }
-
-        /* Form elements styling - improved visibility */
-        div[data-baseweb=select]>div {
-            cursor: pointer;
-            background-color: #111111;
-            border: 1px solid #333;
-            border-radius: 8px;
-            transition: all 0.3s ease;
-            color: #ffffff;
-        }
-        
-        div[data-baseweb=select]>div:hover {
-            border-color: #ff3547;
-            box-shadow: 0 0 8px rgba(255, 53, 71, 0.4);
-        }
-
-        /* Input field styling - improved visibility */
-        div[data-baseweb=base-input] {
-            background-color: #111111;
-            border: 1px solid #333;
-            border-radius: 8px;
-            padding: 5px;
-            transition: all 0.3s ease;
-            color: #ffffff;
-        }
-        
-        div[data-baseweb=base-input]:focus-within {
-            border-color: #ff3547;
-            box-shadow: 0 0 10px rgba(255, 53, 71, 0.4);
-        }
-        
-        /* Number input field styling */
-        input[type="number"] {
-            background-color: #111111 !important;
-            color: #ffffff !important;
-            border-radius: 8px !important;
-            padding: 8px !important;
-            font-size: 16px !important;
-        }
-        
-        /* Label styling */
-        label {
-            color: #d0d0d0 !important;
-            font-weight: 500 !important;
-            font-size: 16px !important;
-            margin-bottom: 8px !important;
-            display: block !important;
-        }
-
-        /* Button styling with glow effect */
-        div[data-testid=stFormSubmitButton] {
-            display: flex;
-            justify-content: center;
-            width: 100%;
-        }
-
-        div[data-testid=stFormSubmitButton] > button {
-            width: 40%;
-            background: #111111;
-            border: 2px solid #ff3547;
-            padding: 18px;
-            border-radius: 30px;
-            font-weight: bold;
-            font-size: 18px;
-            transition: all 0.3s ease;
-            position: relative;
-            overflow: hidden;
-            z-index: 1;
-            color: #fff;
-        }
-        
-        @keyframes pulse {
-            0% {
-                box-shadow: 0 0 0 0 rgba(255, 53, 71, 0.7);
-            }
-            70% {
-                box-shadow: 0 0 0 10px rgba(255, 53, 71, 0);
-            }
-            100% {
-                box-shadow: 0 0 0 0 rgba(255, 53, 71, 0);
-            }
-        }
-        
-        div[data-testid=stFormSubmitButton] > button:hover {
-            animation: pulse 1.5s infinite;
-            transform: translateY(-3px);
-            box-shadow: 0 7px 15px rgba(255, 53, 71, 0.4);
-        }
-        
-        div[data-testid=stFormSubmitButton] p {
-            font-weight: bold;
-            font-size: 20px;
-        }
-        
-        .result-card {
-            background: linear-gradient(145deg, #151f30, #1c2840);
-            border-radius: 15px;
-            padding: 25px;
-            box-shadow: 0 4px 15px rgba(0, 0, 0, 0.5);
-            text-align: center;
-            border: 1px solid #2a3950;
-            animation: fadeIn 1s ease-in;
-        }
-        
-        @keyframes fadeIn {
-            from { opacity: 0; transform: translateY(20px); }
-            to { opacity: 1; transform: translateY(0); }
-        }
-        
-        .result-positive {
-            color: #4CAF50;
-            font-size: 2.2rem;
-            font-weight: bold;
-            text-shadow: 0 0 10px rgba(76, 175, 80, 0.5);
-            animation: pulseText 2s infinite;
-        }
-        
-        .result-negative {
-            color: #ff3547;
-            font-size: 2.2rem;
-            font-weight: bold;
-            text-shadow: 0 0 10px rgba(255, 53, 71, 0.5);
-            animation: pulseText 2s infinite;
-        }
-        
-        @keyframes pulseText {
-            0% { opacity: 0.8; }
-            50% { opacity: 1; }
-            100% { opacity: 0.8; }
-        }
-        
-        .percentage-display {
-            font-size: 2.5rem;
-            font-weight: bold;
-            margin-top: 10px;
-            margin-bottom: 10px;
-            text-shadow: 0 0 5px rgba(255, 255, 255, 0.3);
-        }
-        
-        .stAppViewBlockContainer {
-            padding-left: 2.5rem !important;
-            padding-right: 2.5rem !important;
-            max-width: 1200px;
-            margin: 0 auto;
-        }
-        
-        .st-emotion-cache-1v0mbdj {
-            display: block;
-        }
-        
-        .st-emotion-cache-gi0tri {
-            display: none !important;
-        }
-        
-        /* Loading animation */
-        .loading-spinner {
-            width: 40px;
-            height: 40px;
-            margin: 20px auto;
-            border: 4px solid rgba(255, 53, 71, 0.3);
-            border-radius: 50%;
-            border-top-color: #ff3547;
-            animation: spin 1s ease-in-out infinite;
-        }
-        
-        @keyframes spin {
-            to { transform: rotate(360deg); }
-        }
-        
-        /* Progress bar animation */
-        .progress-bar {
-            height: 4px;
-            background: linear-gradient(90deg, #ff3547, #ff8547, #ff3547);
-            background-size: 200% 100%;
-            animation: gradient-shift 2s ease infinite;
-            border-radius: 2px;
-            margin: 10px 0;
-        }
-        
-        @keyframes gradient-shift {
-            0% { background-position: 0% 50%; }
-            50% { background-position: 100% 50%; }
-            100% { background-position: 0% 50%; }
-        }
-        
-        /* Prediction display outside box */
-        .prediction-display {
-            text-align: center;
-            font-size: 2rem;
-            margin-top: 20px;
-            font-weight: bold;
-            display: flex;
-            justify-content: center;
-            align-items: center;
-            gap: 10px;
-        }
-        
-        /* Heart icon styling */
-        .heart-icon {
-            width: 65px;
-            height: 65px;
-            margin: 0 auto;
-            display: block;
-            margin-bottom: 20px;
-        }
-    </style>
-    """,
-        unsafe_allow_html=True
-    )
+    st.markdown(get_stylesheet(), unsafe_allow_html=True)
 
     header = st.container()
-    content = st.container()
+    content, what_if_content, batch_content = st.tabs(["Single Patient", "What If", "Batch Scoring"])
 
     with header:
         st.markdown("<h1 class='glowing-title'>Heart Failure Prediction 💔</h1>", unsafe_allow_html=True)
@@ -515,67 +135,80 @@ def run():
         with col2:
             # This is the key change: Only display analysis and prediction after the button is clicked
             # We completely removed the instructional card and left this area blank until predict button is clicked
-            if predict_button:
-                patient_fasting_blood_sugar = 1
-                if fasting_blood_sugar == "Less Than 120 mg/dl":
-                    patient_fasting_blood_sugar = 0
-
-                new_data = [age, blood_pressure, cholesterol,
-                            patient_fasting_blood_sugar, max_heart_rate, old_peak]
-
-                # Gender
-                patient_gender = [1]  # Male
-
-                if gender == "Female":
-                    patient_gender = [0]  # Female
-
-                # Chest Pain
-                patient_chest_pain_type = [0, 0, 0]  # ASY
-
-                if chest_pain_type == "Typical Angina":
-                    patient_chest_pain_type = [0, 0, 1]
-
-                elif chest_pain_type == "Atypical Angina":
-                    patient_chest_pain_type = [1, 0, 0]
-
-                elif chest_pain_type == "Non-anginal Pain":
-                    patient_chest_pain_type = [0, 1, 0]
-
-                # ECG
-                patinet_ecg = [0, 0]  # LVH
-
-                if ecg == "Normal":
-                    patinet_ecg = [1, 0]
-
-                elif ecg == "ST":
-                    patinet_ecg = [0, 1]
-
-                # ExerciseAngina
-                patient_exercise_angina = [1]  # Yes
-
-                if exercise_angina == "No":
-                    patient_exercise_angina = [0]  # No
-
-                # Slope
-                patient_slope = [0, 0]  # Down
-                if st_slope == "Flat":
-                    patient_slope = [1, 0]
-                elif st_slope == "Up":
-                    patient_slope = [0, 1]
-
-                # Appending All Data
-                new_data.extend(patient_gender)
-                new_data.extend(patient_chest_pain_type)
-                new_data.extend(patinet_ecg)
-                new_data.extend(patient_exercise_angina)
-                new_data.extend(patient_slope)
-
-                with st.spinner("Analyzing data..."):
-                    predicted_value = model.predict([new_data])[0]
-                    prediction_prop = np.round(
-                        model.predict_proba([new_data])*100)
-                    # Brief delay for visual feedback
-                    sleep(0.3)
+            patient = {
+                "Age": age,
+                "RestingBP": blood_pressure,
+                "Cholesterol": cholesterol,
+                "FastingBS": fasting_blood_sugar,
+                "MaxHR": max_heart_rate,
+                "Oldpeak": old_peak,
+                "Sex": gender,
+                "ChestPainType": chest_pain_type,
+                "RestingECG": ecg,
+                "ExerciseAngina": exercise_angina,
+                "ST_Slope": st_slope,
+            }
+            # Physiologically impossible inputs (e.g. cholesterol 0) are refused before scoring
+            problems = validate(patient).reasons(0) if predict_button else []
+            if problems:
+                st.error("Please check these inputs: " + "; ".join(problems))
+                record_request("app_rejected")
+
+            if predict_button and not problems:
+                timer = StageTimer()
+
+                # Map the form inputs straight into the model's 15 encoded columns
+                new_data = encode_record(patient)
+                timer.lap("encode")
+
+                # Scoring runs off this thread: repeat inputs resolve from the cache, the rest
+                # share a micro-batch with other sessions. A newer click from this session
+                # cancels this one if it is still queued.
+                session = st.session_state.setdefault("session_key", uuid.uuid4().hex)
+                # With HEART_MODEL_VARIANTS set, the session's variant scores it on the router's
+                # own threads (and any shadow variant is compared in the background); the
+                # explanation follows the same model
+                router = get_router()
+                model_path = DEFAULT_MODEL_PATH
+                if router is None:
+                    future = pending.track((session, "predict"), predict_async(new_data))
+                    explanation = pending.track((session, "explain"), submit(explain, new_data))
+                else:
+                    variant = router.choose(session)
+                    model_path = variant.model_path
+                    future = pending.track((session, "predict"), router.submit(new_data, session))
+                    explanation = pending.track((session, "explain"),
+                                                submit(explain, new_data, variant.model_path))
+
+                placeholder = st.empty()
+                placeholder.markdown("""
+                <div class="card" style="margin-top: 20px;">
+                    <h3 style="text-align: center;">Analyzing data...</h3>
+                    <div class="loading-spinner"></div>
+                </div>
+                """, unsafe_allow_html=True)
+                result = None
+                superseded = False
+                with span("inference", route="app"):
+                    try:
+                        result = future.result(DEFAULT_TIMEOUT)
+                    except CancelledError:
+                        # A newer click from this session replaced it; that run shows the result
+                        superseded = True
+                    except TimeoutError:
+                        pending.cancel((session, "predict"))
+                        pending.cancel((session, "explain"))
+                        logger.warning("Prediction timed out after %.1fs", DEFAULT_TIMEOUT)
+                if result is None and not superseded:
+                    placeholder.error("The prediction is taking longer than expected. Please try again.")
+                else:
+                    placeholder.empty()
+
+                if result is not None:
+                    # One pass through the booster gives both the label and the percentages
+                    predicted_value = result.labels[0]
+                    prediction_prop = result.percentages
+                    timer.lap("inference")
 
                     # Probability analysis section with centered images
                     st.markdown("""
@@ -631,7 +264,122 @@ def run():
                         {result_symbol} {gender_pronoun} {result_status}
                     </div>
                     """, unsafe_allow_html=True)
+                    timer.lap("render")
+
+                    # Which inputs pushed the score up or down (tree-path contributions, cached per input)
+                    # The prediction itself is already shown; only the breakdown can be skipped
+                    factors = []
+                    try:
+                        factors = explanation.result(DEFAULT_TIMEOUT).top(0, 6)
+                    except CancelledError:
+                        pass
+                    except Exception as e:
+                        pending.cancel((session, "explain"))
+                        if not isinstance(e, TimeoutError):
+                            logger.exception("Explaining the prediction failed")
+                        st.info("The breakdown of what drove this prediction isn't available right now.")
+                    if factors:
+                        largest = max(abs(value) for _, value in factors) or 1.0
+                        rows = "".join(
+                            f'<div class="factor-row">'
+                            f'<div class="factor-label">{FIELDS_BY_NAME[name].label}</div>'
+                            f'<div class="factor-bar" style="width: {45 * abs(value) / largest:.0f}%; '
+                            f'background: {"#ff3547" if value > 0 else "#4CAF50"};"></div>'
+                            f'<div class="factor-value">{"raises" if value > 0 else "lowers"} risk ({value:+.2f})</div>'
+                            f'</div>'
+                            for name, value in factors)
+                        st.markdown(f"""
+                        <div class="card" style="margin-top: 20px;">
+                            <h3 style="text-align: center; margin-bottom: 20px;">What Drove This Prediction</h3>
+                            {rows}
+                        </div>
+                        """, unsafe_allow_html=True)
+                    timer.lap("explain")
+
+                timer.log(logger, "predict")
+                record_request("app" if result is not None else "app_superseded" if superseded else "app_timeout",
+                               timer, result)
+                if result is not None:
+                    monitor.observe(new_data)
+                    # Kept for audit and drift analysis; queued, written in the background
+                    log_prediction(new_data, result, scoring_version(model_path), "app",
+                                   timer.total * 1000)
+                # Per-stage timings for this prediction, shown with ?debug=1 or HEART_DEBUG_TIMINGS=1
+                if st.query_params.get("debug") == "1" or os.environ.get("HEART_DEBUG_TIMINGS") == "1":
+                    with st.expander("Debug: stage timings (ms)"):
+                        st.json({name: round(ms, 3) for name, ms in timer.as_ms().items()})
             # No else block - right side remains completely blank when not clicked
+
+    with what_if_content:
+        st.markdown("""
+        <div class="card">
+            <h3 style="text-align: center; margin-bottom: 25px;">How Would the Risk Change?</h3>
+            <p style="text-align: center; color: #aaa;">
+                Vary one or two inputs of the patient entered on the Single Patient tab
+                across their range, keeping everything else the same
+            </p>
+        </div>
+        """, unsafe_allow_html=True)
+
+        # Nothing is swept until asked: every tab renders on every rerun, Predict clicks included
+        swept = st.multiselect("Inputs to vary", options=[field.name for field in FIELDS],
+                               default=[], max_selections=2,
+                               format_func=lambda name: FIELDS_BY_NAME[name].label,
+                               help="One input draws a risk curve, two draw a heatmap")
+        sweep_problems = validate(patient).reasons(0)
+        if sweep_problems:
+            st.warning("Please check these inputs on the Single Patient tab: " + "; ".join(sweep_problems))
+        elif swept:
+            # Scored by the model this session's predictions come from, so the curve agrees with them
+            router = get_router()
+            session = st.session_state.setdefault("session_key", uuid.uuid4().hex)
+            sweep_model_path = router.choose(session).model_path if router is not None else DEFAULT_MODEL_PATH
+            # Kept per session, so reruns (e.g. Predict clicks) with the same inputs redraw it as is
+            key = (scoring_version(sweep_model_path), tuple(swept), tuple(patient.items()))
+            cached = st.session_state.get("what_if")
+
+            timer = StageTimer()
+            with span("what_if", fields=",".join(swept)):
+                if cached is None or cached[0] != key:
+                    # The whole grid (up to 60 x 60 patients) is scored in one batched call
+                    from sensitivity import figure, sweep
+
+                    sweep_result = sweep(patient, swept, model_path=sweep_model_path)
+                    timer.lap("inference")
+                    cached = st.session_state["what_if"] = (key, figure(sweep_result, patient))
+                st.plotly_chart(cached[1], theme=None)
+                timer.lap("render")
+            record_request("app_what_if", timer)
+
+    with batch_content:
+        st.markdown("""
+        <div class="card">
+            <h3 style="text-align: center; margin-bottom: 25px;">Score a Patient Cohort</h3>
+            <p style="text-align: center; color: #aaa;">
+                Upload a CSV or Parquet file with the columns
+                Age, Sex, ChestPainType, RestingBP, Cholesterol, FastingBS,
+                RestingECG, MaxHR, ExerciseAngina, Oldpeak and ST_Slope
+            </p>
+        </div>
+        """, unsafe_allow_html=True)
+
+        uploaded = st.file_uploader("Patient file", type=["csv", "parquet"])
+        if uploaded is not None:
+            # Batch scoring needs pandas, so it is only imported once a file is uploaded
+            from batch import read_table, score_table
+
+            # Loaded once per process and shared across sessions; reloaded if the file changes
+            model = get_model(DEFAULT_MODEL_PATH)
+            try:
+                with st.spinner("Scoring patients..."), span("batch_upload", file=uploaded.name):
+                    scored, report = score_table(model, read_table(uploaded, uploaded.name))
+            except ValueError as e:
+                st.error(f"Could not score this file: {e}")
+            else:
+                st.success(str(report))
+                st.dataframe(scored.head(1000))
+                st.download_button("Download results (CSV)", scored.to_csv(index=False),
+                                   file_name="heart_failure_predictions.csv", mime="text/csv")
     
     pass
 
@@ -0,0 +1,295 @@
+import sys
+import time
+import bisect
+import argparse
+import threading
+from contextlib import ExitStack, contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds, from sub-millisecond cache hits up to a slow cold model load
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Rows per call, powers of two up to the largest batch-file chunk
+SIZE_BUCKETS = tuple(float(1 << i) for i in range(17))
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class Counter:
+    """A monotonically increasing count, one series per combination of label values."""
+
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        return [(self.name, _format_labels(self.labelnames, labels), value) for labels, value in values]
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count of observed values, per label values."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.bounds = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        # bisect_left puts a value equal to a bound into that bound's bucket (le is inclusive)
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.bounds) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, *labels):
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def snapshot(self, *labels):
+        """Count, mean and non-empty (non-cumulative) buckets of one series, e.g. for a JSON status."""
+        with self._lock:
+            series = self._series.get(labels)
+            counts, total = (list(series[0]), series[1]) if series else ([], 0.0)
+        count = sum(counts)
+        names = [f"<={bound:g}" for bound in self.bounds] + [f">{self.bounds[-1]:g}"]
+        return {"count": count, "mean": total / count if count else 0.0,
+                "buckets": {name: n for name, n in zip(names, counts) if n}}
+
+    def samples(self):
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        samples = []
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.bounds + (float("inf"),), counts):
+                cumulative += count
+                samples.append((f"{self.name}_bucket",
+                                _format_labels(self.labelnames, labels, [("le", _format_value(bound))]),
+                                cumulative))
+            samples.append((f"{self.name}_sum", _format_labels(self.labelnames, labels), total))
+            samples.append((f"{self.name}_count", _format_labels(self.labelnames, labels), cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    """Named metrics plus collectors that are read only when scraped.
+
+    Collectors suit values something else already keeps (cache hit counts,
+    loaded model versions): they cost nothing per request.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help, labelnames=()):
+        metric = Counter(name, help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, help, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collect):
+        # collect() returns [(name, kind, help, [(labels dict, value), ...]), ...]
+        self._collectors.append(collect)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        for collect in self._collectors:
+            for name, kind, help, values in collect():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in values:
+                    if value is None:
+                        continue
+                    lines.append(f"{name}{_format_labels(labels, labels.values())} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Shared by everything in this process
+metrics = MetricsRegistry()
+
+REQUESTS = metrics.counter("heart_requests_total", "Prediction requests handled", ("route",))
+PREDICTIONS = metrics.counter("heart_predictions_total", "Patients scored, by predicted class",
+                              ("route", "label"))
+STAGE_SECONDS = metrics.histogram("heart_stage_seconds", "Time spent per request stage",
+                                  ("route", "stage"))
+BATCH_ROWS = metrics.histogram("heart_batch_rows", "Rows scored per booster call", ("source",),
+                               buckets=SIZE_BUCKETS)
+MODEL_LOADS = metrics.counter("heart_model_loads_total", "Model artifact loads and reloads", ("path",))
+MODEL_LOAD_SECONDS = metrics.histogram("heart_model_load_seconds", "Time to load a model artifact")
+
+
+def record_request(route, timer=None, result=None):
+    """Count one request, its per-stage timings (a StageTimer) and predicted classes."""
+    REQUESTS.inc(route)
+    if timer is not None:
+        for stage, seconds in timer.stages.items():
+            STAGE_SECONDS.observe(seconds, route, stage)
+    if result is not None:
+        record_predictions(route, result.labels)
+
+
+def record_predictions(route, labels):
+    # Predicted-class counts for an array of 0/1 labels
+    positives = int(labels.sum())
+    if positives:
+        PREDICTIONS.inc(route, "1", amount=positives)
+    if len(labels) - positives:
+        PREDICTIONS.inc(route, "0", amount=len(labels) - positives)
+
+
+def record_model_load(entry):
+    # A model registry listener
+    MODEL_LOADS.inc(entry.path)
+    MODEL_LOAD_SECONDS.observe(entry.load_seconds)
+
+
+def stats_collector(prefix, stats, help):
+    """A collector exposing every numeric value of ``stats()`` as a ``prefix_<key>`` gauge."""
+    def collect():
+        return [(f"{prefix}_{key}", "gauge", f"{help}: {key}", [({}, value)])
+                for key, value in stats().items() if isinstance(value, (int, float))]
+    return collect
+
+
+_span_hooks = []
+
+
+def add_span_hook(hook):
+    """Register ``hook(name, attributes)``, which returns a context manager wrapping each span.
+
+    This matches OpenTelemetry's tracer, so spans can be exported with e.g.
+    ``add_span_hook(lambda name, attrs: tracer.start_as_current_span(name, attributes=attrs))``.
+    """
+    _span_hooks.append(hook)
+
+
+@contextmanager
+def span(name, **attributes):
+    # A traced block; without hooks it costs a couple of microseconds
+    if not _span_hooks:
+        yield
+        return
+    with ExitStack() as stack:
+        for hook in _span_hooks:
+            stack.enter_context(hook(name, attributes))
+        yield
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0].rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        data = metrics.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    """Serve /metrics from a background thread; later calls return the running server."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+    return _server
+
+
+def parse_metrics(text):
+    """Parse exposition text into {(name, labels): value}, e.g. for a local scraper or check."""
+    samples = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        series, value = line.rsplit(" ", 1)
+        name, _, labels = series.partition("{")
+        samples[(name, labels.rstrip("}"))] = float(value)
+    return samples
+
+
+def scrape(url, timeout=5.0):
+    from urllib.request import urlopen
+
+    with urlopen(url, timeout=timeout) as response:
+        return parse_metrics(response.read().decode())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape a /metrics endpoint and print its samples.")
+    parser.add_argument("url", help="e.g. http://127.0.0.1:8502/metrics")
+    parser.add_argument("--match", default="heart_", help="only print series whose name starts with this")
+    parser.add_argument("--interval", type=float, default=None, help="keep scraping every N seconds")
+    args = parser.parse_args(argv)
+
+    while True:
+        samples = scrape(args.url)
+        for (name, labels), value in sorted(samples.items()):
+            if name.startswith(args.match):
+                print(f"{name}{{{labels}}} {value:g}" if labels else f"{name} {value:g}")
+        if args.interval is None:
+            return 0
+        print(f"--- {time.strftime('%H:%M:%S')}")
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
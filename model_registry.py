@@ -0,0 +1,220 @@
+import os
+import time
+import pickle
+import hashlib
+import logging
+import warnings
+import threading
+
+from metrics import metrics, record_model_load
+
+
+# A pickled model, or the manifest.json of an artifact exported with artifact.py
+DEFAULT_MODEL_PATH = os.environ.get("HEART_MODEL_PATH", "xgboost_heart_disease_detection_v1.pkl")
+
+logger = logging.getLogger(__name__)
+
+
+def _rss_bytes():
+    # Resident set size of this process, or None where /proc is unavailable
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def load_pickle(path):
+    # Plain pickle.load. Unpickling the XGBClassifier imports xgboost, which pulls in pandas
+    # and pyarrow anyway, so this saves no imports over pd.read_pickle; startup.py reports them.
+    # Like read_pickle, silence the version warnings raised while unpickling.
+    with open(path, "rb") as f, warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return pickle.load(f)
+
+
+def load_model_file(path):
+    # Exported artifacts are memory-mapped without importing xgboost; anything else is a pickle
+    if os.path.basename(path) == "manifest.json":
+        from artifact import load_artifact
+
+        return load_artifact(path)
+    return load_pickle(path)
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ModelEntry:
+    """A loaded model artifact together with the file state it was loaded from."""
+
+    def __init__(self, path, model, mtime_ns, size, sha256, load_seconds, memory_bytes):
+        self.path = path
+        self.model = model
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.sha256 = sha256
+        self.load_seconds = load_seconds
+        self.memory_bytes = memory_bytes
+        self.loaded_at = time.time()
+        self.checked_at = time.monotonic()
+        self.loads = 1
+
+    @property
+    def version(self):
+        # The exported artifact's manifest version, else a hash of the file's contents: the
+        # same on every host and unchanged by a copy or touch, so caches and logs agree
+        return getattr(self.model, "version", None) or self.sha256[:12]
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "version": self.version,
+            "file_bytes": self.size,
+            "load_seconds": self.load_seconds,
+            "memory_bytes": self.memory_bytes,
+            "loaded_at": self.loaded_at,
+            "loads": self.loads,
+        }
+
+
+class ModelRegistry:
+    """Loads each model artifact once per process and reloads it when the file changes.
+
+    The file is re-checked at most once every ``check_interval`` seconds, by
+    mtime and size, or by SHA-256 of the contents when ``use_hash`` is set.
+    """
+
+    def __init__(self, loader=load_model_file, check_interval=1.0, use_hash=False):
+        self.loader = loader
+        self.check_interval = check_interval
+        self.use_hash = use_hash
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._preloading = set()
+
+    def add_listener(self, callback):
+        # callback(entry) is invoked after every (re)load
+        self._listeners.append(callback)
+
+    def preload(self, path=DEFAULT_MODEL_PATH):
+        """Start loading ``path`` in a background thread if it isn't loaded yet.
+
+        Lets a freshly started process render its first page while the model
+        (and the xgboost/sklearn imports it pulls in) loads.
+        """
+        key = os.path.abspath(path)
+        with self._lock:
+            if key in self._entries or key in self._preloading:
+                return
+            self._preloading.add(key)
+
+        def load():
+            try:
+                self.entry(key)
+            except Exception:
+                logger.exception("Preloading model %s failed", key)
+            finally:
+                self._preloading.discard(key)
+
+        threading.Thread(target=load, name="model-preload", daemon=True).start()
+
+    def get(self, path=DEFAULT_MODEL_PATH):
+        return self.entry(path).model
+
+    def entry(self, path=DEFAULT_MODEL_PATH):
+        key = os.path.abspath(path)
+        entry = self._entries.get(key)
+        if entry is not None and not self._is_stale(entry):
+            return entry
+
+        with self._lock:
+            # Another thread may have (re)loaded it while we waited for the lock
+            previous = self._entries.get(key)
+            if previous is not entry:
+                return previous
+            entry = self._load(key)
+            if previous is not None:
+                entry.loads = previous.loads + 1
+            self._entries[key] = entry
+
+        for callback in self._listeners:
+            callback(entry)
+        return entry
+
+    def stats(self):
+        return {path: entry.stats() for path, entry in self._entries.items()}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _is_stale(self, entry):
+        now = time.monotonic()
+        if now - entry.checked_at < self.check_interval:
+            return False
+        entry.checked_at = now
+
+        try:
+            st = os.stat(entry.path)
+        except OSError:
+            # Keep serving the model we have if the file is briefly missing mid-deploy
+            return False
+        if st.st_mtime_ns != entry.mtime_ns or st.st_size != entry.size:
+            return True
+        if self.use_hash:
+            return _file_sha256(entry.path) != entry.sha256
+        return False
+
+    def _load(self, path):
+        st = os.stat(path)
+        sha256 = _file_sha256(path)
+        if os.path.basename(path) != "manifest.json":
+            # Unpickling imports xgboost (and sklearn, pandas, pyarrow with it): import it first,
+            # so the resident memory measured below is the model's own
+            import xgboost  # noqa: F401
+
+        rss_before = _rss_bytes()
+        start = time.perf_counter()
+        model = self.loader(path)
+        load_seconds = time.perf_counter() - start
+        rss_after = _rss_bytes()
+
+        memory_bytes = None
+        if rss_before is not None and rss_after is not None:
+            memory_bytes = max(rss_after - rss_before, 0)
+
+        entry = ModelEntry(path, model, st.st_mtime_ns, st.st_size, sha256,
+                           load_seconds, memory_bytes)
+        logger.info("Loaded model %s (version %s) in %.1f ms, ~%s bytes resident",
+                    path, entry.version, load_seconds * 1000, memory_bytes)
+        return entry
+
+
+def _collect_models():
+    # Scrape-time gauges for every model this process has loaded
+    entries = list(registry.stats().values())
+    return [
+        ("heart_model_info", "gauge", "Loaded model artifacts, by version",
+         [({"path": e["path"], "version": e["version"]}, 1) for e in entries]),
+        ("heart_model_memory_bytes", "gauge", "Approximate resident memory added by loading the model",
+         [({"path": e["path"]}, e["memory_bytes"]) for e in entries]),
+        ("heart_model_loaded_timestamp_seconds", "gauge", "When the model was last (re)loaded",
+         [({"path": e["path"]}, e["loaded_at"]) for e in entries]),
+    ]
+
+
+# Shared by every Streamlit session in this process
+registry = ModelRegistry()
+registry.add_listener(record_model_load)
+metrics.add_collector(_collect_models)
+
+
+def get_model(path=DEFAULT_MODEL_PATH):
+    return registry.get(path)
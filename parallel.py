@@ -0,0 +1,192 @@
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from batch import DEFAULT_CHUNK_SIZE, INVALID_ROW_ACTIONS, RESULT_COLUMNS, BatchReport, finish_results, read_table, write_table
+from model_registry import DEFAULT_MODEL_PATH
+from scoring import DEFAULT_THRESHOLD
+
+
+# Per-worker state, set once by _init_worker
+_worker = {}
+
+
+def _init_worker(model_path, threshold, invalid):
+    # Each worker scores single-threaded; the pool supplies the parallelism
+    os.environ["OMP_NUM_THREADS"] = "1"
+    if os.path.basename(model_path) == "manifest.json":
+        # Whole shards are scored, where XGBoost's predictor beats the NumPy engine
+        from artifact import load_booster
+
+        model = load_booster(model_path)
+    else:
+        from model_registry import get_model
+
+        model = get_model(model_path)
+    model.get_booster().set_param({"nthread": 1})
+    _worker.update(model=model, threshold=threshold, invalid=invalid)
+
+
+def _score_shard(frame):
+    # Validated, encoded and scored exactly as a single-process run would
+    from batch import score_frame
+
+    return score_frame(_worker["model"], frame, max(len(frame), 1), _worker["threshold"], _worker["invalid"])
+
+
+class ParallelScorer:
+    """Scores a table across a pool of worker processes, ``chunk_size`` rows per task.
+
+    Every worker loads the model once when it starts and scores with one
+    thread. With an exported artifact (a manifest.json path) workers read
+    its checksummed native booster file, which is faster than unpickling
+    and shared through the page cache. Results come back in input order.
+    Workers are spawned rather than forked, so the parent's XGBoost/OpenMP
+    threads are never inherited mid-state.
+
+    Use as a context manager, or call ``close()``, to shut the pool down.
+    """
+
+    def __init__(self, model_path=DEFAULT_MODEL_PATH, workers=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                 threshold=DEFAULT_THRESHOLD, invalid="flag"):
+        self.model_path = os.path.abspath(model_path)
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.threshold = threshold
+        self.invalid = invalid
+        self._pool = ProcessPoolExecutor(self.workers, multiprocessing.get_context("spawn"),
+                                         initializer=_init_worker,
+                                         initargs=(self.model_path, threshold, invalid))
+
+    def warm_up(self):
+        # Start every worker and load its model before anything is timed
+        return set(self._pool.map(_worker_pid, range(self.workers)))
+
+    def score_frame(self, frame):
+        """Score ``frame``; returns the result columns, indexed like ``frame``."""
+        shards = (frame.iloc[start:start + self.chunk_size]
+                  for start in range(0, len(frame), self.chunk_size))
+        # map() yields in submission order, so the shards concatenate straight back into place
+        results = list(self._pool.map(_score_shard, shards))
+        if not results:
+            return pd.DataFrame({name: [] for name in RESULT_COLUMNS}, index=frame.index)
+        return pd.concat(results)
+
+    def score_table(self, frame):
+        # Same contract as batch.score_table: input plus result columns, and a report
+        start = time.perf_counter()
+        results = self.score_frame(frame)
+        report = BatchReport(len(frame), time.perf_counter() - start,
+                             int((results[RESULT_COLUMNS[2]] < 0).sum()))
+        return finish_results(frame, results, self.invalid), report
+
+    def close(self):
+        self._pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _worker_pid(_):
+    # Held briefly so each call lands on (and starts) a different worker
+    time.sleep(0.05)
+    return os.getpid()
+
+
+def score_file_parallel(input_path, output_path, model_path=DEFAULT_MODEL_PATH, workers=None,
+                        chunk_size=DEFAULT_CHUNK_SIZE, threshold=DEFAULT_THRESHOLD, invalid="flag"):
+    frame = read_table(input_path)
+    with ParallelScorer(model_path, workers, chunk_size, threshold, invalid) as scorer:
+        # The report covers scoring only, not spawning workers and loading the model
+        scorer.warm_up()
+        scored, report = scorer.score_table(frame)
+    write_table(scored, output_path)
+    return report
+
+
+def scaling_report(input_path, model_path=DEFAULT_MODEL_PATH, worker_counts=None,
+                   chunk_size=DEFAULT_CHUNK_SIZE, threshold=DEFAULT_THRESHOLD, repeats=3):
+    """Throughput and speedup over one worker for each pool size, on warm pools.
+
+    A one-worker run is always measured, as the baseline for the speedups.
+    Pool start-up (spawning workers, loading the model) is reported
+    separately, since a nightly job pays it once rather than per chunk.
+    """
+    frame = read_table(input_path)
+    if worker_counts is None:
+        cpus = os.cpu_count() or 1
+        worker_counts = [1 << i for i in range(cpus.bit_length()) if 1 << i <= cpus] + [cpus]
+    worker_counts = sorted({1, *worker_counts})
+
+    rows = []
+    for workers in worker_counts:
+        start = time.perf_counter()
+        with ParallelScorer(model_path, workers, chunk_size, threshold) as scorer:
+            scorer.warm_up()
+            startup = time.perf_counter() - start
+            best = min(_timed(scorer.score_frame, frame) for _ in range(repeats))
+        rows.append({"workers": workers, "startup_s": startup, "seconds": best,
+                     "rows_per_second": len(frame) / best})
+
+    base = rows[0]["seconds"]  # the one-worker run
+    for row in rows:
+        row["speedup"] = base / row["seconds"]
+        row["efficiency"] = row["speedup"] / row["workers"]
+    return {"rows": len(frame), "chunk_size": chunk_size, "cpu_count": os.cpu_count(), "results": rows}
+
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Score a CSV or Parquet file of patients across a pool of worker processes.")
+    parser.add_argument("input", help="CSV or Parquet file with the 11 clinical fields")
+    parser.add_argument("output", nargs="?", help="where to write the scored rows (.csv or .parquet)")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH,
+                        help="model to score with; an artifact manifest.json is shared by all workers")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="rows per task")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="P(heart disease) above which a row is labelled a heart patient")
+    parser.add_argument("--invalid", choices=INVALID_ROW_ACTIONS, default="flag",
+                        help="rows failing validation: flag, reject or error (see batch.py)")
+    parser.add_argument("--scaling", type=lambda s: [int(x) for x in s.split(",")], nargs="?", const=[],
+                        default=None, metavar="N,N,...",
+                        help="instead of writing output, report speedup over one worker for these "
+                             "worker counts (default: powers of two up to the CPU count)")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.input):
+        parser.error(f"input file not found: {args.input}")
+
+    if args.scaling is not None:
+        report = scaling_report(args.input, args.model, args.scaling or None, args.chunk_size, args.threshold)
+        print(json.dumps(report, indent=2))
+        for row in report["results"]:
+            print(f"{row['workers']:>3} workers: {row['rows_per_second']:>12,.0f} rows/s  "
+                  f"speedup {row['speedup']:5.2f}x  efficiency {row['efficiency']:.0%}", file=sys.stderr)
+        return 0
+
+    if args.output is None:
+        parser.error("output is required unless --scaling is given")
+    report = score_file_parallel(args.input, args.output, args.model, args.workers,
+                                 args.chunk_size, args.threshold, args.invalid)
+    print(report, file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
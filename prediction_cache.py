@@ -0,0 +1,120 @@
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from metrics import metrics, stats_collector
+from model_registry import DEFAULT_MODEL_PATH, registry
+from scoring import DEFAULT_THRESHOLD, ScoreResult
+from tree_engine import scoring_version
+
+
+DEFAULT_MAXSIZE = 4096
+DEFAULT_TTL = 3600.0
+
+
+def _as_matrix(features):
+    features = np.ascontiguousarray(features, dtype=np.float32)
+    return features.reshape(1, -1) if features.ndim == 1 else features
+
+
+def _to_result(cached):
+    return ScoreResult(np.array([value[0] for value in cached]),
+                       np.array([value[1] for value in cached], dtype=np.int8),
+                       np.array([value[2] for value in cached]))
+
+
+class PredictionCache:
+    """LRU cache of scored rows keyed on (model version, threshold, encoded features).
+
+    Entries older than ``ttl`` seconds are treated as misses; ``ttl=None``
+    keeps them until evicted. The cache is cleared whenever the registry
+    reloads a model, so a new artifact never serves stale predictions.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _get(self, key, now):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and (self.ttl is None or now - item[0] < self.ttl):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return item[1]
+            if item is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def _put(self, key, value, now):
+        with self._lock:
+            self._data[key] = (now, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def predict(self, features, scorer, version, threshold=DEFAULT_THRESHOLD):
+        """Score ``features`` with ``scorer``, skipping it for rows already cached."""
+        features = _as_matrix(features)
+        now = time.monotonic()
+        keys = [(version, threshold, row.tobytes()) for row in features]
+        cached = [self._get(key, now) for key in keys]
+        missing = [i for i, value in enumerate(cached) if value is None]
+
+        if missing:
+            result = scorer(features[missing])
+            for j, i in enumerate(missing):
+                cached[i] = (result.probabilities[j].copy(), result.labels[j], result.percentages[j].copy())
+                self._put(keys[i], cached[i], now)
+
+        return _to_result(cached)
+
+    def lookup(self, features, version, threshold=DEFAULT_THRESHOLD):
+        # The cached ScoreResult if every row is cached, else None (nothing is scored)
+        now = time.monotonic()
+        cached = [self._get((version, threshold, row.tobytes()), now) for row in _as_matrix(features)]
+        if any(value is None for value in cached):
+            return None
+        return _to_result(cached)
+
+    def store(self, features, result, version, threshold=DEFAULT_THRESHOLD):
+        now = time.monotonic()
+        for j, row in enumerate(_as_matrix(features)):
+            self._put((version, threshold, row.tobytes()),
+                      (result.probabilities[j].copy(), result.labels[j], result.percentages[j].copy()), now)
+
+    def clear(self, *args):
+        # Also used as a registry listener, which passes the reloaded entry
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# Shared by every session in this process
+cache = PredictionCache()
+registry.add_listener(cache.clear)
+metrics.add_collector(stats_collector("heart_prediction_cache", cache.stats, "Prediction cache"))
+
+
+def cached_predict(features, scorer, model_path=DEFAULT_MODEL_PATH, threshold=DEFAULT_THRESHOLD):
+    version = scoring_version(model_path)
+    return cache.predict(features, scorer, version, threshold)
@@ -0,0 +1,382 @@
+import os
+import sys
+import time
+import queue
+import atexit
+import sqlite3
+import logging
+import argparse
+import threading
+from contextlib import closing
+from datetime import datetime
+
+import numpy as np
+
+from features import FEATURE_COLUMNS, FIELDS_BY_NAME
+from metrics import metrics, stats_collector
+
+
+logger = logging.getLogger(__name__)
+
+# SQLite file every scored request is appended to; set to "" to turn logging off.
+# Kept next to this module by default, so it doesn't depend on where the app is started from.
+DEFAULT_LOG_PATH = os.environ.get("HEART_PREDICTION_LOG",
+                                  os.path.join(os.path.dirname(os.path.abspath(__file__)), "predictions.db"))
+DEFAULT_BATCH_SIZE = 1024
+DEFAULT_FLUSH_INTERVAL = 1.0
+# Requests waiting for the writer before new ones are dropped rather than slowing the caller
+DEFAULT_MAX_QUEUE = 100000
+
+_COLUMNS = ("ts", "route", "model_version", "probability", "label", "latency_ms") + FEATURE_COLUMNS
+_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS predictions ("
+    "id INTEGER PRIMARY KEY, ts REAL NOT NULL, route TEXT NOT NULL, model_version TEXT, "
+    "probability REAL NOT NULL, label INTEGER NOT NULL, latency_ms REAL, "
+    + ", ".join(f'"{column}" REAL' for column in FEATURE_COLUMNS) + ")",
+    # Every query is bounded in time; these cover the usual extra filter
+    "CREATE INDEX IF NOT EXISTS predictions_ts ON predictions (ts)",
+    "CREATE INDEX IF NOT EXISTS predictions_version_ts ON predictions (model_version, ts)",
+    "CREATE INDEX IF NOT EXISTS predictions_label_ts ON predictions (label, ts)",
+]
+_QUOTED = ", ".join(f'"{column}"' for column in _COLUMNS)
+_INSERT = f"INSERT INTO predictions ({_QUOTED}) VALUES ({', '.join('?' * len(_COLUMNS))})"
+
+
+def _connect(path):
+    connection = sqlite3.connect(path, timeout=30.0, check_same_thread=False)
+    # WAL lets queries read while the writer appends; NORMAL sync is durable at checkpoints
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+def _cohort_conditions(where):
+    # {"Age": (40, 60), "Sex": "Male", "ST_Slope": ["Flat", "Down"]} -> SQL on the encoded columns
+    conditions, params = [], []
+    for name, value in (where or {}).items():
+        field = FIELDS_BY_NAME.get(name)
+        if field is None:
+            raise ValueError(f"unknown field {name!r}")
+        if field.kind == "numeric":
+            low, high = value if isinstance(value, (tuple, list)) else (value, value)
+            if low is not None:
+                conditions.append(f'"{name}" >= ?')
+                params.append(float(low))
+            if high is not None:
+                conditions.append(f'"{name}" <= ?')
+                params.append(float(high))
+            continue
+        options = [value] if isinstance(value, str) else list(value)
+        alternatives = []
+        for option in options:
+            row = field.table[field.index_of(option)]
+            alternatives.append("(" + " AND ".join(f'"{column}" = ?' for column in field.columns) + ")")
+            params.extend(float(v) for v in row)
+        conditions.append("(" + " OR ".join(alternatives) + ")")
+    return conditions, params
+
+
+def decode(frame):
+    """Add each categorical field's option label, decoded from its one-hot columns, to a query result."""
+    for name, field in FIELDS_BY_NAME.items():
+        if field.kind != "categorical" or not set(field.columns) <= set(frame.columns):
+            continue
+        encoded = frame[list(field.columns)].to_numpy(dtype=np.float32)
+        labels = np.full(len(frame), None, dtype=object)
+        for option, row in zip(field.options, field.table):
+            labels[(encoded == row).all(axis=1)] = option
+        frame[name] = labels
+    return frame
+
+
+class PredictionQueries:
+    """Read-only queries over a prediction log file.
+
+    Every query takes a time range (unix seconds, ``start <= ts < end``) and
+    an optional cohort, e.g. ``{"Age": (40, 60), "Sex": "Male"}``, and runs
+    on its own short-lived connection, so it never contends with the writer.
+    """
+
+    def __init__(self, path=DEFAULT_LOG_PATH):
+        self.path = path
+
+    def _connect(self):
+        return closing(sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, timeout=30.0))
+
+    def query(self, start=None, end=None, where=None, model_version=None, route=None, label=None,
+              columns=None, limit=None):
+        """Logged rows with ``start <= ts < end`` (unix seconds) in the given cohort, as a DataFrame."""
+        import pandas as pd
+
+        what = ", ".join(f'"{column}"' for column in columns) if columns else "id, " + _QUOTED
+        sql, params = self._select(what, start, end, where, model_version, route, label)
+        sql += " ORDER BY ts"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        with self._connect() as connection:
+            return pd.read_sql_query(sql, connection, params=params)
+
+    def summary(self, start=None, end=None, where=None, by="model_version", **filters):
+        """Per-group row count, positive rate, mean probability and latency, aggregated in SQLite."""
+        import pandas as pd
+
+        if by not in ("model_version", "route", "label"):
+            raise ValueError(f"cannot group by {by!r}")
+        sql, params = self._select(
+            f"{by}, COUNT(*) AS rows, AVG(label) AS positive_rate, AVG(probability) AS mean_probability, "
+            f"AVG(latency_ms) AS mean_latency_ms, MIN(ts) AS first_ts, MAX(ts) AS last_ts",
+            start, end, where, filters.get("model_version"), filters.get("route"), filters.get("label"))
+        with self._connect() as connection:
+            return pd.read_sql_query(sql + f" GROUP BY {by} ORDER BY {by}", connection, params=params)
+
+    def count(self, start=None, end=None, where=None, **filters):
+        sql, params = self._select("COUNT(*)", start, end, where, filters.get("model_version"),
+                                   filters.get("route"), filters.get("label"))
+        with self._connect() as connection:
+            return connection.execute(sql, params).fetchone()[0]
+
+    def _select(self, what, start, end, where, model_version, route, label):
+        conditions, params = _cohort_conditions(where)
+        for column, op, value in (("ts", ">=", start), ("ts", "<", end), ("model_version", "=", model_version),
+                                  ("route", "=", route), ("label", "=", label)):
+            if value is not None:
+                conditions.insert(0, f"{column} {op} ?")
+                params.insert(0, value)
+        sql = f"SELECT {what} FROM predictions"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        return sql, params
+
+
+class PredictionLog(PredictionQueries):
+    """Append-only log of scored requests in an indexed SQLite file.
+
+    ``log()`` only queues the request, so it adds microseconds to a
+    prediction. A writer thread appends queued rows in batches of up to
+    ``batch_size`` rows, or every ``flush_interval`` seconds, each batch in
+    one transaction. If the writer falls ``max_queue`` requests behind, new
+    requests are dropped and counted instead of blocking the caller.
+
+    Each row keeps the 15 encoded features, P(heart disease), the label,
+    model version, route and latency; see PredictionQueries for reading.
+    """
+
+    def __init__(self, path=DEFAULT_LOG_PATH, batch_size=DEFAULT_BATCH_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, max_queue=DEFAULT_MAX_QUEUE):
+        super().__init__(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        connection = _connect(path)
+        try:
+            with connection:
+                for statement in _SCHEMA:
+                    connection.execute(statement)
+        except sqlite3.Error:
+            connection.close()
+            raise
+        self._connection = connection
+        self._queue = queue.Queue(maxsize=max_queue)
+        self.logged = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.write_seconds = 0.0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="prediction-log", daemon=True)
+        self._thread.start()
+
+    def log(self, features, result, model_version=None, route="app", latency_ms=None, ts=None):
+        """Queue the scored rows of one request; never blocks."""
+        if self._closed:
+            return
+        features = np.asarray(features, dtype=np.float32)
+        if features.ndim == 1:
+            features = features.reshape(1, -1)
+        item = (time.time() if ts is None else ts, route, model_version,
+                features, result.probabilities[:, 1], result.labels, latency_ms)
+        try:
+            self._queue.put_nowait(item)
+            self.logged += len(features)
+        except queue.Full:
+            self.dropped += len(features)
+
+    def flush(self, timeout=None):
+        # Wait until everything queued so far is written
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        self._connection.close()
+
+    def _run(self):
+        pending, rows, deadline = [], 0, None
+        while True:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = "timeout"
+
+            if isinstance(item, tuple):
+                pending.append(item)
+                rows += len(item[3])
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                if rows < self.batch_size:
+                    continue
+
+            # A full batch, the flush interval, a flush() or close(): write what is pending
+            if pending:
+                self._write(pending)
+            pending, rows, deadline = [], 0, None
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is None:
+                break
+
+    def _write(self, items):
+        start = time.perf_counter()
+        records = []
+        for ts, route, version, features, probabilities, labels, latency in items:
+            for row, probability, label in zip(features.tolist(), probabilities.tolist(), labels.tolist()):
+                records.append((ts, route, version, probability, label, latency, *row))
+        try:
+            with self._connection:
+                self._connection.executemany(_INSERT, records)
+        except sqlite3.Error:
+            # Logging must never take the app down; the rows are counted as dropped
+            logger.exception("Writing %d rows to the prediction log %s failed", len(records), self.path)
+            self.dropped += len(records)
+            return
+        self.written += len(records)
+        self.batches += 1
+        self.write_seconds += time.perf_counter() - start
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "logged_rows": self.logged,
+            "written_rows": self.written,
+            "dropped_rows": self.dropped,
+            "batches": self.batches,
+            "write_seconds": self.write_seconds,
+        }
+
+
+_log = None
+_log_failed = False
+_log_lock = threading.Lock()
+
+
+def get_prediction_log(path=DEFAULT_LOG_PATH):
+    # One writer per process; None when HEART_PREDICTION_LOG is set to "" or the file can't be opened
+    global _log, _log_failed
+    if not path or _log_failed:
+        return None
+    if _log is None:
+        with _log_lock:
+            if _log is None and not _log_failed:
+                try:
+                    log = PredictionLog(path)
+                except sqlite3.Error:
+                    # Logging must never take the app down: say so once and carry on without it
+                    logger.exception("Could not open the prediction log %s; predictions will not be logged", path)
+                    _log_failed = True
+                    return None
+                metrics.add_collector(stats_collector("heart_prediction_log", log.stats, "Prediction log"))
+                # Write out whatever is still buffered when the process exits
+                atexit.register(log.close)
+                _log = log
+    return _log
+
+
+def log_prediction(features, result, model_version=None, route="app", latency_ms=None):
+    """Queue one scored request on the process's prediction log, if logging is on."""
+    log = get_prediction_log()
+    if log is not None:
+        log.log(features, result, model_version, route, latency_ms)
+
+
+def _parse_time(value):
+    # Unix seconds, an ISO 8601 date/time, or a duration back from now such as 90m, 24h or 7d
+    if value is None:
+        return None
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    if value[-1:] in units and value[:-1].replace(".", "", 1).isdigit():
+        return time.time() - float(value[:-1]) * units[value[-1]]
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def _parse_where(specs):
+    # ["Age=40:60", "Sex=Male", "ST_Slope=Flat,Down"] -> the ``where`` mapping
+    where = {}
+    for spec in specs:
+        name, _, value = spec.partition("=")
+        field = FIELDS_BY_NAME.get(name)
+        if field is None:
+            raise ValueError(f"unknown field {name!r}")
+        if field.kind == "numeric" and ":" in value:
+            low, high = value.split(":", 1)
+            where[name] = (float(low) if low else None, float(high) if high else None)
+        elif field.kind == "numeric":
+            where[name] = float(value)
+        else:
+            where[name] = value.split(",")
+    return where
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the prediction log.")
+    parser.add_argument("command", choices=["summary", "rows", "count"])
+    parser.add_argument("--log", default=DEFAULT_LOG_PATH or "predictions.db", help="SQLite prediction log")
+    parser.add_argument("--since", help="start: unix seconds, ISO date/time, or a duration ago (24h, 7d)")
+    parser.add_argument("--until", help="end, in the same forms")
+    parser.add_argument("--where", action="append", default=[], metavar="FIELD=VALUE",
+                        help="cohort filter, repeatable: Age=40:60, Sex=Male, ST_Slope=Flat,Down")
+    parser.add_argument("--model-version")
+    parser.add_argument("--route")
+    parser.add_argument("--by", default="model_version", help="summary grouping: model_version, route or label")
+    parser.add_argument("--limit", type=int, default=20, help="rows to print")
+    parser.add_argument("--output", "-o", help="with rows, write all matching rows here (.csv or .parquet)")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.log):
+        parser.error(f"prediction log not found: {args.log}")
+    try:
+        window = dict(start=_parse_time(args.since), end=_parse_time(args.until), where=_parse_where(args.where))
+    except ValueError as e:
+        parser.error(str(e))
+    filters = dict(model_version=args.model_version, route=args.route)
+
+    log = PredictionQueries(args.log)
+    start = time.perf_counter()
+    if args.command == "count":
+        print(log.count(**window, **filters))
+    elif args.command == "summary":
+        print(log.summary(**window, by=args.by, **filters).to_string(index=False))
+    else:
+        import pandas as pd
+
+        frame = decode(log.query(**window, **filters, limit=None if args.output else args.limit))
+        frame["ts"] = pd.to_datetime(frame["ts"], unit="s")
+        if args.output:
+            from batch import write_table
+
+            write_table(frame, args.output)
+        else:
+            print(frame.to_string(index=False))
+    print(f"({time.perf_counter() - start:.3f}s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
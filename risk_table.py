@@ -0,0 +1,317 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import argparse
+import threading
+
+import numpy as np
+
+from explain import _booster
+from features import FEATURE_COLUMNS, FIELDS
+from model_registry import DEFAULT_MODEL_PATH, registry
+
+
+logger = logging.getLogger(__name__)
+
+NUMERIC_FIELDS = tuple(field for field in FIELDS if field.kind == "numeric")
+CATEGORICAL_FIELDS = tuple(field for field in FIELDS if field.kind == "categorical")
+N_COMBINATIONS = int(np.prod([len(field.options) for field in CATEGORICAL_FIELDS]))
+
+# Numeric grid cells per categorical combination; 16384 x 288 combinations is 9 MB of uint16
+DEFAULT_MAX_CELLS = 16384
+DEFAULT_TABLE_PATH = os.environ.get("HEART_RISK_TABLE", "risk_table.npz")
+# Largest |table - model| P(heart disease) on random valid patients for the table to be served;
+# a table further off than this is not used and the exact model scores instead
+MAX_ERROR = float(os.environ.get("HEART_RISK_TABLE_MAX_ERROR", 0.02))
+CHECK_SAMPLES = 20000
+
+_NUMERIC_INDEX = [FEATURE_COLUMNS.index(field.name) for field in NUMERIC_FIELDS]
+_SCALE = 65535.0
+
+
+def choose_breakpoints(booster, max_cells=DEFAULT_MAX_CELLS):
+    """Pick the split thresholds that bound the numeric grid cells.
+
+    The model only changes value at its own split thresholds, so a grid on
+    every threshold would be exact. When that has more than ``max_cells``
+    cells, thresholds are dropped one at a time, cheapest first: a
+    threshold's cost is its total gain times the share of the form's range
+    that dropping it merges into a neighbouring cell.
+    """
+    splits = booster.trees_to_dataframe()
+    splits = splits[splits["Feature"].isin([field.name for field in NUMERIC_FIELDS])]
+    gains = splits.groupby(["Feature", "Split"])["Gain"].sum()
+
+    kept = {field.name: {} for field in NUMERIC_FIELDS}
+    for (name, threshold), gain in gains.items():
+        kept[name][float(threshold)] = float(gain)
+
+    def cells():
+        return int(np.prod([len(thresholds) + 1 for thresholds in kept.values()]))
+
+    while cells() > max_cells:
+        cheapest = None
+        for field in NUMERIC_FIELDS:
+            low, high = max(field.min_value, field.valid_min), min(field.max_value, field.valid_max)
+            thresholds = sorted(kept[field.name])
+            for i, threshold in enumerate(thresholds):
+                left = thresholds[i - 1] if i else low
+                right = thresholds[i + 1] if i + 1 < len(thresholds) else high
+                share = max(min(threshold - left, right - threshold), 0) / (high - low)
+                cost = kept[field.name][threshold] * share
+                if cheapest is None or cost < cheapest[0]:
+                    cheapest = (cost, field.name, threshold)
+        del kept[cheapest[1]][cheapest[2]]
+    return [np.array(sorted(kept[field.name]), dtype=np.float32) for field in NUMERIC_FIELDS]
+
+
+def _representatives(field, breaks):
+    # One value inside each cell: the midpoint, with the outer cells closed by the valid range
+    edges = np.concatenate([[min(field.valid_min, breaks[0] - 1) if len(breaks) else field.valid_min],
+                            breaks,
+                            [max(field.valid_max, breaks[-1] + 1) if len(breaks) else field.valid_max]])
+    return ((edges[:-1] + edges[1:]) / 2).astype(np.float32)
+
+
+def _combination_features():
+    # The encoded categorical columns of all 288 combinations, in table order
+    tables = [field.table for field in CATEGORICAL_FIELDS]
+    grids = np.meshgrid(*[np.arange(len(table)) for table in tables], indexing="ij")
+    return np.concatenate([table[grid.ravel()] for table, grid in zip(tables, grids)], axis=1)
+
+
+class RiskTable:
+    """P(heart disease) precomputed over a quantized grid of the input space.
+
+    One axis per categorical combination (all 288 of them, exact) and one per
+    numeric field, whose cells are bounded by the booster's own split
+    thresholds. Probabilities are stored as uint16, so a lookup is a handful
+    of ``searchsorted`` calls and one gather, for one row or a million.
+
+    Exposes ``predict_proba`` on the encoded 15 columns, so it can stand in
+    for the model wherever ``scoring.score`` is used. It is approximate where
+    thresholds were dropped to fit the grid; see ``verify``. ``model_sha256``
+    identifies the model file it was built from, and ``version`` the table.
+    """
+
+    def __init__(self, breakpoints, probabilities, model_sha256=None):
+        self.breakpoints = [np.asarray(b, dtype=np.float32) for b in breakpoints]
+        self.probabilities = np.asarray(probabilities, dtype=np.uint16)
+        self.model_sha256 = model_sha256
+        self.shape = (N_COMBINATIONS,) + tuple(len(b) + 1 for b in self.breakpoints)
+        if self.probabilities.size != int(np.prod(self.shape)):
+            raise ValueError(f"table has {self.probabilities.size} entries, expected shape {self.shape}")
+        self.probabilities = self.probabilities.reshape(-1)
+
+        digest = hashlib.sha256(self.probabilities.tobytes())
+        for breaks in self.breakpoints:
+            digest.update(breaks.tobytes())
+        self.version = digest.hexdigest()[:12]
+        # Set by get_risk_table once checked against the model
+        self.max_abs_error = None
+
+        # One-hot columns -> option index, per categorical field, via a binary code
+        self._categorical = []
+        for field in CATEGORICAL_FIELDS:
+            columns = [FEATURE_COLUMNS.index(column) for column in field.columns]
+            weights = (1 << np.arange(len(columns))).astype(np.float32)
+            codes = np.zeros(1 << len(columns), dtype=np.intp)
+            for option, row in enumerate(field.table):
+                codes[int(row @ weights)] = option
+            self._categorical.append((columns, weights, codes, len(field.options)))
+
+    @classmethod
+    def build(cls, model, max_cells=DEFAULT_MAX_CELLS, model_sha256=None, model_path=None):
+        """Evaluate ``model`` on every grid cell of every categorical combination."""
+        breakpoints = choose_breakpoints(_booster(model, model_path), max_cells)
+        points = np.meshgrid(*[_representatives(field, breaks)
+                               for field, breaks in zip(NUMERIC_FIELDS, breakpoints)], indexing="ij")
+        points = np.stack([p.ravel() for p in points], axis=1)
+        combinations = _combination_features()
+
+        categorical_index = [FEATURE_COLUMNS.index(column)
+                             for field in CATEGORICAL_FIELDS for column in field.columns]
+        features = np.empty((len(points), len(FEATURE_COLUMNS)), dtype=np.float32)
+        features[:, _NUMERIC_INDEX] = points
+        probabilities = np.empty((N_COMBINATIONS, len(points)), dtype=np.uint16)
+        for i, combination in enumerate(combinations):
+            features[:, categorical_index] = combination
+            positive = model.predict_proba(features)[:, 1]
+            probabilities[i] = np.round(positive * _SCALE).astype(np.uint16)
+        return cls(breakpoints, probabilities, model_sha256)
+
+    def save(self, path):
+        # Written under a temporary name and renamed, so a reader never sees half a table
+        with open(path + ".tmp", "wb") as f:
+            np.savez(f, probabilities=self.probabilities, model_sha256=np.array(self.model_sha256 or ""),
+                     **{f"breaks_{field.name}": b for field, b in zip(NUMERIC_FIELDS, self.breakpoints)})
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            breakpoints = [data[f"breaks_{field.name}"] for field in NUMERIC_FIELDS]
+            # Tables from before the model hash was recorded never match, so they get rebuilt
+            sha256 = str(data["model_sha256"]) if "model_sha256" in data.files else ""
+            return cls(breakpoints, data["probabilities"], sha256 or None)
+
+    @property
+    def nbytes(self):
+        return self.probabilities.nbytes
+
+    def cell_index(self, features):
+        features = np.asarray(features, dtype=np.float32)
+        if features.ndim == 1:
+            features = features.reshape(1, -1)
+        index = np.zeros(len(features), dtype=np.intp)
+        for columns, weights, codes, n_options in self._categorical:
+            index = index * n_options + codes[(features[:, columns] @ weights).astype(np.intp)]
+        for column, breaks in zip(_NUMERIC_INDEX, self.breakpoints):
+            index = index * (len(breaks) + 1) + np.searchsorted(breaks, features[:, column], side="right")
+        return index
+
+    def predict_proba(self, features):
+        positive = self.probabilities[self.cell_index(features)] / np.float32(_SCALE)
+        probabilities = np.empty((len(positive), 2), dtype=np.float32)
+        probabilities[:, 1] = positive
+        probabilities[:, 0] = 1.0 - positive
+        return probabilities
+
+
+def sample_patients(n_rows, seed=0):
+    """Random valid patients: form ranges clipped to the valid ranges, at the form's resolution."""
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for field in FIELDS:
+        if field.kind == "categorical":
+            columns[field.name] = np.asarray(field.options, dtype=object)[rng.integers(len(field.options), size=n_rows)]
+            continue
+        low, high = max(field.min_value, field.valid_min), min(field.max_value, field.valid_max)
+        if isinstance(field.min_value, float):
+            columns[field.name] = np.round(rng.uniform(low, high, n_rows), 1)
+        else:
+            columns[field.name] = rng.integers(low, high + 1, n_rows)
+    return columns
+
+
+def verify(table, model, n_samples=100000, seed=0):
+    """Compare the table with the exact model on random valid patients."""
+    from features import encode
+    from scoring import DEFAULT_THRESHOLD
+
+    features = encode(sample_patients(n_samples, seed))
+    exact = model.predict_proba(features)[:, 1]
+    start = time.perf_counter()
+    approx = table.predict_proba(features)[:, 1]
+    lookup_seconds = time.perf_counter() - start
+
+    error = np.abs(approx - exact)
+    worst = int(np.argmax(error))
+    return {
+        "samples": n_samples,
+        "max_abs_error": float(error.max()),
+        "mean_abs_error": float(error.mean()),
+        "p99_abs_error": float(np.quantile(error, 0.99)),
+        "label_disagreement": float(np.mean((approx > DEFAULT_THRESHOLD) != (exact > DEFAULT_THRESHOLD))),
+        "worst_case": {"features": dict(zip(FEATURE_COLUMNS, features[worst].tolist())),
+                       "exact": float(exact[worst]), "table": float(approx[worst])},
+        "table_cells": int(np.prod(table.shape)),
+        "table_bytes": table.nbytes,
+        "lookup_rows_per_second": n_samples / lookup_seconds if lookup_seconds > 0 else float("inf"),
+    }
+
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def get_risk_table(model_path=DEFAULT_MODEL_PATH, table_path=DEFAULT_TABLE_PATH):
+    """The risk table for the contents of ``model_path``, loaded or built once per model file.
+
+    The table on disk is matched to the model by SHA-256, so copying or
+    touching the model file keeps it valid. When it is missing or was built
+    for another model, it is rebuilt (several seconds) under a lock, so
+    concurrent callers wait for one build, and saved back to ``table_path``.
+    Either way it is checked against the model on ``CHECK_SAMPLES`` random
+    patients, and its ``max_abs_error`` recorded; see ``is_servable``.
+    """
+    entry = registry.entry(model_path)
+    key = (entry.path, entry.sha256)
+    table = _tables.get(key)
+    if table is not None:
+        return table
+
+    with _tables_lock:
+        table = _tables.get(key)
+        if table is not None:
+            return table
+
+        if table_path and os.path.exists(table_path):
+            table = RiskTable.load(table_path)
+            if table.model_sha256 != entry.sha256:
+                logger.warning("Risk table %s was built for another model than %s; rebuilding",
+                               table_path, entry.path)
+                table = None
+        if table is None:
+            start = time.perf_counter()
+            table = RiskTable.build(entry.model, model_sha256=entry.sha256, model_path=entry.path)
+            logger.info("Built risk table for %s in %.1fs (%d cells, %d bytes)",
+                        entry.path, time.perf_counter() - start, int(np.prod(table.shape)), table.nbytes)
+            if table_path:
+                try:
+                    table.save(table_path)
+                except OSError as e:
+                    logger.warning("Could not save risk table to %s: %s", table_path, e)
+        table.max_abs_error = verify(table, entry.model, CHECK_SAMPLES)["max_abs_error"]
+        if not is_servable(table):
+            logger.warning("Risk table for %s is off by up to %.3f (over %.3f); scoring with the exact model",
+                           entry.path, table.max_abs_error, MAX_ERROR)
+        _tables.clear()
+        _tables[key] = table
+    return table
+
+
+def is_servable(table, max_error=None):
+    # Checked against its model and no further off than HEART_RISK_TABLE_MAX_ERROR
+    return table.max_abs_error is not None and table.max_abs_error <= (MAX_ERROR if max_error is None else max_error)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or verify the precomputed risk lookup table.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="evaluate the model over the grid and save the table")
+    build.add_argument("--model", default=DEFAULT_MODEL_PATH)
+    build.add_argument("--output", "-o", default=DEFAULT_TABLE_PATH)
+    build.add_argument("--max-cells", type=int, default=DEFAULT_MAX_CELLS,
+                       help="numeric grid cells per categorical combination")
+
+    check = commands.add_parser("verify", help="report the table's error against the exact model")
+    check.add_argument("--model", default=DEFAULT_MODEL_PATH)
+    check.add_argument("--table", default=DEFAULT_TABLE_PATH)
+    check.add_argument("--samples", type=int, default=100000)
+    args = parser.parse_args(argv)
+
+    entry = registry.entry(args.model)
+    model = entry.model
+    if args.command == "build":
+        start = time.perf_counter()
+        table = RiskTable.build(model, args.max_cells, entry.sha256, entry.path)
+        table.save(args.output)
+        print(f"Wrote {args.output}: {int(np.prod(table.shape)):,} cells, {table.nbytes:,} bytes, "
+              f"built in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    else:
+        table = RiskTable.load(args.table)
+        if table.model_sha256 != entry.sha256:
+            print(f"warning: table was built for another model than {entry.path}", file=sys.stderr)
+        report = verify(table, model, args.samples)
+        report["servable"] = report["max_abs_error"] <= MAX_ERROR
+        print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,381 @@
+import os
+import sys
+import json
+import time
+import zlib
+import bisect
+import random
+import logging
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from metrics import metrics
+from model_registry import DEFAULT_MODEL_PATH, registry
+from prediction_cache import _as_matrix
+from scoring import DEFAULT_THRESHOLD, score
+from tree_engine import get_scoring_model
+
+
+logger = logging.getLogger(__name__)
+
+# "name=path[:weight]" or "name=path:shadow", separated by ";". Unset serves HEART_MODEL_PATH alone.
+DEFAULT_VARIANTS = os.environ.get("HEART_MODEL_VARIANTS", "")
+# Shadow requests allowed to wait for the shadow thread before new ones are dropped
+DEFAULT_MAX_SHADOW_BACKLOG = 256
+# Recent per-request latencies kept per variant for percentiles
+LATENCY_WINDOW = 2048
+# Threads scoring requests handed to ModelRouter.submit (the app's sessions)
+SERVE_WORKERS = 4
+
+VARIANT_SECONDS = metrics.histogram("heart_variant_inference_seconds", "Inference time per model variant",
+                                    ("variant", "role"))
+VARIANT_ROWS = metrics.counter("heart_variant_rows_total", "Rows scored per model variant", ("variant", "role"))
+SHADOW_ROWS = metrics.counter("heart_shadow_rows_total",
+                              "Shadow-scored rows, by whether the label matched the served one",
+                              ("variant", "outcome"))
+SHADOW_DROPPED = metrics.counter("heart_shadow_dropped_total",
+                                 "Shadow requests skipped because the shadow thread was behind", ("variant",))
+
+
+class Variant:
+    """One model version in a rollout: served to a share of traffic, or scored in shadow."""
+
+    def __init__(self, name, model_path, weight=1.0, shadow=False):
+        if not shadow and weight <= 0:
+            raise ValueError(f"variant {name!r} needs a positive weight")
+        self.name = name
+        self.model_path = model_path
+        self.weight = float(weight)
+        self.shadow = shadow
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.rows = 0
+        self.errors = 0
+        self.dropped = 0
+        # Shadow variants only: agreement with the prediction that was served
+        self.compared = 0
+        self.agreed = 0
+        self.abs_diff_sum = 0.0
+        self.max_abs_diff = 0.0
+
+    @property
+    def role(self):
+        return "shadow" if self.shadow else "served"
+
+    def score(self, features, threshold=DEFAULT_THRESHOLD):
+        # Only the booster call is timed; a (re)load shows up in the registry's load stats instead
+        model = get_scoring_model(self.model_path)
+        start = time.perf_counter()
+        result = score(model, features, threshold)
+        seconds = time.perf_counter() - start
+        with self._lock:
+            self.latencies.append(seconds)
+            self.requests += 1
+            self.rows += len(result.labels)
+        VARIANT_SECONDS.observe(seconds, self.name, self.role)
+        VARIANT_ROWS.inc(self.name, self.role, amount=len(result.labels))
+        return result
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def compare(self, served, result):
+        agreed = int((served.labels == result.labels).sum())
+        diff = np.abs(served.probabilities[:, 1] - result.probabilities[:, 1])
+        with self._lock:
+            self.compared += len(diff)
+            self.agreed += agreed
+            self.abs_diff_sum += float(diff.sum())
+            self.max_abs_diff = max(self.max_abs_diff, float(diff.max(initial=0.0)))
+        if agreed:
+            SHADOW_ROWS.inc(self.name, "agree", amount=agreed)
+        if len(diff) - agreed:
+            SHADOW_ROWS.inc(self.name, "disagree", amount=len(diff) - agreed)
+
+    def stats(self):
+        try:
+            entry = registry.entry(self.model_path)
+        except Exception:
+            # A variant whose model won't load still reports its errors, rather than breaking /health
+            entry = None
+        latencies = np.array(self.latencies) * 1000
+        stats = {
+            "name": self.name,
+            "role": self.role,
+            "weight": self.weight if not self.shadow else 0.0,
+            "path": entry.path if entry is not None else os.path.abspath(self.model_path),
+            "version": entry.version if entry is not None else None,
+            "memory_bytes": entry.memory_bytes if entry is not None else None,
+            "requests": self.requests,
+            "rows": self.rows,
+            "errors": self.errors,
+            "latency_ms": {
+                "mean": float(latencies.mean()) if len(latencies) else None,
+                "p50": float(np.percentile(latencies, 50)) if len(latencies) else None,
+                "p95": float(np.percentile(latencies, 95)) if len(latencies) else None,
+                "p99": float(np.percentile(latencies, 99)) if len(latencies) else None,
+            },
+        }
+        if self.shadow:
+            stats.update({
+                "dropped": self.dropped,
+                "compared_rows": self.compared,
+                "agreement": self.agreed / self.compared if self.compared else None,
+                "mean_abs_diff": self.abs_diff_sum / self.compared if self.compared else None,
+                "max_abs_diff": self.max_abs_diff,
+            })
+        return stats
+
+
+def parse_variant(spec):
+    """``name=path``, ``name=path:weight`` or ``name=path:shadow`` -> Variant."""
+    name, sep, rest = spec.strip().partition("=")
+    if not sep or not name or not rest:
+        raise ValueError(f"expected name=path[:weight|:shadow], got {spec!r}")
+    path, sep, suffix = rest.rpartition(":")
+    if sep and suffix == "shadow":
+        return Variant(name, path, shadow=True)
+    if sep:
+        try:
+            return Variant(name, path, float(suffix))
+        except ValueError:
+            pass
+    # No suffix (or a colon that belongs to the path itself)
+    return Variant(name, rest)
+
+
+def parse_variants(spec):
+    return [parse_variant(part) for part in spec.split(";") if part.strip()]
+
+
+class ModelRouter:
+    """Serves several model versions side by side.
+
+    Each request is scored by one served variant, picked by weight. With a
+    key (e.g. a session id) the pick is sticky, so a user keeps seeing the
+    same model. The served result is returned as soon as it is ready; every
+    shadow variant then scores the same encoded features on a background
+    thread and is compared with what was served, so a candidate's latency
+    never reaches the caller. If the shadow thread falls behind by
+    ``max_shadow_backlog`` requests, new shadow work is dropped and counted
+    rather than queued without bound.
+    """
+
+    def __init__(self, variants, threshold=DEFAULT_THRESHOLD, max_shadow_backlog=DEFAULT_MAX_SHADOW_BACKLOG):
+        names = [variant.name for variant in variants]
+        if len(set(names)) != len(names):
+            raise ValueError(f"variant names must be unique, got {names}")
+        self.variants = list(variants)
+        self.served = [variant for variant in variants if not variant.shadow]
+        self.shadows = [variant for variant in variants if variant.shadow]
+        if not self.served:
+            raise ValueError("at least one variant must serve traffic")
+        self.threshold = threshold
+        self.max_shadow_backlog = max_shadow_backlog
+        self._cumulative = list(np.cumsum([variant.weight for variant in self.served]))
+        self._backlog = 0
+        self._lock = threading.Lock()
+        self._serve_pool = None
+        self._shadow_pool = None
+        if self.shadows:
+            self._shadow_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow-scoring")
+
+    @classmethod
+    def from_spec(cls, spec, threshold=DEFAULT_THRESHOLD):
+        return cls(parse_variants(spec), threshold)
+
+    def load(self):
+        # Load every variant up front, so neither the first request nor the first comparison pays for it
+        for variant in self.variants:
+            registry.entry(variant.model_path)
+
+    def choose(self, key=None):
+        if key is None:
+            point = random.random()
+        else:
+            point = zlib.crc32(str(key).encode()) / 2.0 ** 32
+        index = bisect.bisect_right(self._cumulative, point * self._cumulative[-1])
+        return self.served[min(index, len(self.served) - 1)]
+
+    def predict(self, features, key=None):
+        """Score ``features`` with one served variant; returns ``(ScoreResult, Variant)``."""
+        features = _as_matrix(features)
+        variant = self.choose(key)
+        try:
+            result = variant.score(features, self.threshold)
+        except Exception:
+            variant.record_error()
+            raise
+        for shadow in self.shadows:
+            self._submit_shadow(shadow, features, result)
+        return result, variant
+
+    def score(self, features, key=None):
+        return self.predict(features, key)[0]
+
+    def submit(self, features, key=None):
+        """Score on the router's own threads; returns a Future of the ScoreResult.
+
+        For callers that must not block, like the app's sessions. The threads
+        serve nothing else, so predictions never queue behind explanations.
+        """
+        if self._serve_pool is None:
+            with self._lock:
+                if self._serve_pool is None:
+                    self._serve_pool = ThreadPoolExecutor(max_workers=SERVE_WORKERS,
+                                                          thread_name_prefix="variant-scoring")
+        return self._serve_pool.submit(self.score, features, key)
+
+    def _submit_shadow(self, variant, features, served):
+        with self._lock:
+            if self._backlog >= self.max_shadow_backlog:
+                variant.dropped += 1
+                SHADOW_DROPPED.inc(variant.name)
+                return
+            self._backlog += 1
+        self._shadow_pool.submit(self._run_shadow, variant, features, served)
+
+    def _run_shadow(self, variant, features, served):
+        try:
+            variant.compare(served, variant.score(features, self.threshold))
+        except Exception:
+            # A broken candidate must never affect what is served
+            variant.record_error()
+            logger.exception("Shadow variant %s failed", variant.name)
+        finally:
+            with self._lock:
+                self._backlog -= 1
+
+    def drain(self):
+        # Block until every queued shadow comparison has run (the pool has one thread)
+        if self._shadow_pool is not None:
+            self._shadow_pool.submit(lambda: None).result()
+
+    def stats(self):
+        return {"shadow_backlog": self._backlog, "variants": [variant.stats() for variant in self.variants]}
+
+    def collect(self):
+        # Scrape-time gauges, for metrics.add_collector
+        stats = [variant.stats() for variant in self.variants]
+        return [
+            ("heart_variant_info", "gauge", "Model variants in this rollout, by role and version",
+             [({"variant": s["name"], "role": s["role"], "version": s["version"]}, 1) for s in stats]),
+            ("heart_variant_weight", "gauge", "Share of traffic weight per served variant",
+             [({"variant": s["name"]}, s["weight"]) for s in stats]),
+            ("heart_variant_memory_bytes", "gauge", "Approximate resident memory added by loading the variant",
+             [({"variant": s["name"]}, s["memory_bytes"]) for s in stats]),
+            ("heart_shadow_agreement_ratio", "gauge", "Share of shadow-scored rows whose label matched the served one",
+             [({"variant": s["name"]}, s["agreement"]) for s in stats if s["role"] == "shadow"]),
+            ("heart_shadow_backlog", "gauge", "Shadow requests waiting for the shadow thread",
+             [({}, self._backlog)]),
+        ]
+
+    def close(self):
+        if self._serve_pool is not None:
+            self._serve_pool.shutdown()
+        if self._shadow_pool is not None:
+            self._shadow_pool.shutdown()
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router(spec=DEFAULT_VARIANTS):
+    # The process's router from HEART_MODEL_VARIANTS, or None when a single model is served
+    global _router
+    if not spec:
+        return None
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                router = ModelRouter.from_spec(spec)
+                metrics.add_collector(router.collect)
+                _router = router
+    return _router
+
+
+def compare_file(input_path, variants, threshold=DEFAULT_THRESHOLD, sample=500, seed=0):
+    """Score a file with every variant: batch throughput, single-row latency and agreement.
+
+    Agreement is measured against the first served variant, row by row,
+    over the valid rows of the whole file.
+    """
+    from batch import read_table
+    from features import encode
+    from validation import validate
+
+    frame = read_table(input_path)
+    check = validate(frame)
+    features = encode(frame[check.valid])
+    router = ModelRouter(variants, threshold)
+    router.load()
+    baseline = router.served[0]
+
+    rows = np.random.default_rng(seed).choice(len(features), size=min(sample, len(features)), replace=False)
+    report = {"rows": len(frame), "valid_rows": len(features), "baseline": baseline.name, "variants": []}
+    results = {}
+    for variant in router.variants:
+        start = time.perf_counter()
+        results[variant.name] = variant.score(features, threshold)
+        seconds = time.perf_counter() - start
+        # Single rows, as the form and /predict score them
+        variant.latencies.clear()
+        for row in rows:
+            variant.score(features[row], threshold)
+        stats = variant.stats()
+        report["variants"].append({
+            "name": variant.name,
+            "version": stats["version"],
+            "memory_bytes": stats["memory_bytes"],
+            "batch_rows_per_second": len(features) / seconds if seconds > 0 else float("inf"),
+            "single_row_latency_ms": stats["latency_ms"],
+        })
+
+    base = results[baseline.name]
+    for entry in report["variants"]:
+        result = results[entry["name"]]
+        diff = np.abs(result.probabilities[:, 1] - base.probabilities[:, 1])
+        entry["label_agreement"] = float((result.labels == base.labels).mean()) if len(diff) else None
+        entry["mean_abs_diff"] = float(diff.mean()) if len(diff) else None
+        entry["max_abs_diff"] = float(diff.max(initial=0.0))
+    router.close()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compare model versions side by side on a CSV or Parquet file of patients.")
+    parser.add_argument("input", help="CSV or Parquet file with the 11 clinical fields")
+    parser.add_argument("--variant", action="append", default=[], metavar="NAME=PATH[:WEIGHT|:shadow]",
+                        help="a model version to compare; repeat for each (the first is the baseline)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="P(heart disease) above which a row is labelled a heart patient")
+    parser.add_argument("--sample", type=int, default=500, help="rows scored one at a time for latency")
+    args = parser.parse_args(argv)
+
+    try:
+        variants = [parse_variant(spec) for spec in args.variant] or parse_variants(DEFAULT_VARIANTS)
+    except ValueError as e:
+        parser.error(str(e))
+    if not variants:
+        variants = [Variant("default", DEFAULT_MODEL_PATH)]
+
+    report = compare_file(args.input, variants, args.threshold, args.sample)
+    print(json.dumps(report, indent=2))
+    for entry in report["variants"]:
+        latency = entry["single_row_latency_ms"]
+        print(f"{entry['name']:>12}: {entry['batch_rows_per_second']:>12,.0f} rows/s  "
+              f"p50 {latency['p50']:.3f} ms  p99 {latency['p99']:.3f} ms  "
+              f"agreement {entry['label_agreement']:.2%}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
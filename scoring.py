@@ -0,0 +1,30 @@
+import os
+from typing import NamedTuple
+
+import numpy as np
+
+
+# A patient is labelled a heart patient when P(heart disease) > threshold,
+# which is what XGBClassifier.predict does internally with 0.5
+DEFAULT_THRESHOLD = float(os.environ.get("HEART_DECISION_THRESHOLD", 0.5))
+
+
+class ScoreResult(NamedTuple):
+    probabilities: np.ndarray  # (n, 2): [P(no heart disease), P(heart disease)]
+    labels: np.ndarray         # (n,): 1 = heart patient, 0 = not
+    percentages: np.ndarray    # (n, 2): probabilities as rounded percentages
+
+
+def label_probabilities(probabilities, threshold=DEFAULT_THRESHOLD, decimals=0):
+    probabilities = np.asarray(probabilities)
+    labels = (probabilities[:, 1] > threshold).astype(np.int8)
+    percentages = np.round(probabilities * 100, decimals)
+    return ScoreResult(probabilities, labels, percentages)
+
+
+def score(model, features, threshold=DEFAULT_THRESHOLD, decimals=0):
+    """Score a feature matrix with a single pass through the booster."""
+    features = np.asarray(features)
+    if features.ndim == 1:
+        features = features.reshape(1, -1)
+    return label_probabilities(model.predict_proba(features), threshold, decimals)
@@ -0,0 +1,156 @@
+import sys
+import time
+import argparse
+from typing import NamedTuple
+
+import numpy as np
+
+from features import FEATURE_COLUMNS, FIELDS, FIELDS_BY_NAME, encode_record
+from model_registry import DEFAULT_MODEL_PATH
+from scoring import DEFAULT_THRESHOLD
+
+
+# Points per numeric axis of a two-input sweep; one-input sweeps try every form step
+DEFAULT_GRID_STEPS = 60
+
+
+class Sweep(NamedTuple):
+    """P(heart disease) as one or two inputs of a patient vary, everything else held fixed.
+
+    ``risk`` has one axis per varied field, in ``fields`` order, indexed like
+    the matching ``values`` (numbers, or option labels for categoricals).
+    ``baseline`` is the patient's own risk, scored in the same call.
+    """
+
+    fields: tuple
+    values: tuple
+    risk: np.ndarray
+    baseline: float
+
+
+def sweep_values(field, steps=None):
+    """The values a sweep tries for ``field``.
+
+    A categorical field tries every option. A numeric field covers its form
+    range, limited to what validation accepts (the form refuses the rest):
+    every step of the widget by default, or ``steps`` evenly spaced points.
+    """
+    if field.kind == "categorical":
+        return list(field.options)
+    low, high = max(field.min_value, field.valid_min), min(field.max_value, field.valid_max)
+    integer = not isinstance(field.min_value, float)
+    if steps is None:
+        step = 1 if integer else 0.1
+        return np.round(np.arange(low, high + step / 2, step), 1)
+    values = np.linspace(low, high, steps)
+    return np.unique(np.round(values)) if integer else np.round(values, 2)
+
+
+def grid_features(patient, fields, values):
+    """Encoded rows for every combination of ``values``, plus the patient's own row last."""
+    base = encode_record(patient)
+    shape = tuple(len(v) for v in values)
+    n_rows = int(np.prod(shape))
+    features = np.repeat(base, n_rows + 1, axis=0)
+    grid = np.meshgrid(*[np.arange(n) for n in shape], indexing="ij")
+    for field, field_values, index in zip(fields, values, grid):
+        index = index.ravel()
+        if field.kind == "numeric":
+            features[:n_rows, FEATURE_COLUMNS.index(field.name)] = np.asarray(field_values)[index]
+        else:
+            columns = [FEATURE_COLUMNS.index(column) for column in field.columns]
+            features[:n_rows, columns] = field.table[index]
+    return features
+
+
+def sweep(patient, names, model=None, steps=None, model_path=DEFAULT_MODEL_PATH):
+    """Vary one or two inputs of ``patient`` and score the whole grid in one ``predict_proba`` call.
+
+    Scores with ``model``, or else the scoring model for ``model_path``.
+    """
+    if not 1 <= len(names) <= 2 or len(set(names)) != len(names):
+        raise ValueError("sweep one or two different inputs")
+    fields = [FIELDS_BY_NAME[name] for name in names]
+    if steps is None and len(fields) == 2:
+        steps = DEFAULT_GRID_STEPS
+    values = tuple(sweep_values(field, steps) for field in fields)
+    if model is None:
+        from tree_engine import get_scoring_model
+
+        model = get_scoring_model(model_path)
+
+    positive = model.predict_proba(grid_features(patient, fields, values))[:, 1]
+    risk = positive[:-1].reshape(tuple(len(v) for v in values))
+    return Sweep(tuple(names), values, risk, float(positive[-1]))
+
+
+def figure(result, patient, threshold=DEFAULT_THRESHOLD):
+    """A plotly risk curve (one input) or heatmap (two inputs), marking the patient's own values."""
+    import plotly.graph_objects as go
+
+    labels = [FIELDS_BY_NAME[name].label for name in result.fields]
+    current = [patient[name] for name in result.fields]
+    if len(result.fields) == 1:
+        # Options are separate points; a numeric input is a continuous curve
+        mode = "lines+markers" if FIELDS_BY_NAME[result.fields[0]].kind == "categorical" else "lines"
+        fig = go.Figure(go.Scatter(x=result.values[0], y=result.risk * 100, mode=mode,
+                                   line=dict(color="#ff3547", width=3),
+                                   hovertemplate=f"{labels[0]}: %{{x}}<br>Risk: %{{y:.1f}}%<extra></extra>"))
+        fig.add_hline(y=threshold * 100, line_dash="dot", line_color="#aaa",
+                      annotation_text="decision threshold", annotation_position="top left")
+        fig.add_trace(go.Scatter(x=[current[0]], y=[result.baseline * 100], mode="markers",
+                                 marker=dict(size=14, color="#ffffff", line=dict(color="#ff3547", width=3)),
+                                 name="this patient", hovertemplate="This patient: %{y:.1f}%<extra></extra>"))
+        fig.update_layout(xaxis_title=labels[0], yaxis_title="Risk of heart disease (%)",
+                          yaxis_range=[0, 100], showlegend=False)
+    else:
+        fig = go.Figure(go.Heatmap(x=result.values[1], y=result.values[0], z=result.risk * 100,
+                                   zmin=0, zmax=100, colorscale=[[0, "#4CAF50"], [threshold, "#151f30"],
+                                                                 [1, "#ff3547"]],
+                                   colorbar=dict(title="Risk %"),
+                                   hovertemplate=f"{labels[1]}: %{{x}}<br>{labels[0]}: %{{y}}<br>"
+                                                 f"Risk: %{{z:.1f}}%<extra></extra>"))
+        fig.add_trace(go.Scatter(x=[current[1]], y=[current[0]], mode="markers",
+                                 marker=dict(size=14, color="#ffffff", symbol="x"),
+                                 hovertemplate=f"This patient: {result.baseline * 100:.1f}%<extra></extra>"))
+        fig.update_layout(xaxis_title=labels[1], yaxis_title=labels[0], showlegend=False)
+    fig.update_layout(template="plotly_dark", paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)",
+                      margin=dict(l=10, r=10, t=30, b=10), height=420)
+    return fig
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep one or two inputs of a patient and time the batched call.")
+    parser.add_argument("--field", action="append", required=True, choices=[field.name for field in FIELDS],
+                        help="input to vary; give it twice for a two-input grid")
+    parser.add_argument("--set", action="append", default=[], metavar="FIELD=VALUE",
+                        help="patient values other than the form defaults")
+    parser.add_argument("--steps", type=int, default=None, help="points per numeric axis")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH)
+    args = parser.parse_args(argv)
+
+    from model_registry import get_model
+
+    patient = {field.name: field.default for field in FIELDS}
+    for spec in args.set:
+        name, _, value = spec.partition("=")
+        if name not in FIELDS_BY_NAME:
+            parser.error(f"unknown field {name!r}")
+        patient[name] = float(value) if FIELDS_BY_NAME[name].kind == "numeric" else value
+
+    model = get_model(args.model)
+    start = time.perf_counter()
+    result = sweep(patient, args.field, model, args.steps)
+    seconds = time.perf_counter() - start
+
+    print(f"{result.risk.size} points scored in {seconds * 1000:.1f} ms; "
+          f"this patient {result.baseline:.1%}", file=sys.stderr)
+    for label, flat in (("lowest", result.risk.argmin()), ("highest", result.risk.argmax())):
+        index = np.unravel_index(flat, result.risk.shape)
+        at = ", ".join(f"{name}={values[i]}" for name, values, i in zip(result.fields, result.values, index))
+        print(f"  {label} risk {result.risk[index]:.1%} at {at}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,291 @@
+import os
+import sys
+import json
+import signal
+import logging
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from coalescer import DEFAULT_MAX_BATCH_SIZE, DEFAULT_MAX_WAIT_MS, MicroBatcher
+from drift import monitor
+from features import FIELD_NAMES, encode, encode_record
+from metrics import BATCH_ROWS, CONTENT_TYPE, metrics, record_request, span, stats_collector
+from model_registry import DEFAULT_MODEL_PATH, registry
+from prediction_cache import cached_predict
+from prediction_log import log_prediction
+from rollout import DEFAULT_VARIANTS, ModelRouter, parse_variant, parse_variants
+from scoring import DEFAULT_THRESHOLD, score
+from timing import StageTimer
+from tree_engine import get_scoring_model, scoring_version
+from validation import validate
+
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 32 * 1024 * 1024
+
+
+class RequestTooLarge(ValueError):
+    pass
+
+
+def _result_rows(result):
+    return [
+        {
+            "prediction": int(label),
+            "probabilities": {"no_heart_disease": float(p[0]), "heart_disease": float(p[1])},
+            "percentages": {"no_heart_disease": float(pct[0]), "heart_disease": float(pct[1])},
+        }
+        for label, p, pct in zip(result.labels, result.probabilities, result.percentages)
+    ]
+
+
+def _column(records, name):
+    # One field across a batch of JSON records, as a 1-D object array (None where absent)
+    column = np.empty(len(records), dtype=object)
+    column[:] = [record.get(name) for record in records]
+    return column
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    """JSON scoring endpoint.
+
+    GET  /health         model version and load stats
+    GET  /metrics        Prometheus text format counters and histograms
+    POST /predict        one patient: {"Age": 48, "Sex": "Male", ...}
+    POST /predict/batch  {"records": [{...}, {...}]} or a bare list of patients
+
+    Input is validated before it reaches the model: an invalid patient gets a
+    400 with the reasons, and invalid rows of a batch get {"error": ...} in
+    place of a prediction while the rest are scored.
+
+    With model variants (--variant), each request is scored by the variant
+    the router picks and the response names it under "model"; shadow
+    variants are compared in the background and reported by /health.
+    """
+
+    # Keep-alive lets a client reuse one connection for many requests
+    protocol_version = "HTTP/1.1"
+    # Small JSON responses otherwise stall on Nagle + delayed ACK (~40 ms each)
+    disable_nagle_algorithm = True
+    server_version = "HeartFailurePrediction/1.0"
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/health":
+            entry = registry.entry(self.server.model_path)
+            body = {"status": "ok", "model": entry.stats()}
+            if self.server.batcher is not None:
+                body["batcher"] = self.server.batcher.stats()
+            if self.server.router is not None:
+                body["variants"] = self.server.router.stats()
+            self._send_json(200, body)
+        elif self.path.rstrip("/") == "/metrics":
+            self._send(200, CONTENT_TYPE, metrics.render().encode())
+        else:
+            self._send_json(404, {"error": f"no route for GET {self.path}"})
+
+    def do_POST(self):
+        route = self.path.rstrip("/")
+        if route not in ("/predict", "/predict/batch"):
+            self._send_json(404, {"error": f"no route for POST {self.path}"})
+            return
+
+        with span(f"POST {route}", route=route):
+            self._predict(route)
+
+    def _predict(self, route):
+        timer = StageTimer()
+        name = "http" if route == "/predict" else "http_batch"
+        check = None
+        try:
+            payload = self._read_json()
+            if route == "/predict":
+                if not isinstance(payload, dict):
+                    raise ValueError("expected a JSON object with the patient's fields")
+                validate(payload).raise_if_invalid()
+                features = encode_record(payload)
+            else:
+                records = payload.get("records") if isinstance(payload, dict) else payload
+                if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+                    raise ValueError('expected a JSON list of patients or {"records": [...]}')
+                columns = {name: _column(records, name) for name in FIELD_NAMES}
+                check = validate(columns)
+                features = encode({name: values[check.valid] for name, values in columns.items()})
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(413 if isinstance(e, RequestTooLarge) else 400, {"error": str(e)})
+            record_request(f"{name}_rejected")
+            return
+        timer.lap("encode")
+
+        variant = None
+        if not len(features):
+            result = None
+        elif self.server.router is not None:
+            # Scored straight by the picked variant: the cache and batcher are keyed on a single model
+            result, variant = self.server.router.predict(features, self.headers.get("X-Session-Id"))
+        elif route == "/predict":
+            # Repeat patients are answered from the cache; the rest go to the booster,
+            # through the micro-batcher when one is running
+            result = cached_predict(features, self._score_single,
+                                    self.server.model_path, self.server.threshold)
+        else:
+            result = score(get_scoring_model(self.server.model_path), features, self.server.threshold)
+            BATCH_ROWS.observe(len(features), "http_batch")
+        timer.lap("inference")
+
+        rows = _result_rows(result) if result is not None else []
+        if variant is not None:
+            model = {"variant": variant.name, "version": registry.entry(variant.model_path).version}
+            for row in rows:
+                row["model"] = model
+        if route == "/predict":
+            self._send_json(200, rows[0])
+        else:
+            if not check.all_valid:
+                # Put the rejected rows back in their places, each with its reasons
+                scored = iter(rows)
+                reasons = check.reasons()
+                rows = [next(scored) if ok else {"prediction": None, "error": reasons[i]}
+                        for i, ok in enumerate(check.valid)]
+            self._send_json(200, {"results": rows})
+        timer.lap("render")
+        record_request(name, timer, result)
+        if result is not None:
+            monitor.observe(features)
+            model_path = variant.model_path if variant is not None else self.server.model_path
+            log_prediction(features, result, scoring_version(model_path), name, timer.total * 1000)
+
+    def _score_single(self, features):
+        if self.server.batcher is not None:
+            return self.server.batcher.predict(features)
+        return score(get_scoring_model(self.server.model_path), features, self.server.threshold)
+
+    def _read_json(self):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0 or length > MAX_BODY_BYTES:
+            # The body is left unread, so it must not be parsed as the next request on this connection
+            self.close_connection = True
+            if length < 0:
+                raise ValueError("invalid Content-Length")
+            raise RequestTooLarge(f"request body over {MAX_BODY_BYTES} bytes")
+        try:
+            return json.loads(self.rfile.read(length) or b"null")
+        except json.JSONDecodeError as e:
+            raise ValueError(f"invalid JSON: {e}") from None
+
+    def _send_json(self, status, body):
+        self._send(status, "application/json", json.dumps(body).encode())
+
+    def _send(self, status, content_type, data):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+class PredictionServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, model_path=DEFAULT_MODEL_PATH, threshold=DEFAULT_THRESHOLD):
+        super().__init__(address, PredictionHandler)
+        self.model_path = model_path
+        self.threshold = threshold
+        self.batcher = None
+        self.router = None
+        # Load (and compile, or build the risk table) before accepting connections,
+        # so the first request doesn't pay for it
+        get_scoring_model(model_path)
+
+
+def make_server(host="127.0.0.1", port=0, model_path=DEFAULT_MODEL_PATH, threshold=DEFAULT_THRESHOLD):
+    # port=0 picks a free port; read it back from server.server_address
+    return PredictionServer((host, port), model_path, threshold)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve heart failure predictions over HTTP/JSON.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH, help="model artifact to score with")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="P(heart disease) above which a patient is labelled a heart patient")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes accepting on the same socket (forked after the model is loaded)")
+    parser.add_argument("--coalesce", action="store_true",
+                        help="micro-batch concurrent /predict requests into one booster call")
+    parser.add_argument("--max-batch-size", type=int, default=DEFAULT_MAX_BATCH_SIZE,
+                        help="with --coalesce, most rows scored per booster call")
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS,
+                        help="with --coalesce, longest a request waits for others to join its batch")
+    parser.add_argument("--variant", action="append", default=[], metavar="NAME=PATH[:WEIGHT|:shadow]",
+                        help="serve several model versions: split traffic by weight, or score one in shadow "
+                             "(repeat per variant, or set HEART_MODEL_VARIANTS; requests with the same X-Session-Id stick to one variant)")
+    args = parser.parse_args(argv)
+
+    try:
+        variants = [parse_variant(spec) for spec in args.variant] or parse_variants(DEFAULT_VARIANTS)
+    except ValueError as e:
+        parser.error(str(e))
+
+    def serve():
+        # The batcher's thread doesn't survive fork, so each worker starts its own
+        if args.coalesce:
+            server.batcher = MicroBatcher(args.model, args.threshold,
+                                          args.max_batch_size, args.max_wait_ms)
+            metrics.add_collector(stats_collector("heart_coalescer", server.batcher.stats, "Micro-batcher"))
+        # Likewise the router's shadow thread
+        if variants:
+            server.router = ModelRouter(variants, args.threshold)
+            metrics.add_collector(server.router.collect)
+        server.serve_forever()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    server = make_server(args.host, args.port, args.model, args.threshold)
+    for variant in variants:
+        get_scoring_model(variant.model_path)
+    host, port = server.server_address[:2]
+
+    # Pre-fork: workers inherit the listening socket and share the loaded model's pages
+    children = []
+    if args.workers > 1 and hasattr(os, "fork"):
+        for _ in range(args.workers - 1):
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    serve()
+                except KeyboardInterrupt:
+                    pass
+                finally:
+                    os._exit(0)
+            children.append(pid)
+        # Make sure a SIGTERM to the parent also takes the workers down
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    logger.info("Serving predictions on http://%s:%d with %d worker(s)", host, port, len(children) + 1)
+    try:
+        serve()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+_PROCESS_START = time.perf_counter()
+
+# Heavy third-party imports in the order the app would normally hit them
+HEAVY_MODULES = ("numpy", "pandas", "PIL", "streamlit", "sklearn", "xgboost", "matplotlib", "plotly")
+
+
+def import_timings(modules=HEAVY_MODULES):
+    """Seconds to import each of ``modules`` in order, in a fresh interpreter (``-X importtime``).
+
+    Each figure is the extra cost of that module given the ones before it
+    (0.0 if they already imported it); None means it could not be imported.
+    """
+    # Plain import statements: -X importtime doesn't report importlib.import_module
+    code = "".join(f"try:\n    import {name}\nexcept ImportError:\n    print({name!r})\n" for name in modules)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            capture_output=True, text=True, check=True)
+    timings = dict.fromkeys(modules, 0.0)
+    for line in result.stderr.splitlines():
+        # Top-level imports are the lines whose package name is not indented
+        fields = line.split("|")
+        if len(fields) == 3 and fields[0].startswith("import time:") and not fields[2].startswith("  "):
+            name = fields[2].strip()
+            if name in timings and fields[1].strip().isdigit():
+                timings[name] = int(fields[1]) / 1e6
+    timings.update(dict.fromkeys(result.stdout.split()))
+    return timings
+
+
+def cold_start_report(model_path=None, modules=HEAVY_MODULES, engine="xgboost"):
+    """Measure a cold start in this (fresh) process, stage by stage.
+
+    Time to first prediction covers the app's own imports, loading the
+    model and scoring one patient. The per-module import timings come from a
+    separate interpreter afterwards, since by then this one has them loaded.
+    """
+    report = {}
+
+    start = time.perf_counter()
+    from features import FIELDS, encode_record
+    from model_registry import DEFAULT_MODEL_PATH, registry
+    from scoring import score
+    from tree_engine import get_scoring_model
+    report["app_imports_s"] = time.perf_counter() - start
+
+    modules_before = set(sys.modules)
+    start = time.perf_counter()
+    model = get_scoring_model(model_path or DEFAULT_MODEL_PATH, engine)
+    report["model_load_s"] = time.perf_counter() - start
+    # Third-party packages that unpickling pulled in
+    report["model_load_imported"] = sorted({
+        name.split(".")[0] for name in set(sys.modules) - modules_before
+        if not name.startswith("_") and name.split(".")[0] not in sys.stdlib_module_names
+    } - {name.split(".")[0] for name in modules_before})
+
+    start = time.perf_counter()
+    score(model, encode_record({field.name: field.default for field in FIELDS}))
+    report["first_prediction_s"] = time.perf_counter() - start
+    report["time_to_first_prediction_s"] = time.perf_counter() - _PROCESS_START
+
+    report["imports_s"] = import_timings(modules)
+    report["model"] = registry.stats()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Report where cold-start time goes: per-import timings, model load and first prediction.")
+    parser.add_argument("--model", default=None, help="model artifact to load")
+    parser.add_argument("--engine", default="xgboost", choices=["xgboost", "numpy", "lookup"],
+                        help="inference engine to time the first prediction with")
+    args = parser.parse_args(argv)
+
+    print(json.dumps(cold_start_report(args.model, engine=args.engine), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+import os
+import json
+import time
+
+import pandas as pd
+
+from batch import DEFAULT_CHUNK_SIZE, RESULT_COLUMNS, BatchReport, finish_results, score_frame
+from model_registry import DEFAULT_MODEL_PATH, get_model
+from scoring import DEFAULT_THRESHOLD
+
+
+def _is_parquet(path):
+    return str(path).lower().endswith((".parquet", ".pq"))
+
+
+def iter_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE, start_row=0):
+    """Yield the input file as DataFrames of at most ``chunk_size`` rows.
+
+    Only one chunk is held in memory at a time. ``start_row`` skips that many
+    data rows; for Parquet whole row groups are skipped without being read.
+    """
+    if not _is_parquet(path):
+        # A callable, not a range: pandas would materialize a range as a set of every skipped row
+        skip = (lambda i: 0 < i <= start_row) if start_row else None
+        yield from pd.read_csv(path, chunksize=chunk_size, skiprows=skip)
+        return
+
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path)
+    row_groups = []
+    first_row = 0
+    offset = 0
+    for i in range(parquet_file.num_row_groups):
+        n_rows = parquet_file.metadata.row_group(i).num_rows
+        if offset + n_rows > start_row:
+            if not row_groups:
+                first_row = offset
+            row_groups.append(i)
+        offset += n_rows
+
+    to_skip = start_row - first_row
+    for batch in parquet_file.iter_batches(batch_size=chunk_size, row_groups=row_groups):
+        if to_skip >= batch.num_rows:
+            to_skip -= batch.num_rows
+            continue
+        if to_skip:
+            batch = batch.slice(to_skip)
+            to_skip = 0
+        yield batch.to_pandas()
+
+
+class CsvSink:
+    """Appends scored chunks to a CSV file, fsyncing after every chunk."""
+
+    def __init__(self, path, resume_bytes=None):
+        self.path = path
+        if resume_bytes is None:
+            self._file = open(path, "w", newline="")
+            self._header = True
+        else:
+            # Drop anything written after the last checkpoint, e.g. a half-written chunk
+            self._file = open(path, "r+" if os.path.exists(path) else "w", newline="")
+            self._file.truncate(resume_bytes)
+            self._file.seek(resume_bytes)
+            self._header = resume_bytes == 0
+
+    def write(self, frame, first_row):
+        frame.to_csv(self._file, header=self._header, index=False)
+        self._header = False
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return self._file.tell()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetSink:
+    """Writes each scored chunk as its own part file in a Parquet dataset directory.
+
+    Parts are written under a temporary name and renamed into place, so a
+    crash never leaves a truncated part behind. ``pd.read_parquet(path)``
+    reads the directory back as one table.
+    """
+
+    def __init__(self, path, keep_below=0):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        # Parts holding rows at or beyond the resume point are rewritten
+        for name in os.listdir(path):
+            if name.startswith("part-") and name[5:17].isdigit() and int(name[5:17]) >= keep_below:
+                os.remove(os.path.join(path, name))
+
+    def write(self, frame, first_row):
+        part = os.path.join(self.path, f"part-{first_row:012d}.parquet")
+        frame.to_parquet(part + ".tmp", index=False)
+        os.replace(part + ".tmp", part)
+        return 0
+
+    def close(self):
+        pass
+
+
+def _checkpoint_path(output_path):
+    return str(output_path).rstrip("/\\") + ".checkpoint.json"
+
+
+def read_checkpoint(output_path):
+    try:
+        with open(_checkpoint_path(output_path)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_checkpoint(output_path, rows, size):
+    path = _checkpoint_path(output_path)
+    with open(path + ".tmp", "w") as f:
+        json.dump({"rows": rows, "bytes": size}, f)
+    os.replace(path + ".tmp", path)
+
+
+def stream_score(input_path, output_path, model_path=DEFAULT_MODEL_PATH,
+                 chunk_size=DEFAULT_CHUNK_SIZE, threshold=DEFAULT_THRESHOLD,
+                 start_row=None, resume=False, invalid="flag"):
+    """Score a file of any size with memory bounded by ``chunk_size``.
+
+    Results are written chunk by chunk and a checkpoint next to the output
+    records how many input rows are safely on disk. With ``resume`` the run
+    continues from that checkpoint; ``start_row`` starts from an explicit row.
+    Rows failing validation are handled as in ``batch.score_frame``.
+    """
+    model = get_model(model_path)
+
+    resume_bytes = None
+    if resume:
+        checkpoint = read_checkpoint(output_path) or {"rows": 0, "bytes": 0}
+        start_row = checkpoint["rows"]
+        resume_bytes = checkpoint["bytes"]
+    start_row = start_row or 0
+
+    if _is_parquet(output_path):
+        sink = ParquetSink(output_path, keep_below=start_row if resume else 0)
+    else:
+        sink = CsvSink(output_path, resume_bytes)
+
+    rows = start_row
+    n_invalid = 0
+    start = time.perf_counter()
+    try:
+        for chunk in iter_chunks(input_path, chunk_size, start_row):
+            # Numbered by position in the whole input, so errors name the right row
+            chunk.index = pd.RangeIndex(rows, rows + len(chunk))
+            results = score_frame(model, chunk, chunk_size, threshold, invalid)
+            n_invalid += int((results[RESULT_COLUMNS[2]] < 0).sum())
+            size = sink.write(finish_results(chunk, results, invalid), rows)
+            rows += len(chunk)
+            _write_checkpoint(output_path, rows, size)
+    finally:
+        sink.close()
+
+    return BatchReport(rows - start_row, time.perf_counter() - start, n_invalid)
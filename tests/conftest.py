@@ -0,0 +1,35 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# The modules live at the repository root, next to main.py
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Requests scored by the tests aren't written to a prediction log
+os.environ["HEART_PREDICTION_LOG"] = ""
+MODEL_PATH = os.path.join(ROOT, "xgboost_heart_disease_detection_v1.pkl")
+
+
+@pytest.fixture(scope="session")
+def model():
+    from model_registry import load_pickle
+
+    return load_pickle(MODEL_PATH)
+
+
+@pytest.fixture(scope="session")
+def features():
+    # Random patients over the form ranges, every category equally likely
+    from features import FIELDS, encode
+
+    rng = np.random.default_rng(0)
+    n_rows = 2000
+    columns = {}
+    for field in FIELDS:
+        if field.kind == "numeric":
+            columns[field.name] = rng.uniform(field.min_value, field.max_value, n_rows)
+        else:
+            columns[field.name] = np.array(field.options, dtype=object)[rng.integers(len(field.options), size=n_rows)]
+    return encode(columns)
@@ -0,0 +1,40 @@
+import os
+
+import numpy as np
+import pytest
+
+from artifact import export_artifact, load_artifact, load_booster, read_manifest
+from model_registry import ModelRegistry
+
+
+def test_exported_artifact_predicts_like_the_original(model, features, tmp_path):
+    manifest_path = export_artifact(model, str(tmp_path), version="test-1")
+    expected = model.predict_proba(features)
+
+    ensemble = load_artifact(manifest_path)
+    np.testing.assert_allclose(ensemble.predict_proba(features), expected, atol=1e-6)
+    np.testing.assert_allclose(load_booster(manifest_path).predict_proba(features), expected, atol=1e-6)
+
+
+def test_registry_versions_an_artifact_by_its_manifest(model, tmp_path):
+    manifest_path = export_artifact(model, str(tmp_path), version="test-1")
+    entry = ModelRegistry().entry(manifest_path)
+    assert entry.version == "test-1"
+
+    # Touching the file reloads it but keeps the version
+    registry = ModelRegistry(check_interval=0)
+    before = registry.entry(manifest_path)
+    os.utime(manifest_path, ns=(1, 1))
+    after = registry.entry(manifest_path)
+    assert after.loads == 2 and after.version == before.version
+
+
+def test_tampered_artifact_is_rejected(model, tmp_path):
+    manifest_path = export_artifact(model, str(tmp_path))
+    with open(tmp_path / "threshold.npy", "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        last = f.read(1)[0]
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([last ^ 0xFF]))
+    with pytest.raises(ValueError, match="checksum mismatch"):
+        read_manifest(manifest_path)
@@ -0,0 +1,30 @@
+import numpy as np
+
+import coalescer
+from coalescer import MicroBatcher
+from conftest import MODEL_PATH
+from scoring import score
+
+
+def test_each_caller_gets_back_its_own_rows(model, features, monkeypatch):
+    calls = []
+
+    def counting(*args):
+        calls.append(len(args[1]))
+        return score(*args)
+
+    monkeypatch.setattr(coalescer, "score", counting)
+    batcher = MicroBatcher(MODEL_PATH, max_wait_ms=50)
+    try:
+        sizes = [1, 3, 1, 7, 2, 1, 5, 1]
+        starts = np.cumsum([0] + sizes)
+        futures = [batcher.submit(features[start:start + size]) for start, size in zip(starts, sizes)]
+        results = [future.result(timeout=30) for future in futures]
+    finally:
+        batcher.close()
+
+    expected = model.predict_proba(features[:starts[-1]])
+    for start, size, result in zip(starts, sizes, results):
+        np.testing.assert_allclose(result.probabilities, expected[start:start + size], atol=1e-6)
+    # Queued together, so scored in fewer booster calls than there were requests
+    assert sum(calls) == starts[-1] and len(calls) < len(sizes)
@@ -0,0 +1,37 @@
+from drift import MIN_ROWS, DriftMonitor, DriftReference
+from features import FEATURE_COLUMNS
+
+AGE = FEATURE_COLUMNS.index("Age")
+
+
+def _monitor(features):
+    # A frozen clock, so every observation lands in the same window
+    return DriftMonitor(DriftReference.from_features(features[:1000], "test"), clock=lambda: 1000.0)
+
+
+def test_traffic_like_the_reference_raises_no_alert(features):
+    monitor = _monitor(features)
+    monitor.observe(features[1000:])
+    report = monitor.report()
+    assert report["window_rows"] == 1000
+    assert monitor.alerts() == []
+    assert all(stats["psi"] < 0.1 for stats in report["fields"].values())
+
+
+def test_a_shifted_field_alerts_on_that_field_alone(features):
+    older = features[1000:].copy()
+    older[:, AGE] = older[:, AGE] / 2 + 45
+    monitor = _monitor(features)
+    monitor.observe(older)
+    fields = monitor.report()["fields"]
+    assert monitor.alerts() == ["Age"]
+    assert fields["Age"]["psi"] > monitor.psi_alert and fields["Age"]["ks"] > monitor.ks_alert
+
+
+def test_too_few_rows_never_alert(features):
+    older = features[1000:1000 + MIN_ROWS - 1].copy()
+    older[:, AGE] = 90
+    monitor = _monitor(features)
+    monitor.observe(older)
+    assert monitor.report()["fields"]["Age"]["psi"] > monitor.psi_alert
+    assert monitor.alerts() == []
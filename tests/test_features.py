@@ -0,0 +1,98 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from features import FIELDS, encode, encode_record, encoder
+
+
+def ladder(age, blood_pressure, cholesterol, fasting_blood_sugar, max_heart_rate, old_peak,
+           gender, chest_pain_type, ecg, exercise_angina, st_slope):
+    # The per-request encoding main.py used before features.py, kept as the reference
+    patient_fasting_blood_sugar = 1
+    if fasting_blood_sugar == "Less Than 120 mg/dl":
+        patient_fasting_blood_sugar = 0
+    new_data = [age, blood_pressure, cholesterol, patient_fasting_blood_sugar, max_heart_rate, old_peak]
+
+    patient_gender = [1]
+    if gender == "Female":
+        patient_gender = [0]
+
+    patient_chest_pain_type = [0, 0, 0]
+    if chest_pain_type == "Typical Angina":
+        patient_chest_pain_type = [0, 0, 1]
+    elif chest_pain_type == "Atypical Angina":
+        patient_chest_pain_type = [1, 0, 0]
+    elif chest_pain_type == "Non-anginal Pain":
+        patient_chest_pain_type = [0, 1, 0]
+
+    patinet_ecg = [0, 0]
+    if ecg == "Normal":
+        patinet_ecg = [1, 0]
+    elif ecg == "ST":
+        patinet_ecg = [0, 1]
+
+    patient_exercise_angina = [1]
+    if exercise_angina == "No":
+        patient_exercise_angina = [0]
+
+    patient_slope = [0, 0]
+    if st_slope == "Flat":
+        patient_slope = [1, 0]
+    elif st_slope == "Up":
+        patient_slope = [0, 1]
+
+    return (new_data + patient_gender + patient_chest_pain_type + patinet_ecg
+            + patient_exercise_angina + patient_slope)
+
+
+CATEGORICAL = [field for field in FIELDS if field.kind == "categorical"]
+
+
+def all_combinations():
+    numeric = {"Age": 54, "RestingBP": 132, "Cholesterol": 246, "MaxHR": 150, "Oldpeak": 1.2}
+    for options in itertools.product(*[field.options for field in CATEGORICAL]):
+        yield dict(numeric, **{field.name: option for field, option in zip(CATEGORICAL, options)})
+
+
+def expected(patient):
+    return ladder(*[patient[name] for name in ("Age", "RestingBP", "Cholesterol", "FastingBS", "MaxHR",
+                                               "Oldpeak", "Sex", "ChestPainType", "RestingECG",
+                                               "ExerciseAngina", "ST_Slope")])
+
+
+def test_encode_record_matches_the_old_ladder_for_every_category_combination():
+    patients = list(all_combinations())
+    assert len(patients) == 288
+    for patient in patients:
+        np.testing.assert_array_equal(encode_record(patient),
+                                      np.array([expected(patient)], dtype=np.float32))
+
+
+def test_column_encoder_matches_the_old_ladder():
+    patients = list(all_combinations())
+    reference = np.array([expected(patient) for patient in patients], dtype=np.float32)
+    np.testing.assert_array_equal(encode(pd.DataFrame(patients)), reference)
+
+
+def test_fast_path_accepts_the_same_spellings_as_the_encoder():
+    patient = {field.name: field.default for field in FIELDS}
+    patient.update(Sex=" m", ChestPainType="ASY", FastingBS=0, ExerciseAngina="y",
+                   Age=np.int64(61), Oldpeak="1.5")
+    np.testing.assert_array_equal(encode_record(patient), encoder.encode(patient))
+
+
+def test_unknown_category_is_rejected():
+    patient = {field.name: field.default for field in FIELDS}
+    patient["ST_Slope"] = "Sideways"
+    with pytest.raises(ValueError, match="ST_Slope"):
+        encode_record(patient)
+
+
+def test_booleans_are_not_categories_on_either_path():
+    patient = {field.name: field.default for field in FIELDS}
+    patient["FastingBS"] = True
+    for encode_patient in (encode_record, encoder.encode):
+        with pytest.raises(ValueError, match="FastingBS"):
+            encode_patient(patient)
@@ -0,0 +1,47 @@
+from contextlib import contextmanager
+
+import metrics as metrics_module
+from metrics import MetricsRegistry, parse_metrics, span, stats_collector
+
+
+def test_render_in_the_prometheus_text_format():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ("route",))
+    latency = registry.histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+    requests.inc("http")
+    requests.inc('say "hi"', amount=2)
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, "http")
+    registry.add_collector(stats_collector("cache", lambda: {"hits": 3, "name": "lru", "ratio": None}, "Cache"))
+
+    text = registry.render()
+    assert "# TYPE requests_total counter" in text and "# TYPE latency_seconds histogram" in text
+    assert 'requests_total{route="say \\"hi\\""} 2.0' in text
+
+    samples = parse_metrics(text)
+    assert samples[("requests_total", 'route="http"')] == 1
+    # Buckets are cumulative, and a value equal to a bound falls in that bound's bucket
+    assert samples[("latency_seconds_bucket", 'route="http",le="0.1"')] == 2
+    assert samples[("latency_seconds_bucket", 'route="http",le="1.0"')] == 3
+    assert samples[("latency_seconds_bucket", 'route="http",le="+Inf"')] == 4
+    assert samples[("latency_seconds_count", 'route="http"')] == 4
+    assert samples[("latency_seconds_sum", 'route="http"')] == 3.65
+    # Only numeric stats become gauges, and missing values are left out
+    assert samples[("cache_hits", "")] == 3
+    assert not any(name in ("cache_name", "cache_ratio") for name, _ in samples)
+
+
+def test_span_hooks_wrap_each_span(monkeypatch):
+    monkeypatch.setattr(metrics_module, "_span_hooks", [])
+    seen = []
+
+    @contextmanager
+    def hook(name, attributes):
+        seen.append(("enter", name, attributes))
+        yield
+        seen.append(("exit", name))
+
+    metrics_module.add_span_hook(hook)
+    with span("predict", route="/predict"):
+        seen.append("body")
+    assert seen == [("enter", "predict", {"route": "/predict"}), "body", ("exit", "predict")]
@@ -0,0 +1,40 @@
+import os
+import time
+
+from model_registry import ModelRegistry
+
+
+def _read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def test_registry_reloads_a_changed_file_after_the_check_interval(tmp_path):
+    path = tmp_path / "model.txt"
+    path.write_text("v1")
+    registry = ModelRegistry(loader=_read, check_interval=0.05)
+    reloaded = []
+    registry.add_listener(reloaded.append)
+
+    assert registry.get(str(path)) == "v1"
+    path.write_text("v2 is longer")
+    # Within the interval the file isn't looked at
+    assert registry.get(str(path)) == "v1"
+
+    time.sleep(0.1)
+    entry = registry.entry(str(path))
+    assert entry.model == "v2 is longer" and entry.loads == 2
+    assert [e.model for e in reloaded] == ["v1", "v2 is longer"]
+
+    # Unchanged since, so later checks keep the same entry
+    time.sleep(0.1)
+    assert registry.entry(str(path)) is entry
+
+
+def test_registry_keeps_serving_while_the_file_is_missing(tmp_path):
+    path = tmp_path / "model.txt"
+    path.write_text("v1")
+    registry = ModelRegistry(loader=_read, check_interval=0)
+    entry = registry.entry(str(path))
+    os.remove(path)
+    assert registry.entry(str(path)) is entry
@@ -0,0 +1,50 @@
+import os
+import pickle
+import shutil
+import time
+
+from conftest import MODEL_PATH
+from model_registry import registry
+from prediction_cache import PredictionCache, cache, cached_predict
+from scoring import score
+
+
+def test_cache_skips_scoring_rows_it_has_seen(model, features):
+    calls = []
+
+    def scorer(rows):
+        calls.append(len(rows))
+        return score(model, rows)
+
+    cache = PredictionCache(maxsize=100)
+    first = cache.predict(features[:5], scorer, "v1")
+    again = cache.predict(features[:8], scorer, "v1")
+    assert calls == [5, 3]
+    assert (again.probabilities[:5] == first.probabilities).all()
+    # Another model version never reads the first one's rows
+    cache.predict(features[:5], scorer, "v2")
+    assert calls == [5, 3, 5]
+
+
+def test_swapping_the_model_file_misses_the_cache(model, features, tmp_path, monkeypatch):
+    path = str(tmp_path / "model.pkl")
+    shutil.copy(MODEL_PATH, path)
+    monkeypatch.setattr(registry, "check_interval", 0.05)
+
+    def scorer(rows):
+        return score(registry.get(path), rows)
+
+    rows = features[:10]
+    cached_predict(rows, scorer, path)
+    misses = cache.misses
+    cached_predict(rows, scorer, path)
+    assert cache.misses == misses
+
+    # A new model file: same predictions, different bytes, so a new version
+    with open(path, "wb") as f:
+        pickle.dump(model, f, protocol=2)
+    os.utime(path, ns=(time.time_ns(), time.time_ns()))
+    time.sleep(0.1)
+    cached_predict(rows, scorer, path)
+    assert cache.misses == misses + len(rows)
+    assert registry.entry(path).loads == 2
@@ -0,0 +1,32 @@
+import numpy as np
+
+import prediction_log
+from prediction_log import PredictionLog, get_prediction_log, log_prediction
+from scoring import score
+
+
+def test_logged_requests_can_be_queried_by_cohort(model, features, tmp_path):
+    log = PredictionLog(str(tmp_path / "predictions.db"), flush_interval=0.01)
+    result = score(model, features[:100])
+    log.log(features[:100], result, "v1", "test")
+    assert log.flush(timeout=5)
+
+    assert log.count() == 100
+    assert log.count(model_version="v2") == 0
+    # Sex_M is column 6 of the encoded features
+    assert log.count(where={"Sex": "Male"}) == int((features[:100, 6] == 1).sum())
+    rows = log.query(columns=["probability"])
+    np.testing.assert_allclose(rows["probability"], result.probabilities[:, 1], rtol=1e-6)
+    log.close()
+
+
+def test_a_log_that_cannot_be_opened_turns_logging_off(model, features, monkeypatch, caplog):
+    monkeypatch.setattr(prediction_log, "_log", None)
+    monkeypatch.setattr(prediction_log, "_log_failed", False)
+    path = "/nonexistent/dir/predictions.db"
+    assert get_prediction_log(path) is None
+    assert get_prediction_log(path) is None
+    assert caplog.text.count("Could not open the prediction log") == 1
+
+    # Requests that would have been logged still go through
+    log_prediction(features[:1], score(model, features[:1]), "v1")
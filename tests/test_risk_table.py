@@ -0,0 +1,36 @@
+import numpy as np
+
+import risk_table
+from conftest import MODEL_PATH
+from model_registry import registry
+from risk_table import RiskTable, is_servable, verify
+from tree_engine import get_scoring_model, scoring_version
+
+
+def test_table_round_trips_and_reports_its_error(model, tmp_path):
+    table = RiskTable.build(model, max_cells=64)
+    report = verify(table, model, n_samples=5000)
+    assert report["table_cells"] == 288 * int(np.prod(table.shape[1:]))
+    assert report["mean_abs_error"] < 0.1
+
+    path = str(tmp_path / "table.npz")
+    table.save(path)
+    loaded = RiskTable.load(path)
+    assert loaded.version == table.version
+    np.testing.assert_array_equal(loaded.probabilities, table.probabilities)
+
+
+def test_lookup_engine_serves_the_table_only_within_tolerance(model, monkeypatch):
+    entry = registry.entry(MODEL_PATH)
+    table = RiskTable.build(model, max_cells=64, model_sha256=entry.sha256)
+    monkeypatch.setattr(risk_table, "_tables", {(entry.path, entry.sha256): table})
+
+    table.max_abs_error = risk_table.MAX_ERROR * 10
+    assert not is_servable(table)
+    assert get_scoring_model(MODEL_PATH, "lookup") is entry.model
+    assert scoring_version(MODEL_PATH, "lookup") == entry.version
+
+    table.max_abs_error = 0.0
+    assert get_scoring_model(MODEL_PATH, "lookup") is table
+    # Cached and logged apart from the exact model's predictions
+    assert scoring_version(MODEL_PATH, "lookup") == f"{entry.version}+lookup-{table.version}"
@@ -0,0 +1,33 @@
+import numpy as np
+
+from conftest import MODEL_PATH
+from rollout import ModelRouter, Variant, parse_variants
+
+
+def test_sessions_stick_to_a_variant_picked_by_weight():
+    router = ModelRouter(parse_variants(f"a={MODEL_PATH}:3;b={MODEL_PATH}:1"))
+    picks = [router.choose(f"session-{i}").name for i in range(4000)]
+    assert abs(picks.count("a") / len(picks) - 0.75) < 0.03
+    assert all(router.choose(f"session-{i}").name == pick for i, pick in enumerate(picks[:100]))
+
+
+def test_shadow_is_compared_with_what_was_served(model, features):
+    broken = Variant("broken", "/nonexistent/model.pkl", shadow=True)
+    router = ModelRouter([Variant("live", MODEL_PATH), Variant("candidate", MODEL_PATH, shadow=True), broken])
+    try:
+        for start in range(0, 100, 10):
+            result, variant = router.predict(features[start:start + 10], key="session")
+            assert variant.name == "live"
+            np.testing.assert_allclose(result.probabilities, model.predict_proba(features[start:start + 10]),
+                                       atol=1e-6)
+        router.drain()
+        live, candidate, broken = router.stats()["variants"]
+    finally:
+        router.close()
+
+    assert live["requests"] == 10 and live["rows"] == 100
+    # Same model in shadow: every row compared, and every label agrees
+    assert candidate["compared_rows"] == 100 and candidate["agreement"] == 1.0
+    assert candidate["max_abs_diff"] == 0.0
+    # A failing shadow only counts errors; it never touched what was served
+    assert broken["errors"] == 10
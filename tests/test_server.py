@@ -0,0 +1,74 @@
+import json
+import threading
+from http.client import HTTPConnection
+
+import pytest
+
+from conftest import MODEL_PATH
+from server import make_server
+
+PATIENT = {"Age": 48, "Sex": "M", "ChestPainType": "TA", "RestingBP": 140, "Cholesterol": 228,
+           "FastingBS": 1, "RestingECG": "Normal", "MaxHR": 100, "ExerciseAngina": "N",
+           "Oldpeak": 2.5, "ST_Slope": "Up"}
+
+
+@pytest.fixture(scope="module")
+def server():
+    server = make_server(port=0, model_path=MODEL_PATH)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _request(server, method, path, body=None, headers=None):
+    connection = HTTPConnection(*server.server_address[:2], timeout=30)
+    try:
+        connection.request(method, path, body=body, headers=headers or {})
+        response = connection.getresponse()
+        return response, response.read()
+    finally:
+        connection.close()
+
+
+def test_predict(server, model):
+    from features import encode_record
+
+    response, body = _request(server, "POST", "/predict", json.dumps(PATIENT))
+    assert response.status == 200
+    result = json.loads(body)
+    expected = model.predict_proba(encode_record(PATIENT))[0, 1]
+    assert result["probabilities"]["heart_disease"] == pytest.approx(expected, abs=1e-6)
+    assert result["percentages"]["heart_disease"] == 53.0
+
+
+def test_batch_scores_valid_rows_and_explains_invalid_ones(server):
+    records = [PATIENT, dict(PATIENT, Cholesterol=0), dict(PATIENT, Sex="Other"), dict(PATIENT, Age=70)]
+    response, body = _request(server, "POST", "/predict/batch", json.dumps({"records": records}))
+    assert response.status == 200
+    results = json.loads(body)["results"]
+    assert [row["prediction"] is not None for row in results] == [True, False, False, True]
+    assert "Cholesterol" in results[1]["error"] and "Sex" in results[2]["error"]
+
+
+def test_malformed_requests_are_rejected(server):
+    response, body = _request(server, "POST", "/predict", b"{not json")
+    assert response.status == 400 and "invalid JSON" in json.loads(body)["error"]
+    response, body = _request(server, "POST", "/predict", json.dumps(dict(PATIENT, Age=-4)))
+    assert response.status == 400
+
+    # An oversized body is refused unread, and the connection is closed rather than reused
+    response, _ = _request(server, "POST", "/predict", b"{}", {"Content-Length": str(1 << 40)})
+    assert response.status == 413 and response.getheader("Connection") == "close"
+
+
+def test_health_and_metrics(server):
+    response, body = _request(server, "GET", "/health")
+    assert response.status == 200
+    health = json.loads(body)
+    assert health["status"] == "ok" and health["model"]["version"]
+
+    response, body = _request(server, "GET", "/metrics")
+    assert response.status == 200
+    assert b'heart_requests_total{route="http"}' in body
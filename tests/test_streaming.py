@@ -0,0 +1,38 @@
+import pandas as pd
+import pytest
+
+import streaming
+from benchmark import synthetic_patients
+from conftest import MODEL_PATH
+from streaming import read_checkpoint, stream_score
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+def test_an_interrupted_run_resumes_from_its_checkpoint(tmp_path, monkeypatch, suffix):
+    input_path = str(tmp_path / "patients.csv")
+    pd.DataFrame(synthetic_patients(1000)).to_csv(input_path, index=False)
+    expected_path = str(tmp_path / f"expected{suffix}")
+    stream_score(input_path, expected_path, MODEL_PATH, chunk_size=300)
+
+    # Fail on the third chunk, after two have been written and checkpointed
+    score_frame = streaming.score_frame
+    calls = []
+
+    def failing(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 3:
+            raise RuntimeError("interrupted")
+        return score_frame(*args, **kwargs)
+
+    output_path = str(tmp_path / f"scored{suffix}")
+    monkeypatch.setattr(streaming, "score_frame", failing)
+    with pytest.raises(RuntimeError):
+        stream_score(input_path, output_path, MODEL_PATH, chunk_size=300)
+    assert read_checkpoint(output_path)["rows"] == 600
+
+    monkeypatch.setattr(streaming, "score_frame", score_frame)
+    report = stream_score(input_path, output_path, MODEL_PATH, chunk_size=300, resume=True)
+    assert report.rows == 400
+
+    read = pd.read_csv if suffix == ".csv" else pd.read_parquet
+    pd.testing.assert_frame_equal(read(output_path), read(expected_path))
@@ -0,0 +1,24 @@
+import numpy as np
+
+from tree_engine import TreeEnsemble
+
+
+def test_numpy_engine_matches_xgboost(model, features):
+    ensemble = TreeEnsemble.from_model(model)
+    np.testing.assert_allclose(ensemble.predict_proba(features), model.predict_proba(features), atol=1e-6)
+
+
+def test_missing_values_follow_the_default_branch(model, features):
+    ensemble = TreeEnsemble.from_model(model)
+    features = features.copy()
+    features[::3, 2] = np.nan
+    features[1::4, 0] = np.nan
+    np.testing.assert_allclose(ensemble.predict_proba(features), model.predict_proba(features), atol=1e-6)
+
+
+def test_single_row_and_saved_ensemble(model, features, tmp_path):
+    ensemble = TreeEnsemble.from_model(model)
+    ensemble.save(tmp_path / "ensemble.npz")
+    loaded = TreeEnsemble.load(tmp_path / "ensemble.npz")
+    np.testing.assert_array_equal(loaded.predict_proba(features[:1]), ensemble.predict_proba(features[0]))
+    np.testing.assert_allclose(loaded.predict_proba(features[:1]), model.predict_proba(features[:1]), atol=1e-6)
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from batch import score_frame
+from features import FIELDS
+from validation import validate
+
+
+def patients(n_rows):
+    return pd.DataFrame([{field.name: field.default for field in FIELDS}] * n_rows)
+
+
+def test_booleans_are_not_numbers():
+    patient = {field.name: field.default for field in FIELDS}
+    assert validate(dict(patient, Age=True)).reasons(0) == ["Age is not a number"]
+
+    # As they arrive from a JSON batch: an object column mixing booleans and numbers
+    ages = np.empty(3, dtype=object)
+    ages[:] = [True, 50, "60"]
+    check = validate(dict(patients(3), Age=ages))
+    assert check.valid.tolist() == [False, True, True]
+
+
+def test_error_names_the_row_by_its_position_in_the_whole_input(model):
+    # A shard or streamed chunk keeps the input's row numbers as its index
+    frame = patients(1000)
+    frame.index = pd.RangeIndex(4000, 5000)
+    frame.loc[4321, "Cholesterol"] = 0
+    with pytest.raises(ValueError, match="^row 4321: Cholesterol"):
+        score_frame(model, frame, chunk_size=100, invalid="error")
@@ -0,0 +1,30 @@
+import time
+import logging
+
+
+class StageTimer:
+    """Wall-clock timings for the named stages of one request, in run order."""
+
+    def __init__(self):
+        self.stages = {}
+        self._last = time.perf_counter()
+
+    def lap(self, name):
+        # Record the time since the previous lap (or since the timer was created) as ``name``
+        now = time.perf_counter()
+        self.stages[name] = self.stages.get(name, 0.0) + now - self._last
+        self._last = now
+
+    @property
+    def total(self):
+        return sum(self.stages.values())
+
+    def as_ms(self):
+        timings = {name: seconds * 1000 for name, seconds in self.stages.items()}
+        timings["total"] = self.total * 1000
+        return timings
+
+    def log(self, logger, label="request", level=logging.INFO):
+        if logger.isEnabledFor(level):
+            parts = " ".join(f"{name}={ms:.2f}ms" for name, ms in self.as_ms().items())
+            logger.log(level, "%s timings: %s", label, parts)
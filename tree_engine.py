@@ -0,0 +1,222 @@
+import os
+import json
+import logging
+import threading
+
+import numpy as np
+
+from model_registry import DEFAULT_MODEL_PATH, registry
+
+
+logger = logging.getLogger(__name__)
+
+# "xgboost" scores through the unpickled XGBClassifier, "numpy" through TreeEnsemble,
+# "lookup" through the precomputed (approximate) RiskTable in risk_table.py
+DEFAULT_ENGINE = os.environ.get("HEART_INFERENCE_ENGINE", "xgboost")
+
+
+class TreeEnsemble:
+    """A gradient-boosted tree ensemble flattened into NumPy arrays.
+
+    All trees share one set of node arrays. Children are global node indices
+    and every leaf points back to itself, so once every split has been
+    evaluated in one comparison, ``depth`` rounds of gathers walk every tree
+    for every row at once with no Python loop over trees or rows.
+    Exposes ``predict_proba`` so it can stand in for the XGBClassifier.
+
+    This is meant for single rows and small batches, where it avoids the
+    sklearn wrapper and DMatrix overhead. For large batches XGBoost's own
+    multithreaded predictor is faster.
+    """
+
+    def __init__(self, feature, threshold, left, right, default_left, value, roots,
+                 base_margin, depth, feature_names=None):
+        self.feature = np.asarray(feature, dtype=np.intp)
+        self.threshold = np.asarray(threshold, dtype=np.float32)
+        self.left = np.asarray(left, dtype=np.intp)
+        self.right = np.asarray(right, dtype=np.intp)
+        self.default_left = np.asarray(default_left, dtype=bool)
+        self.value = np.asarray(value, dtype=np.float32)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.base_margin = float(base_margin)
+        self.depth = int(depth)
+        self.feature_names = list(feature_names) if feature_names is not None else None
+        # Rows per pass, bounding the (rows x nodes) split table to a few MB
+        self.chunk_size = max(1, (1 << 22) // max(len(self.feature), 1))
+
+    @classmethod
+    def from_booster(cls, booster):
+        model = json.loads(booster.save_raw("json"))
+        learner = model["learner"]
+        objective = learner["objective"]["name"]
+        if objective != "binary:logistic":
+            raise ValueError(f"only binary:logistic boosters can be compiled, not {objective}")
+
+        base_score = float(learner["learner_model_param"]["base_score"].strip("[]"))
+        base_margin = np.log(base_score / (1.0 - base_score))
+
+        feature, threshold, left, right, default_left, value, roots = [], [], [], [], [], [], []
+        depth = 0
+        for tree in learner["gradient_booster"]["model"]["trees"]:
+            offset = len(feature)
+            roots.append(offset)
+            tree_left = tree["left_children"]
+            tree_right = tree["right_children"]
+            node_depth = [0] * len(tree_left)
+            for node, (lc, rc) in enumerate(zip(tree_left, tree_right)):
+                if lc == -1:
+                    # Leaf: split_conditions holds the leaf value; loop back to itself
+                    feature.append(0)
+                    threshold.append(0.0)
+                    left.append(offset + node)
+                    right.append(offset + node)
+                    default_left.append(True)
+                    value.append(tree["split_conditions"][node])
+                else:
+                    feature.append(tree["split_indices"][node])
+                    threshold.append(tree["split_conditions"][node])
+                    left.append(offset + lc)
+                    right.append(offset + rc)
+                    default_left.append(bool(tree["default_left"][node]))
+                    value.append(0.0)
+                    node_depth[lc] = node_depth[rc] = node_depth[node] + 1
+            depth = max(depth, max(node_depth))
+
+        return cls(feature, threshold, left, right, default_left, value, roots,
+                   base_margin, depth, learner.get("feature_names"))
+
+    @classmethod
+    def from_model(cls, model):
+        return cls.from_booster(model.get_booster())
+
+    def save(self, path):
+        np.savez(path, feature=self.feature, threshold=self.threshold, left=self.left,
+                 right=self.right, default_left=self.default_left, value=self.value,
+                 roots=self.roots, base_margin=self.base_margin, depth=self.depth,
+                 feature_names=np.array(self.feature_names or [], dtype=str))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            names = [str(name) for name in data["feature_names"]] or None
+            return cls(data["feature"], data["threshold"], data["left"], data["right"],
+                       data["default_left"], data["value"], data["roots"],
+                       data["base_margin"], data["depth"], names)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def predict_margin(self, features):
+        features = np.asarray(features, dtype=np.float32)
+        if features.ndim == 1:
+            features = features.reshape(1, -1)
+        has_missing = np.isnan(features).any()
+        margin = np.empty(len(features), dtype=np.float64)
+        for start in range(0, len(features), self.chunk_size):
+            chunk = features[start:start + self.chunk_size]
+            margin[start:start + len(chunk)] = self._chunk_margin(chunk, has_missing)
+        return margin
+
+    def _chunk_margin(self, features, has_missing):
+        n_rows, n_nodes = len(features), len(self.feature)
+
+        # Decide every split for every row up front: nxt[i, j] is where row i goes from node j
+        x = features[:, self.feature]
+        go_left = x < self.threshold
+        if has_missing:
+            go_left = np.where(np.isnan(x), self.default_left, go_left)
+        row_offsets = (np.arange(n_rows) * n_nodes)[:, None]
+        nxt = (np.where(go_left, self.left, self.right) + row_offsets).ravel()
+
+        # Then walking the trees is just ``depth`` gathers; leaves point at themselves
+        node = self.roots + row_offsets
+        for _ in range(self.depth):
+            node = nxt[node]
+        return self.value[node - row_offsets].sum(axis=1, dtype=np.float64) + self.base_margin
+
+    def predict_proba(self, features):
+        positive = 1.0 / (1.0 + np.exp(-self.predict_margin(features)))
+        probabilities = np.empty((len(positive), 2), dtype=np.float32)
+        probabilities[:, 1] = positive
+        probabilities[:, 0] = 1.0 - positive
+        return probabilities
+
+
+_compiled = {}
+_compiled_lock = threading.Lock()
+
+
+def get_scoring_model(model_path=DEFAULT_MODEL_PATH, engine=None):
+    """The model to hand to ``scoring.score``: the XGBClassifier or its compiled form.
+
+    Compiled ensembles are cached per model version, so a hot-reloaded
+    artifact is recompiled on first use. A risk table too far off the model
+    to serve (see risk_table.is_servable) is passed over for the model itself.
+    """
+    if (engine or DEFAULT_ENGINE) == "lookup":
+        from risk_table import get_risk_table, is_servable
+
+        table = get_risk_table(model_path)
+        if is_servable(table):
+            return table
+        return registry.entry(model_path).model
+
+    entry = registry.entry(model_path)
+    if isinstance(entry.model, TreeEnsemble) or (engine or DEFAULT_ENGINE) != "numpy":
+        return entry.model
+
+    key = (entry.path, entry.version)
+    ensemble = _compiled.get(key)
+    if ensemble is None:
+        with _compiled_lock:
+            ensemble = _compiled.get(key)
+            if ensemble is None:
+                ensemble = TreeEnsemble.from_model(entry.model)
+                for stale in [k for k in _compiled if k[0] == entry.path]:
+                    del _compiled[stale]
+                _compiled[key] = ensemble
+    return ensemble
+
+
+def scoring_version(model_path=DEFAULT_MODEL_PATH, engine=None):
+    """The version that predictions from ``get_scoring_model`` are cached and logged under.
+
+    The model's own version when it scores itself, else that version tagged
+    with the engine (and the risk table's version), since those
+    probabilities can differ from the model's.
+    """
+    entry = registry.entry(model_path)
+    model = get_scoring_model(model_path, engine)
+    if model is entry.model:
+        return entry.version
+    if isinstance(model, TreeEnsemble):
+        return f"{entry.version}+numpy"
+    return f"{entry.version}+lookup-{model.version}"
+
+
+_preloaded = set()
+
+
+def preload(model_path=DEFAULT_MODEL_PATH, engine=None):
+    """Start loading the model, and building its scoring form, in a background thread.
+
+    Like ``registry.preload``, but the compiled ensemble or risk table (whose
+    build takes seconds) is also ready before the first request needs it.
+    """
+    if (engine or DEFAULT_ENGINE) == "xgboost":
+        registry.preload(model_path)
+        return
+    key = (os.path.abspath(model_path), engine or DEFAULT_ENGINE)
+    with _compiled_lock:
+        if key in _preloaded:
+            return
+        _preloaded.add(key)
+
+    def load():
+        try:
+            get_scoring_model(model_path, engine)
+        except Exception:
+            logger.exception("Preloading the %s engine for %s failed", key[1], key[0])
+
+    threading.Thread(target=load, name="scoring-model-preload", daemon=True).start()
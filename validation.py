@@ -0,0 +1,182 @@
+import sys
+import time
+import argparse
+
+import numpy as np
+
+from features import FIELDS, _n_rows
+
+
+# Problem codes, in the order they are reported for a row
+MISSING = "missing"
+NOT_NUMERIC = "not_numeric"
+OUT_OF_RANGE = "out_of_range"
+UNKNOWN_CATEGORY = "unknown_category"
+
+
+class ValidationResult:
+    """Which rows passed validation and, for the rest, why not.
+
+    ``valid`` is a boolean mask over the input rows. ``problems`` lists
+    ``(field, code, message, mask)`` for every check that failed on at
+    least one row, so per-row reasons are only built when asked for.
+    """
+
+    def __init__(self, n_rows, problems):
+        self.n_rows = n_rows
+        self.problems = problems
+        self.valid = np.ones(n_rows, dtype=bool)
+        for _, _, _, mask in problems:
+            self.valid &= ~mask
+
+    @property
+    def all_valid(self):
+        return not self.problems
+
+    @property
+    def n_invalid(self):
+        return int(self.n_rows - self.valid.sum())
+
+    def reasons(self, row=None):
+        """Reasons for one row, or a "; "-joined reason string per row ("" when valid)."""
+        if row is not None:
+            return [message for _, _, message, mask in self.problems if mask[row]]
+        joined = np.full(self.n_rows, "", dtype=object)
+        for _, _, message, mask in self.problems:
+            joined[mask] = np.where(joined[mask] == "", message, joined[mask] + "; " + message)
+        return joined
+
+    def summary(self):
+        # {"Cholesterol: out_of_range": 12, ...}
+        return {f"{field}: {code}": int(mask.sum()) for field, code, _, mask in self.problems}
+
+    def raise_if_invalid(self):
+        if not self.all_valid:
+            raise ValueError("; ".join(self.reasons(int(np.argmin(self.valid)))))
+
+
+def _numeric(values):
+    # float64 values plus a mask of entries that weren't numbers at all (as opposed to missing)
+    array = np.asarray(values)
+    if array.dtype.kind == "b":
+        # Booleans (e.g. JSON true) would cast to 1/0, but they aren't measurements
+        return np.full(array.shape, np.nan), np.ones(array.shape, dtype=bool)
+    if array.dtype.kind in "iuf":
+        return array.astype(np.float64, copy=False), None
+    import pandas as pd
+
+    series = pd.Series(array.ravel())
+    numbers = pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64)
+    not_numeric = np.isnan(numbers) & series.notna().to_numpy()
+    if array.dtype == object:
+        booleans = series.map(lambda value: isinstance(value, (bool, np.bool_))).to_numpy(dtype=bool)
+        numbers = np.where(booleans, np.nan, numbers)
+        not_numeric |= booleans
+    return numbers, not_numeric
+
+
+def _categorical(field, values):
+    import pandas as pd
+
+    if not hasattr(values, "dtype"):
+        values = np.asarray(values, dtype=object)
+    # Each distinct value is checked once, then broadcast back over the rows
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    known = np.fromiter((field.is_known(u) for u in uniques), dtype=bool, count=len(uniques))
+    missing = codes < 0
+    unknown = ~missing & ~known[np.maximum(codes, 0)] if len(uniques) else np.zeros(len(codes), dtype=bool)
+    return missing, unknown
+
+
+def _scalar_problems(field, value):
+    # The same checks for a single value, without the array machinery (e.g. a form submission)
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return [(MISSING, f"{field.name} is missing")]
+    if field.kind == "categorical":
+        if not field.is_known(value):
+            return [(UNKNOWN_CATEGORY, f"{field.name} is not one of {', '.join(field.options)}")]
+        return []
+    if isinstance(value, (bool, np.bool_)):
+        return [(NOT_NUMERIC, f"{field.name} is not a number")]
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return [(NOT_NUMERIC, f"{field.name} is not a number")]
+    if np.isnan(number):
+        return [(MISSING, f"{field.name} is missing")]
+    if not field.valid_min <= number <= field.valid_max:
+        return [(OUT_OF_RANGE, f"{field.name} outside {field.valid_min}-{field.valid_max}")]
+    return []
+
+
+def validate(data, fields=FIELDS):
+    """Check every field of ``data`` (a mapping of scalars or columns, or a DataFrame).
+
+    Numeric fields must be present, numeric and inside the field's
+    ``valid_range``; categorical fields must be present and one of the
+    field's options or aliases. Each field is checked as a whole column.
+    """
+    n_rows = _n_rows(data)
+    problems = []
+
+    def flag(field, code, message, mask):
+        mask = np.broadcast_to(np.asarray(mask, dtype=bool), (n_rows,))
+        if mask.any():
+            problems.append((field.name, code, message, mask))
+
+    for field in fields:
+        try:
+            values = data[field.name]
+        except KeyError:
+            flag(field, MISSING, f"{field.name} is missing", True)
+            continue
+
+        if np.ndim(values) == 0:
+            for code, message in _scalar_problems(field, values):
+                flag(field, code, message, True)
+        elif field.kind == "numeric":
+            numbers, not_numeric = _numeric(values)
+            if not_numeric is not None:
+                flag(field, NOT_NUMERIC, f"{field.name} is not a number", not_numeric)
+            missing = np.isnan(numbers)
+            if not_numeric is not None:
+                missing &= ~not_numeric
+            flag(field, MISSING, f"{field.name} is missing", missing)
+            with np.errstate(invalid="ignore"):
+                outside = (numbers < field.valid_min) | (numbers > field.valid_max)
+            flag(field, OUT_OF_RANGE,
+                 f"{field.name} outside {field.valid_min}-{field.valid_max}", outside)
+        else:
+            missing, unknown = _categorical(field, values)
+            flag(field, MISSING, f"{field.name} is missing", missing)
+            flag(field, UNKNOWN_CATEGORY,
+                 f"{field.name} is not one of {', '.join(field.options)}", unknown)
+
+    return ValidationResult(n_rows, problems)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate a CSV or Parquet file of patients without scoring it.")
+    parser.add_argument("input", help="CSV or Parquet file with the 11 clinical fields")
+    parser.add_argument("--show", type=int, default=10, help="print the reasons for up to this many bad rows")
+    args = parser.parse_args(argv)
+
+    from batch import read_table
+
+    frame = read_table(args.input)
+    start = time.perf_counter()
+    result = validate(frame)
+    seconds = time.perf_counter() - start
+
+    print(f"{result.n_rows - result.n_invalid} of {result.n_rows} rows valid "
+          f"(checked in {seconds:.3f}s)", file=sys.stderr)
+    for problem, count in result.summary().items():
+        print(f"  {problem}: {count}", file=sys.stderr)
+    reasons = result.reasons()
+    for row in np.flatnonzero(~result.valid)[:args.show]:
+        print(f"  row {row}: {reasons[row]}", file=sys.stderr)
+    return 0 if result.all_valid else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())